@@ -1 +1,6 @@
 from .metrics import MetricsCalculator
+from .trajectory import Trajectory, TrajectoryStore
+from .kinematics import KinematicsAnalyzer
+from .heatmap import CourtHeatmap
+from .catalog import MatchCatalog
+from .live import LiveMetrics, RingBuffer
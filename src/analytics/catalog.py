@@ -0,0 +1,244 @@
+import os
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+from filelock import FileLock
+from src.utils.config import get_config
+from src.export import read_results
+from .kinematics import KinematicsAnalyzer
+from .heatmap import NET_Y
+
+logger = logging.getLogger("badminton_cv.analytics")
+
+SHOT_TYPES = ('Smash', 'Clear', 'Drop', 'Drive')
+
+class MatchCatalog:
+    MATCHES_FILE = "matches.parquet"
+    SUMMARIES_FILE = "player_summaries.parquet"
+    RESULTS_DIR = "results"
+
+    def __init__(self, config: Optional[Dict] = None, catalog_dir: Optional[str] = None):
+        """
+        Initialize the MatchCatalog.
+
+        Keeps a match table and one pre-aggregated row per (match, player)
+        built from each run's Parquet results, so season-level questions are
+        answered from a few small tables without touching per-frame data.
+        Each match's results are copied under the catalog, and updates take
+        a file lock, so several pipeline processes can register concurrently.
+
+        Args:
+            config: Config dict.
+            catalog_dir: Overrides analytics.catalog_dir.
+        """
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        analytics_cfg = self.config.get('analytics', {})
+        self.catalog_dir = catalog_dir or analytics_cfg.get('catalog_dir', 'data/catalog')
+        self.min_track_seconds = analytics_cfg.get('catalog_min_track_seconds', 10.0) # Shorter tracks are spurious
+        self.kinematics = KinematicsAnalyzer(self._config_config)
+
+        os.makedirs(self.catalog_dir, exist_ok=True)
+        self._lock = FileLock(os.path.join(self.catalog_dir, ".lock"))
+        self._mtimes = {}
+        self.refresh()
+
+    def refresh(self, force: bool = False):
+        """Reload the tables if another process (e.g. a pipeline run) has updated them."""
+        mtimes = {name: os.stat(os.path.join(self.catalog_dir, name)).st_mtime_ns
+                  for name in (self.MATCHES_FILE, self.SUMMARIES_FILE)
+                  if os.path.exists(os.path.join(self.catalog_dir, name))}
+        if force or mtimes != self._mtimes or not hasattr(self, 'matches'):
+            self.matches = self._load(self.MATCHES_FILE)
+            self.summaries = self._load(self.SUMMARIES_FILE)
+            self._mtimes = mtimes
+
+    def register(self, match_id: str, results_dir: str, fps: float, video: Optional[str] = None,
+                 recorded_at: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Add (or replace) a match from a ResultWriter output directory.
+
+        Args:
+            match_id: Unique match identifier.
+            results_dir: Directory with the match's Parquet datasets.
+            fps: Frame rate of the analysed video.
+            video: Optional source video path.
+            recorded_at: Match date; defaults to now.
+
+        Returns:
+            pd.DataFrame: The match's per-player summary rows.
+        """
+        results_dir = self._store_results(match_id, results_dir)
+        tracks = read_results(results_dir, 'tracks', columns=['frame', 'time', 'track_id', 'class_id', 'court_x', 'court_y']).to_pandas()
+        shots = read_results(results_dir, 'shots', columns=['player_id', 'type']).to_pandas()
+        rallies = read_results(results_dir, 'rallies', columns=['rally']).to_pandas()
+
+        people = tracks[(tracks['class_id'] == 0) & tracks['court_x'].notna()].sort_values(['track_id', 'frame'])
+        shot_counts = pd.crosstab(shots['player_id'], shots['type']) if len(shots) else pd.DataFrame()
+
+        rows = []
+        for track_id, track in people.groupby('track_id'):
+            if len(track) < self.min_track_seconds * fps:
+                continue
+            rows.append(self._summarize(match_id, int(track_id), track, fps, shot_counts))
+
+        match = pd.DataFrame([{
+            'match_id': match_id,
+            'video': video or '',
+            'recorded_at': pd.Timestamp(recorded_at or datetime.now()),
+            'results_dir': results_dir,
+            'duration_s': float(tracks['time'].max()) if len(tracks) else 0.0,
+            'rally_count': len(rallies),
+            'shot_count': len(shots)
+        }])
+
+        # Read-modify-write under the lock so concurrent registrations are not lost
+        with self._lock:
+            self.refresh(force=True)
+            summaries = pd.DataFrame(rows, columns=self.summaries.columns if len(self.summaries.columns) else None)
+
+            # Keep labels given to this match's players on re-registration
+            previous = self.summaries[self.summaries['match_id'] == match_id] if len(self.summaries) else self.summaries
+            if len(previous) and len(summaries):
+                names = previous.set_index('track_id')['player']
+                summaries['player'] = summaries['track_id'].map(names).fillna(summaries['player'])
+
+            self.matches = self._concat(self.matches[self.matches['match_id'] != match_id] if len(self.matches) else self.matches, match)
+            self.summaries = self._concat(self.summaries[self.summaries['match_id'] != match_id] if len(self.summaries) else self.summaries, summaries)
+            self._save()
+        logger.info(f"Catalogued match {match_id}: {len(summaries)} players.")
+        return summaries
+
+    def label_player(self, match_id: str, track_id: int, player: str):
+        """Attach a player name to a track of a match (track IDs are per video)."""
+        with self._lock:
+            self.refresh(force=True)
+            mask = (self.summaries['match_id'] == match_id) & (self.summaries['track_id'] == track_id)
+            if not mask.any():
+                raise KeyError(f"No track {track_id} in match {match_id}")
+            self.summaries.loc[mask, 'player'] = player
+            self._save()
+
+    def query(self, metric: str, player: Optional[str] = None, last_n: Optional[int] = None,
+              agg: str = 'mean', since: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Aggregate a per-match metric over matches, e.g. the average rear-court
+        recovery speed of a player over their last 20 matches.
+
+        Args:
+            metric: Summary column (see `metrics`).
+            player: Optional player name filter.
+            last_n: Only the player's most recent N matches.
+            agg: pandas aggregation ('mean', 'median', 'max', 'min', 'sum').
+            since: Only matches recorded at or after this time.
+
+        Returns:
+            Dict with 'value', 'matches' (count) and per-match 'rows'.
+        """
+        self.refresh()
+        if metric not in self.metrics:
+            raise ValueError(f"Unknown metric '{metric}'. Available: {', '.join(self.metrics)}")
+
+        history = self.history(player, last_n=last_n, since=since)
+        values = history[metric].dropna()
+        return {
+            'metric': metric,
+            'player': player,
+            'agg': agg,
+            'matches': int(history['match_id'].nunique()),
+            'value': float(values.agg(agg)) if len(values) else None,
+            # NaN (metric undefined for a match) becomes None so rows serialize as JSON
+            'rows': history[['match_id', 'recorded_at', 'player', metric]].astype(object).where(history[[
+                'match_id', 'recorded_at', 'player', metric]].notna(), None).to_dict('records')
+        }
+
+    def history(self, player: Optional[str] = None, last_n: Optional[int] = None,
+                since: Optional[datetime] = None) -> pd.DataFrame:
+        """Per-match summary rows joined with match info, newest first."""
+        self.refresh()
+        if len(self.summaries) == 0:
+            return pd.DataFrame(columns=list(self.summaries.columns) + ['recorded_at'])
+        rows = self.summaries.merge(self.matches[['match_id', 'recorded_at']], on='match_id')
+        if player is not None:
+            rows = rows[rows['player'] == player]
+        if since is not None:
+            rows = rows[rows['recorded_at'] >= pd.Timestamp(since)]
+        rows = rows.sort_values('recorded_at', ascending=False)
+        if last_n is not None:
+            recent = rows['match_id'].drop_duplicates().head(last_n)
+            rows = rows[rows['match_id'].isin(recent)]
+        return rows
+
+    @property
+    def metrics(self) -> List[str]:
+        """Numeric summary columns that can be queried."""
+        return [c for c in self.summaries.columns
+                if c not in ('match_id', 'player', 'track_id') and pd.api.types.is_numeric_dtype(self.summaries[c])]
+
+    def _summarize(self, match_id: str, track_id: int, track: pd.DataFrame, fps: float,
+                   shot_counts: pd.DataFrame) -> Dict[str, Any]:
+        """Pre-aggregated row for one player track."""
+        positions = track[['court_x', 'court_y']].to_numpy(dtype=np.float64)
+        kin = self.kinematics.analyze(track['frame'].to_numpy(), positions, fps)
+
+        # Rear third of either half; recovery is movement back towards the net from there
+        depth = np.abs(positions[:, 1] - NET_Y)
+        rear = depth > 2 * NET_Y / 3
+        towards_net = np.sign(NET_Y - positions[:, 1]) * kin['velocity'][:, 1] > 0
+        recovering = rear & towards_net
+
+        row = {
+            'match_id': match_id,
+            'track_id': track_id,
+            'player': f"track_{track_id}",
+            'samples': len(track),
+            'distance_m': kin['distance_m'],
+            'max_speed_mps': kin['max_speed_mps'],
+            'mean_speed_mps': kin['mean_speed_mps'],
+            'max_accel_mps2': kin['max_accel_mps2'],
+            'sprint_count': kin['sprint_count'],
+            'rear_share': float(rear.mean()),
+            'front_share': float((depth < NET_Y / 3).mean()),
+            'rear_recovery_speed_mps': float(kin['speed'][recovering].mean()) if recovering.any() else np.nan,
+        }
+        for shot_type in SHOT_TYPES:
+            has = track_id in shot_counts.index and shot_type in shot_counts.columns
+            row[f'{shot_type.lower()}_count'] = int(shot_counts.loc[track_id, shot_type]) if has else 0
+        return row
+
+    @staticmethod
+    def _concat(existing: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+        if len(existing) == 0:
+            return new.reset_index(drop=True)
+        if len(new) == 0:
+            return existing.reset_index(drop=True)
+        return pd.concat([existing, new], ignore_index=True)
+
+    def _load(self, name: str) -> pd.DataFrame:
+        path = os.path.join(self.catalog_dir, name)
+        return pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+
+    def _store_results(self, match_id: str, results_dir: str) -> str:
+        """Copy a run's Parquet results under the catalog (output dirs are reused by later runs)."""
+        target = os.path.abspath(os.path.join(self.catalog_dir, self.RESULTS_DIR, match_id))
+        source = os.path.abspath(results_dir)
+        if source == target:
+            return target
+        staging = f"{target}.tmp-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(source, staging)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+        return target
+
+    def _save(self):
+        # Caller holds the lock; write-then-rename so a crash never leaves a truncated table
+        for name, frame in ((self.MATCHES_FILE, self.matches), (self.SUMMARIES_FILE, self.summaries)):
+            path = os.path.join(self.catalog_dir, name)
+            frame.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+            self._mtimes[name] = os.stat(path).st_mtime_ns
@@ -0,0 +1,95 @@
+import numpy as np
+from typing import Dict, Any
+
+COURT_WIDTH = 6.1 # meters (doubles sidelines)
+COURT_LENGTH = 13.4
+NET_Y = COURT_LENGTH / 2
+
+class CourtHeatmap:
+    __slots__ = ('cell_size', 'shape', 'counts', 'outside', '_zone_of_cell', '_half_of_cell')
+
+    # Depth bands measured from the net within each half, and sides as seen by the player facing the net
+    DEPTHS = ('front', 'mid', 'rear')
+    SIDES = ('left', 'right')
+
+    def __init__(self, cell_size: float = 0.25):
+        """
+        Fixed-size occupancy grid over the court.
+
+        Memory is constant in match length: samples only increment cell
+        counts. Rows run along the court length (y), columns across it (x).
+
+        Args:
+            cell_size: Grid resolution in meters.
+        """
+        self.cell_size = cell_size
+        self.shape = (int(np.ceil(COURT_LENGTH / cell_size)), int(np.ceil(COURT_WIDTH / cell_size)))
+        self.counts = np.zeros(self.shape, dtype=np.int64)
+        self.outside = 0 # Samples off the court
+
+        # Zone index per cell (depth * 2 + side) and half (0: y < net, 1: y > net), from cell centres.
+        # Depth is distance from the net, so it already mirrors; x is mirrored in the far half,
+        # where the player faces the other way, so zones from both ends are comparable.
+        cy = np.minimum((np.arange(self.shape[0]) + 0.5) * cell_size, COURT_LENGTH)
+        cx = np.minimum((np.arange(self.shape[1]) + 0.5) * cell_size, COURT_WIDTH)
+        far = cy > NET_Y
+        depth = np.minimum((np.abs(cy - NET_Y) / (NET_Y / 3)).astype(int), 2)
+        own_x = np.where(far[:, None], COURT_WIDTH - cx[None, :], cx[None, :])
+        side = (own_x >= COURT_WIDTH / 2).astype(int)
+        self._zone_of_cell = (depth[:, None] * 2 + side).ravel()
+        self._half_of_cell = np.repeat(far.astype(int), self.shape[1])
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum()) + self.outside
+
+    def update(self, positions: np.ndarray):
+        """
+        Add a batch of court positions.
+
+        Args:
+            positions: (N, 2) court positions in meters; non-finite rows are ignored.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        positions = positions[np.all(np.isfinite(positions), axis=1)]
+        col = np.floor(positions[:, 0] / self.cell_size).astype(int)
+        row = np.floor(positions[:, 1] / self.cell_size).astype(int)
+        inside = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+        self.outside += int(np.count_nonzero(~inside))
+        np.add.at(self.counts.ravel(), row[inside] * self.shape[1] + col[inside], 1)
+
+    def zones(self) -> Dict[str, float]:
+        """Fraction of on-court samples per zone, e.g. 'front_left', within the player's half and from their view."""
+        flat = self.counts.ravel()
+        totals = np.bincount(self._zone_of_cell, weights=flat, minlength=6)
+        totals = totals / max(totals.sum(), 1)
+        return {f'{depth}_{side}': float(totals[d * 2 + s])
+                for d, depth in enumerate(self.DEPTHS) for s, side in enumerate(self.SIDES)}
+
+    def coverage(self, min_half_share: float = 0.1) -> float:
+        """
+        Percentage of cells visited in the half (or halves) the player occupied.
+
+        A half counts once it holds at least `min_half_share` of the samples,
+        so players who change ends are judged over both.
+        """
+        flat = self.counts.ravel()
+        per_half = np.bincount(self._half_of_cell, weights=flat, minlength=2)
+        if per_half.sum() == 0:
+            return 0.0
+        occupied = (per_half / per_half.sum() >= min_half_share)[self._half_of_cell]
+        return float(100.0 * np.count_nonzero((flat > 0) & occupied) / np.count_nonzero(occupied))
+
+    def to_array(self, normalize: bool = True) -> np.ndarray:
+        """(rows, cols) grid of counts, or occupancy fractions if normalize."""
+        if not normalize:
+            return self.counts.copy()
+        return self.counts / max(int(self.counts.sum()), 1)
+
+    def export(self) -> Dict[str, Any]:
+        """Arrays and metadata for plotting: 'grid', 'cell_size', 'extent' ([x0, x1, y0, y1] meters)."""
+        return {
+            'grid': self.to_array(),
+            'cell_size': self.cell_size,
+            'extent': [0.0, self.shape[1] * self.cell_size, 0.0, self.shape[0] * self.cell_size]
+        }
@@ -0,0 +1,125 @@
+import logging
+import numpy as np
+from scipy.signal import savgol_filter
+from typing import Dict, Optional, Any
+from src.utils.config import get_config
+from src.utils.arrays import find_runs
+
+logger = logging.getLogger("badminton_cv.analytics")
+
+class KinematicsAnalyzer:
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Initialize the KinematicsAnalyzer.
+
+        Processes a whole player trajectory at once: Savitzky-Golay smoothing
+        and derivatives per continuous segment (short tracking gaps are
+        interpolated onto the frame grid first), then distance, speed,
+        acceleration, sprints and per-interval distance with array operations.
+        """
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        analytics_cfg = self.config.get('analytics', {})
+        self.window = analytics_cfg.get('smoothing_window', 9) # frames, odd
+        self.polyorder = analytics_cfg.get('smoothing_polyorder', 2)
+        self.max_frame_gap = analytics_cfg.get('max_frame_gap', 5) # frames; larger gaps split a trajectory
+        self.max_step = analytics_cfg.get('max_step', 10.0) # meters between samples; larger jumps are ID swaps
+        self.sprint_speed = analytics_cfg.get('sprint_speed', 4.0) # m/s
+        self.min_sprint_duration = analytics_cfg.get('min_sprint_duration', 0.3) # seconds
+
+    def analyze(self, frames: np.ndarray, positions: np.ndarray, fps: float,
+                intervals: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+        """
+        Kinematics of one trajectory.
+
+        Args:
+            frames: (N,) sorted frame indices.
+            positions: (N, 2) court positions in meters.
+            fps: Frame rate used to convert frames to seconds.
+            intervals: Optional named (K, 2) [start_frame, end_frame] ranges
+                       (e.g. 'rally', 'game') to report distance over.
+
+        Returns:
+            Dict with 'distance_m', 'max_speed_mps', 'mean_speed_mps',
+            'max_accel_mps2', 'sprint_count', per-sample 'speed', 'accel' and
+            (N, 2) 'velocity' arrays, and '<name>_distances_m' (K,) for each interval set.
+        """
+        frames = np.asarray(frames, dtype=np.float64)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        n = len(frames)
+        dt = 1.0 / fps
+
+        # Continuous segments: split at tracking gaps and impossible jumps
+        steps = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+        breaks = np.flatnonzero((np.diff(frames) > self.max_frame_gap) | ~(steps < self.max_step)) + 1
+        bounds = np.concatenate([[0], breaks, [n]])
+
+        smoothed = positions.copy()
+        velocity = np.zeros((n, 2))
+        accel = np.zeros((n, 2))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            # The filter assumes one frame between samples: resample short gaps onto the frame grid
+            offsets = (frames[start:end] - frames[start]).astype(np.int64)
+            segment = positions[start:end]
+            if offsets[-1] != end - start - 1:
+                grid = np.arange(offsets[-1] + 1)
+                segment = np.column_stack([np.interp(grid, offsets, segment[:, axis]) for axis in range(2)])
+            window = self._window(len(segment))
+            if window is None:
+                continue
+            smoothed[start:end] = savgol_filter(segment, window, self.polyorder, axis=0)[offsets]
+            velocity[start:end] = savgol_filter(segment, window, self.polyorder, deriv=1, delta=dt, axis=0)[offsets]
+            accel[start:end] = savgol_filter(segment, window, self.polyorder, deriv=2, delta=dt, axis=0)[offsets]
+
+        # Distance along the smoothed path, never across segment boundaries
+        step = np.linalg.norm(np.diff(smoothed, axis=0), axis=1) if n > 1 else np.zeros(0)
+        step[breaks - 1] = 0.0
+        cumulative = np.concatenate([[0.0], np.cumsum(step)])
+
+        speed = np.linalg.norm(velocity, axis=1)
+        accel_mag = np.linalg.norm(accel, axis=1)
+
+        # Sprints: sustained runs above sprint speed
+        starts, ends = find_runs(speed > self.sprint_speed)
+        sprints = int(np.count_nonzero((frames[ends - 1] - frames[starts] + 1) * dt >= self.min_sprint_duration))
+
+        result = {
+            'distance_m': float(cumulative[-1]) if n else 0.0,
+            'max_speed_mps': float(speed.max()) if n else 0.0,
+            'mean_speed_mps': float(speed.mean()) if n else 0.0,
+            'max_accel_mps2': float(accel_mag.max()) if n else 0.0,
+            'sprint_count': sprints,
+            'speed': speed,
+            'accel': accel_mag,
+            'velocity': velocity
+        }
+        for name, ranges in (intervals or {}).items():
+            result[f'{name}_distances_m'] = self.interval_distances(frames, cumulative, ranges)
+        return result
+
+    @staticmethod
+    def interval_distances(frames: np.ndarray, cumulative: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+        """
+        Distance covered within each [start_frame, end_frame] range.
+
+        Args:
+            frames: (N,) sorted frame indices.
+            cumulative: (N,) cumulative distance at each sample.
+            ranges: (K, 2) inclusive frame ranges.
+
+        Returns:
+            np.ndarray: (K,) distances in meters.
+        """
+        ranges = np.asarray(ranges, dtype=np.float64).reshape(-1, 2)
+        if len(frames) == 0:
+            return np.zeros(len(ranges))
+        lo = np.searchsorted(frames, ranges[:, 0], side='left')
+        hi = np.searchsorted(frames, ranges[:, 1], side='right') - 1
+        lo, hi = np.clip(lo, 0, len(frames) - 1), np.clip(hi, 0, len(frames) - 1)
+        return np.where(hi > lo, cumulative[hi] - cumulative[lo], 0.0)
+
+    def _window(self, length: int) -> Optional[int]:
+        """Largest odd window <= configured size that fits the segment, or None if too short."""
+        window = min(self.window, length if length % 2 else length - 1)
+        return window if window > self.polyorder else None
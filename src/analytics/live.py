@@ -0,0 +1,142 @@
+import numpy as np
+from typing import Dict, List, Optional, Any
+from src.utils.config import get_config
+
+class RingBuffer:
+    """Fixed-capacity FIFO of rows with a running sum; push is O(1)."""
+    __slots__ = ('capacity', 'data', 'head', 'count', 'total')
+
+    def __init__(self, capacity: int, width: int = 1):
+        self.capacity = max(int(capacity), 1)
+        self.data = np.zeros((self.capacity, width), dtype=np.float64)
+        self.head = 0 # Next slot to write
+        self.count = 0
+        self.total = np.zeros(width, dtype=np.float64)
+
+    def push(self, value):
+        """Append a row, evicting the oldest once full."""
+        if self.count == self.capacity:
+            self.total -= self.data[self.head]
+        else:
+            self.count += 1
+        self.data[self.head] = value
+        self.total += self.data[self.head]
+        self.head = (self.head + 1) % self.capacity
+
+    @property
+    def newest(self) -> np.ndarray:
+        return self.data[(self.head - 1) % self.capacity]
+
+    @property
+    def oldest(self) -> np.ndarray:
+        return self.data[(self.head - self.count) % self.capacity]
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+        self.total[:] = 0.0
+
+class _PlayerWindow:
+    __slots__ = ('positions', 'rally_distance', 'last')
+
+    def __init__(self, capacity: int):
+        self.positions = RingBuffer(capacity, width=3) # frame, x, y
+        self.rally_distance = 0.0
+        self.last = None # (frame, x, y) of the previous sample
+
+class LiveMetrics:
+    def __init__(self, config: Optional[Dict] = None, fps: float = 30.0):
+        """
+        Initialize LiveMetrics.
+
+        Rolling statistics that can be published every frame: current speed
+        per player, distance covered in the current rally, and work/rest
+        ratio over the last `window` seconds. Every update is O(1) per
+        player; history is never rescanned.
+
+        Args:
+            config: Config dict.
+            fps: Frame rate of the stream.
+        """
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        analytics_cfg = self.config.get('analytics', {})
+        self.window = analytics_cfg.get('live_window', 60.0) # seconds for work/rest
+        self.speed_window = analytics_cfg.get('live_speed_window', 0.5) # seconds for current speed
+        self.max_step = analytics_cfg.get('max_step', 10.0) # meters between samples; larger jumps are ID swaps
+        self.max_frame_gap = analytics_cfg.get('max_frame_gap', 5)
+        self.reset(fps)
+
+    def reset(self, fps: Optional[float] = None):
+        """Start a new stream."""
+        if fps is not None:
+            self.fps = fps
+        self._players: Dict[int, _PlayerWindow] = {}
+        self._activity = RingBuffer(self.window * self.fps) # 1 while a rally is in play
+        self._in_rally = False
+        self._frame = None
+
+    def update(self, frame_idx: int, player_ids: List[int], positions_m: np.ndarray, in_rally: bool):
+        """
+        Advance one frame.
+
+        Args:
+            frame_idx: Frame index.
+            player_ids: Track IDs seen this frame.
+            positions_m: (K, 2) court positions in meters.
+            in_rally: Whether a rally is open (e.g. EventDetector.in_rally).
+        """
+        if in_rally and not self._in_rally:
+            for player in self._players.values():
+                player.rally_distance = 0.0
+        self._in_rally = in_rally
+        self._activity.push(1.0 if in_rally else 0.0)
+        self._frame = frame_idx
+
+        # Forget tracks that have not been seen for a while (amortized, once per second)
+        if frame_idx % max(int(self.fps), 1) == 0:
+            self._players = {pid: p for pid, p in self._players.items() if frame_idx - p.last[0] <= self.max_frame_gap}
+
+        speed_len = max(int(round(self.speed_window * self.fps)) + 1, 2)
+        for player_id, (x, y) in zip(player_ids, np.asarray(positions_m, dtype=np.float64).reshape(-1, 2)):
+            if not (np.isfinite(x) and np.isfinite(y)): # Court not calibrated
+                continue
+            player = self._players.get(player_id)
+            if player is None:
+                player = self._players[player_id] = _PlayerWindow(speed_len)
+            if player.last is not None and in_rally and frame_idx - player.last[0] <= self.max_frame_gap:
+                step = np.hypot(x - player.last[1], y - player.last[2])
+                if step < self.max_step:
+                    player.rally_distance += step
+            player.last = (frame_idx, x, y)
+            player.positions.push((frame_idx, x, y))
+
+    def current_speed(self, player_id: int) -> float:
+        """Speed in m/s over the last `speed_window` seconds (0 if unknown or stale)."""
+        player = self._players.get(player_id)
+        if player is None or player.positions.count < 2 or self._frame - player.last[0] > self.max_frame_gap:
+            return 0.0
+        (f0, x0, y0), (f1, x1, y1) = player.positions.oldest, player.positions.newest
+        if f1 <= f0:
+            return 0.0
+        return float(np.hypot(x1 - x0, y1 - y0) / ((f1 - f0) / self.fps))
+
+    def work_rest_ratio(self) -> Optional[float]:
+        """Rally time over non-rally time in the window (None before any rest)."""
+        work = float(self._activity.total[0])
+        rest = self._activity.count - work
+        return work / rest if rest > 0 else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values for publishing."""
+        work = float(self._activity.total[0])
+        return {
+            'frame': self._frame,
+            'in_rally': self._in_rally,
+            'work_s': work / self.fps,
+            'rest_s': (self._activity.count - work) / self.fps,
+            'work_rest_ratio': self.work_rest_ratio(),
+            'players': {pid: {'speed_mps': self.current_speed(pid), 'rally_distance_m': p.rally_distance}
+                        for pid, p in self._players.items() if self._frame - p.last[0] <= self.max_frame_gap}
+        }
@@ -3,6 +3,9 @@ import numpy as np
 from typing import Dict, List, Optional, Tuple, Any
 from src.utils.config import get_config
 from src.calibrate import CourtCalibrator
+from .trajectory import TrajectoryStore
+from .kinematics import KinematicsAnalyzer
+from .heatmap import CourtHeatmap
 
 logger = logging.getLogger("badminton_cv.analytics")
 
@@ -19,10 +22,22 @@ class MetricsCalculator:
         self._config_config = config if config else get_config()
         self.config = self._config_config.config if hasattr(self._config_config, 'config') else self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
         
-        self.fps = self.config.get('video.processing_fps', 30.0)
+        # Rate of the frame indices passed to update_players; the pipeline sets the video's own fps
+        self.fps = self.config.get('video', {}).get('processing_fps', 30.0)
         
-        # Player stats: {player_id: {'distance': 0.0, 'speed_samples': [], 'positions': []}}
-        self.player_stats = {}
+        # Player trajectories: frame, pixel and court position per track, in compact arrays
+        analytics_cfg = self.config.get('analytics', {})
+        self.trajectories = TrajectoryStore(analytics_cfg.get('max_trajectory_points', 2_000_000),
+                                            analytics_cfg.get('protect_track_points', 300))
+        self.kinematics = KinematicsAnalyzer(self._config_config)
+        
+        # Court occupancy per player: fixed-size grids, constant memory over the match
+        self.heatmap_cell_size = analytics_cfg.get('heatmap_cell_size', 0.25)
+        self.heatmap_batch_size = analytics_cfg.get('heatmap_batch_size', 4096) # samples buffered per grid update
+        self._heatmaps: Dict[int, CourtHeatmap] = {}
+        self._pending_ids: List[np.ndarray] = []
+        self._pending_positions: List[np.ndarray] = []
+        self._pending_count = 0
         self.shuttle_max_speed = 0.0
 
     def compute_shuttle_speed(self, p1_px: Tuple[float, float], p2_px: Tuple[float, float], time_delta: float) -> float:
@@ -41,8 +56,7 @@ class MetricsCalculator:
             return 0.0
             
         try:
-            p1_m = self.calibrator.pixel_to_court(p1_px)
-            p2_m = self.calibrator.pixel_to_court(p2_px)
+            p1_m, p2_m = self.calibrator.pixels_to_court(np.array([p1_px, p2_px], dtype=np.float64))
         except RuntimeError:
              # Calibration not ready
              return 0.0
@@ -56,52 +70,157 @@ class MetricsCalculator:
             
         return speed_kmh
 
+    def compute_shuttle_speeds(self, points_px: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+        """
+        Compute speeds in km/h along a whole shuttle trajectory in pixels.
+        
+        Args:
+            points_px: (N, 2) array of pixel positions (NaN where the shuttle was not seen).
+            timestamps: (N,) array of times in seconds.
+            
+        Returns:
+            np.ndarray: (N-1,) speeds between consecutive samples (0 where time
+            does not advance or either position is unknown).
+        """
+        points_px = np.asarray(points_px, dtype=np.float64).reshape(-1, 2)
+        if len(points_px) < 2:
+            return np.zeros(0)
+        try:
+            points_m = self.calibrator.pixels_to_court(points_px)
+        except RuntimeError:
+             # Calibration not ready
+             return np.zeros(len(points_px) - 1)
+        return self.compute_court_shuttle_speeds(points_m, timestamps)
+
+    def compute_court_shuttle_speeds(self, points_m: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+        """
+        Compute speeds in km/h along a whole shuttle trajectory in court meters.
+        
+        Args:
+            points_m: (N, 2) court positions, e.g. converted frame by frame under
+                      camera motion (NaN where unknown).
+            timestamps: (N,) array of times in seconds.
+            
+        Returns:
+            np.ndarray: (N-1,) speeds between consecutive samples (0 where time
+            does not advance or either position is unknown).
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        points_m = np.asarray(points_m, dtype=np.float64).reshape(-1, 2)
+        if len(points_m) < 2:
+            return np.zeros(0)
+             
+        dist_m = np.linalg.norm(np.diff(points_m, axis=0), axis=1)
+        dt = np.diff(timestamps)
+        valid = (dt > 0) & np.isfinite(dist_m)
+        speeds_kmh = np.where(valid, dist_m / np.where(valid, dt, 1.0), 0.0) * 3.6
+        
+        if speeds_kmh.size and speeds_kmh.max() > self.shuttle_max_speed:
+            self.shuttle_max_speed = float(speeds_kmh.max())
+            
+        return speeds_kmh
+
     def update_player_stats(self, player_id: int, position_px: Tuple[float, float], frame_idx: int):
         """
         Update distance and coverage stats for a player.
         """
-        if player_id not in self.player_stats:
-            self.player_stats[player_id] = {
-                'distance': 0.0,
-                'positions': [], # Store court positions (x_m, y_m)
-                'last_pos_px': None,
-                'last_frame': None
-            }
-            
-        stats = self.player_stats[player_id]
+        self.update_players([player_id], np.array([position_px], dtype=np.float64), frame_idx)
+
+    def update_players(self, player_ids: List[int], positions_px: np.ndarray, frame_idx: int) -> np.ndarray:
+        """
+        Record the court position of every player seen in a frame.
         
-        # Convert to meters
+        Args:
+            player_ids: Track IDs, one per row of positions_px.
+            positions_px: (N, 2) array of pixel positions (feet).
+            frame_idx: Frame index.
+            
+        Returns:
+            np.ndarray: (N, 2) court positions used for the update; NaN (and
+            nothing recorded) while the court is not calibrated.
+        """
+        if len(player_ids) == 0:
+            return np.zeros((0, 2))
+            
+        # Convert the whole frame to meters in one call
         try:
-            pos_m = self.calibrator.pixel_to_court(position_px)
+            positions_m = self.calibrator.pixels_to_court(positions_px)
         except RuntimeError:
-            pos_m = (0.0, 0.0) # Fallback
+            # Calibration not ready: no court positions to record
+            return np.full((len(player_ids), 2), np.nan)
             
-        stats['positions'].append(pos_m)
+        evicted = self.trajectories.evicted
+        self.trajectories.append(frame_idx, player_ids, positions_px, positions_m)
         
-        # Basic distance accumulation
-        if stats['last_pos_px'] is not None:
-            # We use meter distance for stats
-            last_pos_m = self.calibrator.pixel_to_court(stats['last_pos_px'])
-            dist = np.sqrt((pos_m[0] - last_pos_m[0])**2 + (pos_m[1] - last_pos_m[1])**2)
+        # Occupancy grids are updated in batches rather than per frame
+        self._pending_ids.append(np.asarray(player_ids))
+        self._pending_positions.append(positions_m)
+        self._pending_count += len(player_ids)
+        if self.trajectories.evicted != evicted or self._pending_count >= self.heatmap_batch_size:
+            self._flush_heatmaps()
             
-            # Simple noise filter: if moving > 10m in 1 frame (impossible), ignore
-            if dist < 10.0:
-                 stats['distance'] += dist
-                 
-        stats['last_pos_px'] = position_px
-        stats['last_frame'] = frame_idx
+        return positions_m
+
+    @property
+    def heatmaps(self) -> Dict[int, CourtHeatmap]:
+        """Occupancy grid per player, including every buffered sample."""
+        self._flush_heatmaps()
+        return self._heatmaps
 
-    def get_summary(self) -> Dict[str, Any]:
-        """Return match summary."""
+    def _flush_heatmaps(self):
+        if self._pending_count:
+            ids = np.concatenate(self._pending_ids)
+            positions = np.concatenate(self._pending_positions)
+            order = np.argsort(ids, kind='stable')
+            unique, starts = np.unique(ids[order], return_index=True)
+            for player_id, rows in zip(unique.tolist(), np.split(order, starts[1:])):
+                if player_id not in self.trajectories:
+                    continue
+                if player_id not in self._heatmaps:
+                    self._heatmaps[player_id] = CourtHeatmap(self.heatmap_cell_size)
+                self._heatmaps[player_id].update(positions[rows])
+            self._pending_ids, self._pending_positions, self._pending_count = [], [], 0
+            
+        # Spurious tracks dropped from the store do not keep a heatmap either
+        if len(self._heatmaps) > len(self.trajectories):
+            self._heatmaps = {pid: h for pid, h in self._heatmaps.items() if pid in self.trajectories}
+
+    def get_summary(self, rallies: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Return match summary.
+        
+        Args:
+            rallies: Optional rally dicts (with 'start_frame', 'end_frame') to
+                     report per-rally distance for each player.
+        """
         summary = {
             'shuttle_max_speed_kmh': self.shuttle_max_speed,
             'players': {}
         }
+        intervals = None
+        if rallies:
+            intervals = {'rally': np.array([[r['start_frame'], r['end_frame']] for r in rallies])}
         
-        for pid, stats in self.player_stats.items():
-            summary['players'][pid] = {
-                'total_distance_m': stats['distance'],
-                'coverage_points': len(stats['positions'])
+        for trajectory in self.trajectories:
+            # Whole-trajectory smoothing and kinematics in one batch
+            kin = self.kinematics.analyze(trajectory.frames, trajectory.court, self.fps, intervals)
+            stats = {
+                'total_distance_m': kin['distance_m'],
+                'max_speed_mps': kin['max_speed_mps'],
+                'max_accel_mps2': kin['max_accel_mps2'],
+                'sprint_count': kin['sprint_count'],
+                'coverage_points': len(trajectory)
             }
+            heatmap = self.heatmaps.get(trajectory.track_id)
+            if heatmap is not None:
+                stats['coverage_pct'] = heatmap.coverage()
+                stats['zones'] = heatmap.zones()
+            if intervals is not None:
+                stats['rally_distances_m'] = kin['rally_distances_m'].tolist()
+            summary['players'][trajectory.track_id] = stats
             
         return summary
+
+    def get_heatmaps(self) -> Dict[int, Dict[str, Any]]:
+        """Occupancy grids per player (see CourtHeatmap.export)."""
+        return {pid: heatmap.export() for pid, heatmap in self.heatmaps.items()}
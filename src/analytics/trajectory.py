@@ -0,0 +1,182 @@
+import logging
+import numpy as np
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger("badminton_cv.analytics")
+
+# Column layout of a trajectory buffer
+FRAME, PX, PY, CX, CY = range(5)
+COLUMNS = ('frame', 'px', 'py', 'cx', 'cy')
+
+class Trajectory:
+    """
+    Positions of one track in an amortized-growth (N, 5) float64 buffer.
+
+    Rows are [frame, pixel x, pixel y, court x, court y], appended in frame order.
+    """
+    __slots__ = ('track_id', '_buffer', '_size')
+
+    def __init__(self, track_id: int, capacity: int = 256):
+        self.track_id = track_id
+        self._buffer = np.empty((capacity, len(COLUMNS)), dtype=np.float64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, rows: np.ndarray):
+        """Append (K, 5) rows, doubling the buffer when full."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+        end = self._size + len(rows)
+        if end > len(self._buffer):
+            grown = np.empty((max(end, 2 * len(self._buffer)), len(COLUMNS)), dtype=np.float64)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size:end] = rows
+        self._size = end
+
+    @property
+    def data(self) -> np.ndarray:
+        """(N, 5) view of the stored rows (valid until the next append)."""
+        return self._buffer[:self._size]
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self._buffer[:self._size, FRAME]
+
+    @property
+    def pixels(self) -> np.ndarray:
+        return self._buffer[:self._size, PX:PY + 1]
+
+    @property
+    def court(self) -> np.ndarray:
+        return self._buffer[:self._size, CX:CY + 1]
+
+    @property
+    def last_frame(self) -> Optional[int]:
+        return int(self._buffer[self._size - 1, FRAME]) if self._size else None
+
+    @property
+    def nbytes(self) -> int:
+        """Allocated buffer size in bytes."""
+        return self._buffer.nbytes
+
+    def slice(self, start_frame: Optional[int] = None, end_frame: Optional[int] = None) -> np.ndarray:
+        """Rows with start_frame <= frame < end_frame (binary search on the frame column)."""
+        frames = self.frames
+        lo = 0 if start_frame is None else int(np.searchsorted(frames, start_frame, side='left'))
+        hi = self._size if end_frame is None else int(np.searchsorted(frames, end_frame, side='left'))
+        return self._buffer[lo:hi]
+
+    def thin(self) -> int:
+        """Keep every other row (and the last); returns the number of rows dropped."""
+        keep = np.arange(0, self._size, 2)
+        if self._size and keep[-1] != self._size - 1:
+            keep = np.append(keep, self._size - 1)
+        dropped = self._size - len(keep)
+        self._buffer[:len(keep)] = self._buffer[keep]
+        self._size = len(keep)
+        return dropped
+
+    def compact(self):
+        """Release unused capacity."""
+        self._buffer = self._buffer[:self._size].copy()
+
+class TrajectoryStore:
+    def __init__(self, max_points: int = 2_000_000, protect_points: int = 300):
+        """
+        Per-track trajectories under a global point budget.
+
+        When the budget is exceeded, short tracks (spurious IDs) are evicted,
+        least recently seen first. Tracks of at least `protect_points` rows
+        are real players, possibly just occluded, so they are never dropped:
+        if evicting short tracks is not enough, the longest trajectory is
+        thinned to every other sample instead and keeps its whole history.
+
+        Args:
+            max_points: Maximum number of rows kept across all tracks.
+            protect_points: Tracks this long are thinned rather than evicted.
+        """
+        self.max_points = max_points
+        self.protect_points = protect_points
+        self._tracks: Dict[int, Trajectory] = {}
+        self._points = 0
+        self.evicted = 0
+        self.thinned = 0
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __contains__(self, track_id: int) -> bool:
+        return track_id in self._tracks
+
+    def __getitem__(self, track_id: int) -> Trajectory:
+        return self._tracks[track_id]
+
+    def __iter__(self) -> Iterator[Trajectory]:
+        return iter(self._tracks.values())
+
+    @property
+    def track_ids(self) -> List[int]:
+        return list(self._tracks)
+
+    @property
+    def num_points(self) -> int:
+        return self._points
+
+    @property
+    def nbytes(self) -> int:
+        """Allocated bytes across all track buffers."""
+        return sum(t.nbytes for t in self._tracks.values())
+
+    def append(self, frame_idx: int, track_ids: List[int], positions_px: np.ndarray, positions_m: np.ndarray):
+        """
+        Record the positions of every track seen in one frame.
+
+        Args:
+            frame_idx: Frame index.
+            track_ids: (K,) track IDs.
+            positions_px: (K, 2) pixel positions.
+            positions_m: (K, 2) court positions in meters.
+        """
+        rows = np.empty((len(track_ids), len(COLUMNS)), dtype=np.float64)
+        rows[:, FRAME] = frame_idx
+        rows[:, PX:PY + 1] = positions_px
+        rows[:, CX:CY + 1] = positions_m
+
+        for track_id, row in zip(track_ids, rows):
+            trajectory = self._tracks.get(track_id)
+            if trajectory is None:
+                trajectory = self._tracks[track_id] = Trajectory(track_id)
+            trajectory.append(row)
+        self._points += len(rows)
+
+        if self._points > self.max_points:
+            self._evict()
+
+    def slice(self, track_id: int, start_frame: Optional[int] = None, end_frame: Optional[int] = None) -> np.ndarray:
+        """Rows of one track within [start_frame, end_frame)."""
+        return self._tracks[track_id].slice(start_frame, end_frame)
+
+    def _evict(self):
+        """Drop short stale tracks, then thin the longest ones, until back under the budget."""
+        by_recency = sorted(self._tracks.values(), key=lambda t: t.last_frame)
+        for trajectory in by_recency[:-1]: # Never evict the most recent track
+            if self._points <= self.max_points:
+                return
+            if len(trajectory) >= self.protect_points:
+                continue
+            del self._tracks[trajectory.track_id]
+            self._points -= len(trajectory)
+            self.evicted += 1
+            logger.debug(f"Evicted trajectory of track {trajectory.track_id} ({len(trajectory)} points).")
+
+        while self._points > self.max_points:
+            longest = max(self._tracks.values(), key=len)
+            dropped = longest.thin()
+            if dropped == 0:
+                break
+            self._points -= dropped
+            self.thinned += 1
+            logger.warning(f"Trajectory budget of {self.max_points} points exceeded: track {longest.track_id} "
+                           f"thinned to {len(longest)} points.")
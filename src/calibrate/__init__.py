@@ -1 +1,2 @@
 from .court import CourtCalibrator
+from .cache import CalibrationCache
@@ -0,0 +1,121 @@
+import cv2
+import json
+import os
+import logging
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("badminton_cv.calibrate")
+
+class CalibrationCache:
+    """
+    Persistent store of court homographies keyed by a perceptual fingerprint
+    of the static court background.
+
+    Cameras are fixed per court, so a video from a known venue can reuse the
+    stored homography after a cheap verification instead of re-running line
+    detection.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str, max_distance: int = 6, max_entries: int = 256):
+        """
+        Args:
+            cache_dir: Directory holding the cache index.
+            max_distance: Maximum Hamming distance (bits, out of 64) for a fingerprint match.
+            max_entries: Oldest entries are evicted beyond this many venues.
+        """
+        self.cache_dir = cache_dir
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILE)
+        self.entries = self._load()
+
+    @staticmethod
+    def background(frames: List[np.ndarray], width: int = 320) -> np.ndarray:
+        """
+        Estimate the static background as the per-pixel median of frames,
+        which removes moving players and the shuttle.
+
+        Returns:
+            Grayscale background image at reduced width.
+        """
+        scale = min(1.0, width / frames[0].shape[1])
+        small = []
+        for frame in frames:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            small.append(cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray)
+        return np.median(np.stack(small), axis=0).astype(np.uint8)
+
+    @staticmethod
+    def fingerprint(background: np.ndarray) -> str:
+        """64-bit DCT perceptual hash of a grayscale image, as a hex string."""
+        small = cv2.resize(background, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+        low = cv2.dct(small)[:8, :8].ravel()[1:] # Drop the DC term (overall brightness)
+        bits = np.concatenate([[0], low > np.median(low)]).astype(np.uint8)
+        return int("".join(map(str, bits)), 2).to_bytes(8, "big").hex()
+
+    @staticmethod
+    def distance(a: str, b: str) -> int:
+        """Hamming distance between two hex fingerprints."""
+        return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+    def lookup(self, fingerprint: str, resolution: Tuple[int, int]) -> Optional[np.ndarray]:
+        """
+        Find the closest stored homography for this fingerprint and resolution.
+
+        Args:
+            fingerprint: Hex fingerprint of the court background.
+            resolution: (width, height) of the frames the homography applies to.
+
+        Returns:
+            3x3 pixel-to-court homography, or None on a miss.
+        """
+        best, best_dist = None, self.max_distance + 1
+        for entry in self.entries:
+            if tuple(entry['resolution']) != tuple(resolution):
+                continue
+            dist = self.distance(fingerprint, entry['fingerprint'])
+            if dist < best_dist:
+                best, best_dist = entry, dist
+
+        if best is None:
+            return None
+
+        logger.debug(f"Calibration cache hit (distance {best_dist} bits).")
+        return np.array(best['homography'], dtype=np.float64)
+
+    def store(self, fingerprint: str, resolution: Tuple[int, int], homography: np.ndarray, confidence: float):
+        """Insert or replace the homography for a venue and persist the index."""
+        self.entries = [e for e in self.entries
+                        if not (tuple(e['resolution']) == tuple(resolution)
+                                and self.distance(fingerprint, e['fingerprint']) <= self.max_distance)]
+        self.entries.append({
+            'fingerprint': fingerprint,
+            'resolution': list(resolution),
+            'homography': np.asarray(homography).tolist(),
+            'confidence': float(confidence),
+            'updated': datetime.now().isoformat(timespec='seconds')
+        })
+        self.entries = self.entries[-self.max_entries:]
+        self._save()
+
+    def _load(self) -> List[Dict]:
+        if not os.path.exists(self.index_path):
+            return []
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable calibration cache {self.index_path}: {e}")
+            return []
+
+    def _save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial index
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.index_path)
@@ -3,20 +3,29 @@ import numpy as np
 import logging
 from typing import Tuple, List, Optional, Dict
 from src.utils.config import get_config
+from .cache import CalibrationCache
+from .motion import CameraMotionEstimator
 
 logger = logging.getLogger("badminton_cv.calibrate")
 
+# Painted court lines in world coordinates (meters).
+# Horizontal lines (constant y) ordered far-to-near, i.e. top-to-bottom in the image.
+# The net (y=6.7) is not a ground line and is deliberately excluded.
+COURT_LINES_Y = np.array([13.4, 12.64, 8.68, 4.72, 0.76, 0.0], dtype=np.float64)
+# Vertical lines (constant x) ordered left-to-right: doubles/singles sidelines.
+COURT_LINES_X = np.array([0.0, 0.46, 5.64, 6.1], dtype=np.float64)
+
 class CourtCalibrator:
     def __init__(self, config: Optional[Dict] = None):
         self._config_loader = config if config else get_config()
         self.config = self._config_loader.config if hasattr(self._config_loader, 'config') else get_config().config
-        
+
         # Standard Badminton Court Dimensions usually in meters
         # Origin at bottom-left corner of the full court (singles or doubles)
         # Full Length: 13.4m, Full Width: 6.1m (Doubles), 5.18m (Singles)
         self.court_width = 6.1
         self.court_length = 13.4
-        
+
         # Define 4 key corners for the full doubles court in global coordinates (meters)
         # Order: Top-Left, Top-Right, Bottom-Right, Bottom-Left
         self.court_corners_world = np.array([
@@ -27,81 +36,577 @@ class CourtCalibrator:
         ], dtype=np.float32)
 
         self.homography_matrix = None
+        self.confidence = 0.0
+
+        # Automatic calibration parameters
+        calib_cfg = self.config.get('calibration', {})
+        self.analysis_width = calib_cfg.get('analysis_width', 640)
+        self.sample_frames = calib_cfg.get('sample_frames', 8)
+        self.ransac_iterations = calib_cfg.get('ransac_iterations', 250)
+        self.min_confidence = calib_cfg.get('min_confidence', 0.35)
+        self.horizontal_tolerance = calib_cfg.get('horizontal_angle_tolerance', 20.0) # degrees
+        self.max_lines_per_family = calib_cfg.get('max_lines_per_family', 8)
+        self.rng = np.random.default_rng(self.config.get('system', {}).get('seed', 42))
+
+        cache_cfg = calib_cfg.get('cache', {})
+        self.cache = None
+        if cache_cfg.get('enabled', True):
+            self.cache = CalibrationCache(cache_cfg.get('dir', 'data/calibration_cache'),
+                                          max_distance=cache_cfg.get('max_distance', 6))
+
+        # Camera motion compensation for panning/zooming footage
+        motion_cfg = calib_cfg.get('motion', {})
+        self.motion_estimator = None
+        if motion_cfg.get('enabled', True):
+            self.motion_estimator = CameraMotionEstimator(analysis_width=motion_cfg.get('analysis_width', 320))
+        self.verify_interval = motion_cfg.get('verify_interval', 150) # frames
+        self.drift_pixels = motion_cfg.get('drift_pixels', 20.0)
+        self.retry_interval = motion_cfg.get('retry_interval', 30) # frames between checks after a failed re-calibration
+        self._fitted_frame = None # Frame the current homography was fitted on, until tracking starts
+        self._tracked_homography = None
+        self._reference_homography = None
+        self._camera_motion = np.eye(3) # Current frame -> reference frame pixels
+        self._verified_motion = np.eye(3)
+        self._frames_since_verify = 0
+        self._retry_wait = 0
+
+        self._model_points, self._model_offset_points = self._build_model_points(spacing=0.1)
+        self._coarse_points, _ = self._build_model_points(spacing=0.5)
+
+    def calibrate(self, frames: List[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Calibrate from the best of several candidate frames.
+
+        Frames are sampled evenly across the input, each is scored by how well
+        the fitted court model agrees with its painted lines, and the best
+        scoring homography is kept.
+
+        Args:
+            frames: List of BGR frames (e.g. the first processing chunk).
+
+        Returns:
+            Tuple[bool, np.ndarray]: Success flag and homography matrix (3x3).
+        """
+        if not frames:
+            return False, None
+
+        n_samples = min(self.sample_frames, len(frames))
+        indices = np.unique(np.linspace(0, len(frames) - 1, n_samples).astype(int))
+        resolution = (frames[0].shape[1], frames[0].shape[0])
+
+        # Fixed cameras: try the venue's stored homography before detecting lines
+        fingerprint = None
+        if self.cache is not None:
+            background = CalibrationCache.background([frames[i] for i in indices])
+            fingerprint = CalibrationCache.fingerprint(background)
+            cached = self.cache.lookup(fingerprint, resolution)
+            if cached is not None:
+                scores = [self.verify(frames[i], cached) for i in indices]
+                score = max(scores)
+                if score >= self.min_confidence:
+                    self.homography_matrix = cached
+                    self.confidence = score
+                    self._fitted_frame = frames[indices[int(np.argmax(scores))]]
+                    logger.info(f"Court calibration loaded from cache (confidence {score:.2f}).")
+                    return True, cached
+                logger.info(f"Cached calibration failed verification (confidence {score:.2f}). Re-detecting.")
+
+        best_h, best_score, best_idx = None, 0.0, -1
+        for idx in indices:
+            h, score = self._detect(frames[idx])
+            if h is not None and score > best_score:
+                best_h, best_score, best_idx = h, score, idx
+
+        if best_h is None or best_score < self.min_confidence:
+            logger.warning(f"Automatic calibration failed (best confidence {best_score:.2f}).")
+            self.confidence = best_score
+            return False, None
+
+        self.homography_matrix = best_h
+        self.confidence = best_score
+        self._fitted_frame = frames[best_idx]
+        logger.info(f"Court calibrated from frame {best_idx} (confidence {best_score:.2f}).")
+
+        if self.cache is not None:
+            self.cache.store(fingerprint, resolution, best_h, best_score)
+        return True, best_h
+
+    def verify(self, frame: np.ndarray, homography: np.ndarray) -> float:
+        """
+        Score an existing pixel-to-court homography against a frame's painted lines.
+
+        Args:
+            frame: BGR frame at the resolution the homography applies to.
+            homography: 3x3 pixel-to-court matrix.
+
+        Returns:
+            float: Confidence in [0, 1] on the same scale as detection.
+        """
+        scale = min(1.0, self.analysis_width / frame.shape[1])
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        mask = cv2.dilate(self._get_line_mask(gray), np.ones((3, 3), np.uint8)) > 0
+
+        try:
+            world_to_img = np.diag([scale, scale, 1.0]) @ np.linalg.inv(homography)
+        except np.linalg.LinAlgError:
+            return 0.0
+        return float(self._score_homographies(world_to_img[None], self._model_points, self._model_offset_points, mask)[0])
 
     def detect_court(self, frame: np.ndarray) -> Tuple[bool, Optional[np.ndarray]]:
         """
         Detect court lines and compute homography.
-        
+
         Args:
             frame: Input image frame.
-            
+
         Returns:
             Tuple[bool, np.ndarray]: Success flag and homography matrix (3x3).
         """
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        edges = self._get_edges(gray)
-        lines = self._get_lines(edges)
-        
-        if lines is None:
-            logger.warning("No lines detected.")
+        h, score = self._detect(frame)
+        self.confidence = score
+
+        if h is None or score < self.min_confidence:
+            logger.warning(f"Court detection failed (confidence {score:.2f}).")
             return False, None
-            
-        # Simplification: For robust detection in complex real videos, we need 
-        # a more sophisticated pipeline (filtering, clustering, finding intersection).
-        # For this phase, we'll implement a basic corner finding strategy or 
-        # rely on manual point inputs if auto-detect fails. 
-        # Here we mock a successful detection if we find enough lines for the verification,
-        # but in a real system we would solve for the 4 corners.
-        
-        # TODO: Implement robust line intersection to find the 4 corners.
-        # For now, we will return None to indicate auto-calibration needs more logic
-        # or manual override.
-        
-        return False, None
+
+        self.homography_matrix = h
+        self._fitted_frame = frame
+        return True, h
 
     def compute_homography_from_points(self, src_points: np.ndarray) -> np.ndarray:
         """
         Compute homography from 4 detected image points to world court corners.
-        
+
         Args:
             src_points: Array of 4 points [x, y] in image coordinates.
                         Order must match: Top-Left, Top-Right, Bottom-Right, Bottom-Left.
-                        
+
         Returns:
             homography_matrix: 3x3 matrix.
         """
         if src_points.shape != (4, 2):
             raise ValueError("src_points must be (4, 2)")
-            
+
         h, status = cv2.findHomography(src_points, self.court_corners_world)
         self.homography_matrix = h
+        self.confidence = 1.0 # Manually supplied correspondences
+        self._fitted_frame = None # Assumed to match the next tracked frame
         return h
 
+    def track(self, frame: np.ndarray) -> bool:
+        """
+        Keep the homography valid for this frame under camera motion.
+
+        Sparse features are tracked frame-to-frame and the homography is
+        updated incrementally. The fit is re-verified against the painted
+        lines every `verify_interval` frames, or sooner once the camera has
+        moved more than `drift_pixels` since the last check, and full
+        re-calibration runs only if verification fails. After a failed
+        re-calibration the next check waits `retry_interval` frames.
+
+        Args:
+            frame: Next BGR frame, in processing order.
+
+        Returns:
+            bool: True if a homography is available for this frame.
+        """
+        if self.motion_estimator is None or self.homography_matrix is None:
+            return self.homography_matrix is not None
+
+        # A new calibration (automatic, cached or manual) becomes the tracking reference,
+        # starting from the frame it was fitted on so the motion since then is applied
+        if self.homography_matrix is not self._tracked_homography:
+            reference = frame if self._fitted_frame is None else self._fitted_frame
+            self._fitted_frame = None
+            self._start_tracking(reference, self.homography_matrix)
+            if reference is frame:
+                return True
+
+        motion = self.motion_estimator.update(frame)
+        self._frames_since_verify += 1
+        if motion is not None:
+            self._camera_motion = self._camera_motion @ motion
+            self._set_tracked(self._reference_homography @ self._camera_motion)
+
+        due = motion is None or self._frames_since_verify >= self.verify_interval or self._drift(frame.shape) > self.drift_pixels
+        if due and self._frames_since_verify >= self._retry_wait:
+            self._check_drift(frame)
+        return True
+
+    def _start_tracking(self, frame: np.ndarray, homography: np.ndarray):
+        self._reference_homography = homography
+        self._camera_motion = np.eye(3)
+        self._verified_motion = np.eye(3)
+        self._frames_since_verify = 0
+        self._retry_wait = 0
+        self._set_tracked(homography)
+        self.motion_estimator.reset(frame)
+
+    def _set_tracked(self, homography: np.ndarray):
+        self.homography_matrix = homography
+        self._tracked_homography = homography
+
+    def _drift(self, shape: Tuple[int, ...]) -> float:
+        """Largest displacement (pixels) of the frame corners since the last verification."""
+        height, width = shape[:2]
+        corners = np.array([[[0, 0], [width, 0], [width, height], [0, height]]], dtype=np.float64)
+        since_verify = np.linalg.inv(self._verified_motion) @ self._camera_motion
+        moved = cv2.perspectiveTransform(corners, since_verify)
+        return float(np.linalg.norm(moved - corners, axis=2).max())
+
+    def _check_drift(self, frame: np.ndarray):
+        score = self.verify(frame, self.homography_matrix)
+        self._frames_since_verify = 0
+        self._verified_motion = self._camera_motion.copy()
+        if score >= self.min_confidence:
+            self.confidence = score
+            self._retry_wait = 0
+            return
+
+        logger.info(f"Calibration drifted (confidence {score:.2f}). Re-calibrating.")
+        h, new_score = self._detect(frame)
+        if h is not None and new_score >= self.min_confidence:
+            self.confidence = new_score
+            self._start_tracking(frame, h)
+        else:
+            self.confidence = score
+            self._retry_wait = self.retry_interval
+            logger.warning(f"Re-calibration failed (confidence {new_score:.2f}). Keeping tracked homography.")
+
     def pixel_to_court(self, point: Tuple[float, float]) -> Tuple[float, float]:
         """
         Transform pixel coordinates (x, y) to court coordinates (meters).
         """
+        x_world, y_world = self.pixels_to_court(np.asarray(point, dtype=np.float64).reshape(1, 2))[0]
+        return (float(x_world), float(y_world))
+
+    def pixels_to_court(self, points: np.ndarray) -> np.ndarray:
+        """
+        Transform a batch of pixel coordinates to court coordinates (meters).
+
+        Args:
+            points: (N, 2) array of [x, y] pixel positions.
+
+        Returns:
+            np.ndarray: (N, 2) array of [x, y] court positions. Points whose
+            projection is degenerate (scale ~ 0) map to (0, 0).
+        """
         if self.homography_matrix is None:
             raise RuntimeError("Homography not computed. Run detect_court or compute_homography_from_points first.")
-            
-        # Convert to homogeneous coordinates
-        p = np.array([point[0], point[1], 1.0]).reshape(3, 1)
-        
-        # Apply projection
-        projected = np.dot(self.homography_matrix, p)
-        
-        # Normalize
-        scale = projected[2]
-        if abs(scale) < 1e-6:
-            return (0.0, 0.0) # Avoid div by zero
-            
-        x_world = projected[0] / scale
-        y_world = projected[1] / scale
-        
-        return (float(x_world), float(y_world))
 
-    def _get_edges(self, gray: np.ndarray) -> np.ndarray:
-        return cv2.Canny(gray, 50, 150, apertureSize=3)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        h = self.homography_matrix
+
+        # Homogeneous matmul: [x, y, 1] @ H^T, written out to avoid building the padded array
+        projected = points @ h[:, :2].T + h[:, 2]
+
+        # Normalize, avoiding div by zero
+        scale = projected[:, 2:3]
+        degenerate = np.abs(scale) < 1e-6
+        court = projected[:, :2] / np.where(degenerate, 1.0, scale)
+        court[degenerate[:, 0]] = 0.0
+
+        return court
+
+    def _detect(self, frame: np.ndarray) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Run line detection and model fitting on one frame without touching state.
+
+        Returns:
+            Tuple of (pixel-to-court homography at full resolution or None, confidence).
+        """
+        scale = min(1.0, self.analysis_width / frame.shape[1])
+        if scale < 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        line_mask = self._get_line_mask(gray)
+        lines = self._get_lines(line_mask)
+
+        if lines is None or len(lines) < 4:
+            logger.debug("Not enough lines detected.")
+            return None, 0.0
+
+        horizontal, vertical = self._cluster_lines(lines.reshape(-1, 4).astype(np.float64), gray.shape)
+        if len(horizontal) < 2 or len(vertical) < 2:
+            logger.debug(f"Insufficient line families (h={len(horizontal)}, v={len(vertical)}).")
+            return None, 0.0
+
+        score_mask = cv2.dilate(line_mask, np.ones((3, 3), np.uint8)) > 0
+        world_to_img, score = self._fit_court_model(horizontal, vertical, score_mask)
+        if world_to_img is None:
+            return None, 0.0
+
+        # Invert to pixel->court and lift from analysis scale to full resolution
+        h = np.linalg.inv(world_to_img) @ np.diag([scale, scale, 1.0])
+        return h / h[2, 2], score
+
+    def _get_line_mask(self, gray: np.ndarray) -> np.ndarray:
+        """Isolate thin bright structures (painted lines) with a white top-hat."""
+        kernel_size = max(9, (gray.shape[1] // 50) | 1)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_size, kernel_size))
+        tophat = cv2.morphologyEx(gray, cv2.MORPH_TOPHAT, kernel)
+        _, mask = cv2.threshold(tophat, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return mask
 
     def _get_lines(self, edges: np.ndarray) -> Optional[np.ndarray]:
-        return cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100, minLineLength=100, maxLineGap=20)
+        width = edges.shape[1]
+        return cv2.HoughLinesP(edges, 1, np.pi/180, threshold=max(30, width // 12),
+                               minLineLength=max(20, width // 20), maxLineGap=max(5, width // 60))
+
+    def _cluster_lines(self, segments: np.ndarray, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Split Hough segments into horizontal and vertical families by orientation
+        and merge collinear segments within each family.
+
+        Args:
+            segments: (N, 4) array of [x1, y1, x2, y2].
+            shape: (height, width) of the analysed image.
+
+        Returns:
+            Tuple of (H, 3) and (V, 3) homogeneous lines, sorted top-to-bottom
+            and left-to-right respectively.
+        """
+        height, width = shape[:2]
+        d = segments[:, 2:] - segments[:, :2]
+        lengths = np.hypot(d[:, 0], d[:, 1])
+        angles = np.degrees(np.arctan2(d[:, 1], d[:, 0])) % 180.0
+        is_horizontal = (angles < self.horizontal_tolerance) | (angles > 180.0 - self.horizontal_tolerance)
+
+        # Homogeneous line through both endpoints of each segment
+        ones = np.ones((len(segments), 1))
+        lines = np.cross(np.hstack([segments[:, :2], ones]), np.hstack([segments[:, 2:], ones]))
+
+        horizontal = self._merge_family(lines[is_horizontal], segments[is_horizontal], lengths[is_horizontal],
+                                        horizontal=True, ref=width / 2.0, tol=0.01 * height)
+        vertical = self._merge_family(lines[~is_horizontal], segments[~is_horizontal], lengths[~is_horizontal],
+                                      horizontal=False, ref=height / 2.0, tol=0.01 * width)
+        return horizontal, vertical
+
+    def _merge_family(self, lines: np.ndarray, segments: np.ndarray, lengths: np.ndarray,
+                      horizontal: bool, ref: float, tol: float) -> np.ndarray:
+        """Merge segments whose intercepts at the image centre lie within `tol` pixels."""
+        if len(lines) == 0:
+            return np.empty((0, 3))
+
+        a, b, c = lines.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            keys = -(a * ref + c) / b if horizontal else -(b * ref + c) / a
+        finite = np.isfinite(keys)
+        keys, segments, lengths = keys[finite], segments[finite], lengths[finite]
+        if len(keys) == 0:
+            return np.empty((0, 3))
+
+        order = np.argsort(keys)
+        keys, segments, lengths = keys[order], segments[order], lengths[order]
+        groups = np.split(np.arange(len(keys)), np.flatnonzero(np.diff(keys) > tol) + 1)
+
+        merged = np.array([self._fit_line(segments[g].reshape(-1, 2)) for g in groups])
+        support = np.array([lengths[g].sum() for g in groups])
+
+        # Keep the best-supported lines, preserving their spatial order
+        if len(merged) > self.max_lines_per_family:
+            merged = merged[np.sort(np.argsort(support)[-self.max_lines_per_family:])]
+        return merged
+
+    @staticmethod
+    def _fit_line(points: np.ndarray) -> np.ndarray:
+        """Total least squares line through points, as homogeneous [a, b, c]."""
+        centroid = points.mean(axis=0)
+        _, _, vt = np.linalg.svd(points - centroid)
+        normal = np.array([-vt[0, 1], vt[0, 0]])
+        return np.array([normal[0], normal[1], -normal @ centroid])
+
+    def _fit_court_model(self, horizontal: np.ndarray, vertical: np.ndarray,
+                         mask: np.ndarray) -> Tuple[Optional[np.ndarray], float]:
+        """
+        RANSAC over line correspondences: pick two image lines of each family,
+        assign them to two model lines, and score the implied homography by
+        how well the projected court model overlays the line mask.
+
+        Returns:
+            Tuple of (world-to-image homography or None, score in [0, 1]).
+        """
+        # Pairwise intersections of every horizontal with every vertical line
+        pts = np.cross(horizontal[:, None, :], vertical[None, :, :])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corners = pts[..., :2] / pts[..., 2:3]
+
+        img_idx, model_idx = self._build_hypotheses(len(horizontal), len(vertical))
+        hi, hj, vk, vl = img_idx.T
+        dst = np.stack([corners[hi, vk], corners[hi, vl], corners[hj, vl], corners[hj, vk]], axis=1)
+        ya, yb = COURT_LINES_Y[model_idx[:, 0]], COURT_LINES_Y[model_idx[:, 1]]
+        xc, xd = COURT_LINES_X[model_idx[:, 2]], COURT_LINES_X[model_idx[:, 3]]
+        src = np.stack([np.column_stack([xc, ya]), np.column_stack([xd, ya]),
+                        np.column_stack([xd, yb]), np.column_stack([xc, yb])], axis=1)
+
+        homographies = self._batch_perspective(src, dst)
+        if len(homographies) == 0:
+            return None, 0.0
+
+        # Coarse on-line support for every hypothesis, full scoring of the front runners
+        coarse = self._mask_hits(homographies, self._coarse_points, mask)
+        top = np.argsort(coarse)[-20:]
+        fine = self._score_homographies(homographies[top], self._model_points, self._model_offset_points, mask)
+        best = int(np.argmax(fine))
+        best_h, best_score = homographies[top[best]], float(fine[best])
+
+        refined = self._refine(best_h, corners, mask.shape)
+        if refined is not None:
+            refined_score = float(self._score_homographies(refined[None], self._model_points,
+                                                           self._model_offset_points, mask)[0])
+            if refined_score >= best_score:
+                best_h, best_score = refined, refined_score
+
+        return best_h, best_score
+
+    def _build_hypotheses(self, nh: int, nv: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build (K, 4) image line indices (h_i, h_j, v_k, v_l) and matching
+        (K, 4) model line indices.
+
+        The outermost detected lines (and their neighbours) are usually the
+        court boundary, so every model assignment is tried for them; random
+        samples over all detected lines cover the remaining cases.
+        """
+        def boundary_pairs(n):
+            firsts, lasts = {0, min(1, n - 2)}, {max(n - 2, 1), n - 1}
+            return np.array([(i, j) for i in firsts for j in lasts if i < j])
+
+        def all_pairs(n):
+            i, j = np.triu_indices(n, k=1)
+            return np.column_stack([i, j])
+
+        img_pairs = self._product(boundary_pairs(nh), boundary_pairs(nv))
+        model_pairs = self._product(all_pairs(len(COURT_LINES_Y)), all_pairs(len(COURT_LINES_X)))
+        exhaustive_img = np.repeat(img_pairs, len(model_pairs), axis=0)
+        exhaustive_model = np.tile(model_pairs, (len(img_pairs), 1))
+
+        n = self.ransac_iterations
+        random_img = np.hstack([self._sample_pairs(nh, n), self._sample_pairs(nv, n)])
+        random_model = np.hstack([self._sample_pairs(len(COURT_LINES_Y), n), self._sample_pairs(len(COURT_LINES_X), n)])
+
+        return np.vstack([exhaustive_img, random_img]), np.vstack([exhaustive_model, random_model])
+
+    @staticmethod
+    def _product(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Row-wise cartesian product of two 2D arrays."""
+        return np.hstack([np.repeat(a, len(b), axis=0), np.tile(b, (len(a), 1))])
+
+    def _sample_pairs(self, n: int, count: int) -> np.ndarray:
+        """Draw `count` ordered pairs (i < j) of distinct indices from range(n)."""
+        pairs = self.rng.random((count, n)).argsort(axis=1)[:, :2]
+        return np.sort(pairs, axis=1)
+
+    @staticmethod
+    def _batch_perspective(src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        """
+        Solve K four-point homographies at once (batched DLT).
+
+        Args:
+            src: (K, 4, 2) source points.
+            dst: (K, 4, 2) destination points.
+
+        Returns:
+            (M, 3, 3) homographies for the M non-degenerate hypotheses.
+        """
+        # The court must project to a non-degenerate convex quadrilateral
+        finite = np.all(np.isfinite(dst), axis=(1, 2))
+        dst = np.where(finite[:, None, None], dst, 0.0)
+        edges = np.roll(dst, -1, axis=1) - dst
+        turns = edges[:, :, 0] * np.roll(edges, -1, axis=1)[:, :, 1] - edges[:, :, 1] * np.roll(edges, -1, axis=1)[:, :, 0]
+        convex = np.all(turns > 1.0, axis=1) | np.all(turns < -1.0, axis=1)
+        src, dst = src[finite & convex], dst[finite & convex]
+        k = len(src)
+        x, y = src[..., 0], src[..., 1]
+        u, v = dst[..., 0], dst[..., 1]
+        zeros, ones = np.zeros_like(x), np.ones_like(x)
+
+        a = np.empty((k, 8, 8))
+        a[:, 0::2] = np.stack([x, y, ones, zeros, zeros, zeros, -u * x, -u * y], axis=-1)
+        a[:, 1::2] = np.stack([zeros, zeros, zeros, x, y, ones, -v * x, -v * y], axis=-1)
+        b = np.empty((k, 8))
+        b[:, 0::2], b[:, 1::2] = u, v
+
+        params = np.linalg.solve(a, b[..., None])[..., 0]
+        return np.concatenate([params, np.ones((len(params), 1))], axis=1).reshape(-1, 3, 3)
+
+    def _score_homographies(self, homographies: np.ndarray, points: np.ndarray,
+                            offset_points: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """
+        Score (K, 3, 3) world-to-image homographies against a boolean line mask.
+
+        Score is the fraction of model line samples landing on painted lines,
+        minus the fraction of samples just beside the lines that do, so that
+        large bright regions do not score well.
+        """
+        on_hits = self._mask_hits(homographies, points, mask)
+        off_hits = self._mask_hits(homographies, offset_points, mask)
+        return np.clip(on_hits - off_hits, 0.0, 1.0)
+
+    @staticmethod
+    def _mask_hits(homographies: np.ndarray, world_points: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        # Single GEMM over all hypotheses: (K*3, 3) @ (3, P) -> (K, 3, P)
+        proj = (homographies.reshape(-1, 3).astype(np.float32) @ world_points.T.astype(np.float32))
+        proj = proj.reshape(len(homographies), 3, -1)
+        w = proj[:, 2]
+        valid = np.abs(w) > 1e-9
+        w = np.where(valid, w, 1.0)
+        x = np.floor(proj[:, 0] / w + 0.5)
+        y = np.floor(proj[:, 1] / w + 0.5)
+        height, width = mask.shape
+        inside = valid & (x >= 0) & (x < width) & (y >= 0) & (y < height)
+
+        # Flat gather; out-of-image samples read pixel 0 and are masked out
+        flat_idx = np.where(inside, y * width + x, 0).astype(np.intp)
+        hits = mask.ravel()[flat_idx] & inside
+        return hits.mean(axis=1)
+
+    def _refine(self, homography: np.ndarray, corners: np.ndarray, shape: Tuple[int, int]) -> Optional[np.ndarray]:
+        """Re-fit the homography on every model intersection matched to a detected one."""
+        grid_x, grid_y = np.meshgrid(COURT_LINES_X, COURT_LINES_Y)
+        model = np.column_stack([grid_x.ravel(), grid_y.ravel(), np.ones(grid_x.size)])
+        proj = model @ homography.T
+        proj = proj[:, :2] / proj[:, 2:3]
+
+        detected = corners.reshape(-1, 2)
+        detected = detected[np.all(np.isfinite(detected), axis=1)]
+        if len(detected) < 4:
+            return None
+
+        dists = np.linalg.norm(proj[:, None, :] - detected[None, :, :], axis=2)
+        nearest = dists.argmin(axis=1)
+        matched = dists[np.arange(len(proj)), nearest] < 0.02 * shape[1]
+        if matched.sum() < 5:
+            return None
+
+        h, _ = cv2.findHomography(model[matched, :2], detected[nearest[matched]], 0)
+        return h
+
+    def _build_model_points(self, spacing: float = 0.1, offset: float = 0.2) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sample points along every painted court line, plus the same samples
+        shifted sideways by `offset` meters on both sides of each line.
+
+        Returns:
+            Tuple of (P, 3) homogeneous on-line points and (2P, 3) offset points.
+        """
+        on, off = [], []
+        xs = np.arange(0.0, self.court_width + 1e-9, spacing)
+        for y in COURT_LINES_Y:
+            on.append(np.column_stack([xs, np.full_like(xs, y)]))
+            off.append(np.column_stack([np.concatenate([xs, xs]), np.concatenate([np.full_like(xs, y - offset), np.full_like(xs, y + offset)])]))
+
+        ys = np.arange(0.0, self.court_length + 1e-9, spacing)
+        center_x = self.court_width / 2.0
+        center_ys = ys[(ys <= COURT_LINES_Y[3]) | (ys >= COURT_LINES_Y[2])] # Centre line stops at the short service lines
+        for x, line_ys in [(x, ys) for x in COURT_LINES_X] + [(center_x, center_ys)]:
+            on.append(np.column_stack([np.full_like(line_ys, x), line_ys]))
+            off.append(np.column_stack([np.concatenate([np.full_like(line_ys, x - offset), np.full_like(line_ys, x + offset)]), np.concatenate([line_ys, line_ys])]))
+
+        on = np.vstack(on)
+        off = np.vstack(off)
+        return np.hstack([on, np.ones((len(on), 1))]), np.hstack([off, np.ones((len(off), 1))])
@@ -0,0 +1,90 @@
+import cv2
+import logging
+import numpy as np
+from typing import Optional
+
+logger = logging.getLogger("badminton_cv.calibrate")
+
+class CameraMotionEstimator:
+    """
+    Frame-to-frame camera motion from sparse features tracked at low resolution.
+
+    Estimates the homography mapping pixels of the current frame onto the
+    previous one, so a court calibration can follow pan/tilt/zoom without
+    re-detecting lines every frame.
+    """
+
+    def __init__(self, analysis_width: int = 320, max_features: int = 200, min_features: int = 40,
+                 static_threshold: float = 0.25, min_inlier_ratio: float = 0.5):
+        """
+        Args:
+            analysis_width: Frames are downscaled to this width before tracking.
+            max_features: Corners detected when (re)seeding features.
+            min_features: Re-seed when fewer tracked features survive.
+            static_threshold: Median flow (analysis pixels) below which the camera is considered still.
+            min_inlier_ratio: Minimum RANSAC inlier fraction for a motion estimate to be trusted.
+        """
+        self.analysis_width = analysis_width
+        self.max_features = max_features
+        self.min_features = min_features
+        self.static_threshold = static_threshold
+        self.min_inlier_ratio = min_inlier_ratio
+
+        self.prev_gray = None
+        self.prev_points = None
+        self.scale = 1.0
+
+    def reset(self, frame: np.ndarray):
+        """Start tracking from this frame."""
+        self.prev_gray = self._prepare(frame)
+        self.prev_points = self._seed(self.prev_gray)
+
+    def update(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Estimate motion from the previous frame to this one.
+
+        Args:
+            frame: Next BGR frame (full resolution).
+
+        Returns:
+            3x3 homography mapping current-frame pixels to previous-frame pixels
+            (full resolution), or None if tracking failed.
+        """
+        gray = self._prepare(frame)
+        if self.prev_gray is None or self.prev_points is None or len(self.prev_points) < 4:
+            self.prev_gray, self.prev_points = gray, self._seed(gray)
+            return None
+
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.prev_points, None,
+                                                     winSize=(15, 15), maxLevel=2)
+        tracked = status.ravel() == 1
+        prev_pts, cur_pts = self.prev_points[tracked], points[tracked]
+
+        motion = None
+        if len(cur_pts) >= 4:
+            flow = np.linalg.norm((cur_pts - prev_pts).reshape(-1, 2), axis=1)
+            if np.median(flow) < self.static_threshold:
+                motion = np.eye(3) # Camera still: skip the homography fit
+            else:
+                h, inliers = cv2.findHomography(cur_pts, prev_pts, cv2.RANSAC, 2.0)
+                if h is not None and inliers.mean() >= self.min_inlier_ratio:
+                    # Lift from analysis resolution: H_full = S^-1 H_small S
+                    s = np.diag([self.scale, self.scale, 1.0])
+                    motion = np.linalg.inv(s) @ h @ s
+                else:
+                    logger.debug("Camera motion estimate rejected (too few inliers).")
+
+        self.prev_gray = gray
+        self.prev_points = cur_pts.reshape(-1, 1, 2) if len(cur_pts) >= self.min_features else self._seed(gray)
+        return motion
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        self.scale = min(1.0, self.analysis_width / frame.shape[1])
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if self.scale < 1.0:
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _seed(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        points = cv2.goodFeaturesToTrack(gray, maxCorners=self.max_features, qualityLevel=0.01, minDistance=7)
+        return points.astype(np.float32) if points is not None else None
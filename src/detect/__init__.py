@@ -1 +1,2 @@
 from .detector import BadmintonDetector
+from .shuttle import ShuttleDetector
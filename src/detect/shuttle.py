@@ -0,0 +1,163 @@
+import logging
+import cv2
+import numpy as np
+from typing import List, Dict, Optional, Any
+from src.utils.config import get_config
+
+logger = logging.getLogger("badminton_cv.detect")
+
+class ShuttleDetector:
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Initialize the ShuttleDetector.
+
+        Classical fast path for the shuttle: a running-average background
+        model and three-frame differencing at reduced resolution produce a
+        handful of small moving blobs per frame, and a lightweight verifier
+        (brightness, size and constant-velocity consistency) picks one.
+        """
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        shuttle_cfg = self.config.get('detection', {}).get('shuttle', {})
+        self.analysis_width = shuttle_cfg.get('analysis_width', 640)
+        self.diff_threshold = shuttle_cfg.get('diff_threshold', 20)
+        self.min_area = shuttle_cfg.get('min_area', 2) # pixels at analysis resolution
+        self.max_area = shuttle_cfg.get('max_area', 60)
+        self.max_aspect = shuttle_cfg.get('max_aspect', 6.0) # motion blur elongates the shuttle
+        self.min_brightness = shuttle_cfg.get('min_brightness', 140)
+        self.max_candidates = shuttle_cfg.get('max_candidates', 5)
+        self.gate_radius = shuttle_cfg.get('gate_radius', 40.0) # pixels at analysis resolution
+        self.min_score = shuttle_cfg.get('min_score', 0.3)
+        self.background_rate = shuttle_cfg.get('background_rate', 0.05)
+
+        self.reset()
+
+    def reset(self):
+        """Forget background and trajectory state (e.g. between videos)."""
+        self._history = [] # Last two grayscale frames
+        self._background = None
+        self._track = [] # Last two accepted positions (analysis resolution)
+        self._missed = 0
+
+    def detect(self, frame: np.ndarray, active: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Detect the shuttle in the next frame of a sequence.
+
+        Args:
+            frame: BGR image, in processing order.
+            active: If False only the background state is updated (e.g. outside
+                    audio rally windows) and None is returned.
+
+        Returns:
+            Dict with 'pos' (x, y) and 'box' [x1, y1, x2, y2] in frame pixels
+            and 'score', or None if no candidate was verified.
+        """
+        scale = min(1.0, self.analysis_width / frame.shape[1])
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        candidates = self.candidates(gray) if active else np.zeros((0, 7))
+        self._update_state(gray)
+        if len(candidates) == 0:
+            self._miss()
+            return None
+
+        scores = self._verify(candidates)
+        best = int(np.argmax(scores))
+        if scores[best] < self.min_score:
+            self._miss()
+            return None
+
+        cx, cy, x, y, w, h, _ = candidates[best]
+        self._track = (self._track + [(cx, cy)])[-2:]
+        self._missed = 0
+        return {
+            'pos': (float(cx / scale), float(cy / scale)),
+            'box': [float(x / scale), float(y / scale), float((x + w) / scale), float((y + h) / scale)],
+            'score': float(scores[best])
+        }
+
+    def detect_batch(self, frames: List[np.ndarray], active: Optional[np.ndarray] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        Run detection over consecutive frames.
+
+        Args:
+            frames: List of BGR images in order.
+            active: Optional (N,) mask of frames to search; others only update state.
+
+        Returns:
+            List of detection dicts (or None) per frame.
+        """
+        if active is None:
+            active = np.ones(len(frames), dtype=bool)
+        return [self.detect(frame, bool(a)) for frame, a in zip(frames, active)]
+
+    def candidates(self, gray: np.ndarray) -> np.ndarray:
+        """
+        Small moving blobs in a grayscale analysis frame.
+
+        Returns:
+            np.ndarray: (K, 7) rows of [cx, cy, x, y, w, h, peak_brightness],
+            at most `max_candidates`, brightest first.
+        """
+        if len(self._history) < 2:
+            return np.zeros((0, 7))
+
+        # Pixels that differ from both previous frames are where an object is now
+        # (not where it was); the background term suppresses flicker on static areas.
+        prev2, prev1 = self._history
+        moving = (cv2.absdiff(gray, prev1) > self.diff_threshold) & (cv2.absdiff(gray, prev2) > self.diff_threshold)
+        foreground = cv2.absdiff(gray, cv2.convertScaleAbs(self._background)) > self.diff_threshold
+        mask = cv2.dilate((moving & foreground).astype(np.uint8), np.ones((3, 3), np.uint8))
+
+        n, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if n <= 1:
+            return np.zeros((0, 7))
+
+        stats, centroids = stats[1:], centroids[1:] # Drop the background label
+        w, h, area = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT], stats[:, cv2.CC_STAT_AREA]
+        aspect = np.maximum(w, h) / np.maximum(np.minimum(w, h), 1)
+        keep = (area >= self.min_area) & (area <= self.max_area) & (aspect <= self.max_aspect)
+        if not keep.any():
+            return np.zeros((0, 7))
+
+        # Peak brightness per kept blob (the shuttle is white), read from its bounding box only
+        kept_labels = np.flatnonzero(keep) + 1
+        peak = np.array([
+            gray[y:y + h, x:x + w][labels[y:y + h, x:x + w] == label].max()
+            for label, (x, y, w, h) in zip(kept_labels, stats[keep, :4])
+        ], dtype=np.float64)
+        rows = np.column_stack([centroids[keep], stats[keep, :4], peak])
+
+        rows = rows[rows[:, 6] >= self.min_brightness]
+        return rows[np.argsort(-rows[:, 6])][:self.max_candidates]
+
+    def _verify(self, candidates: np.ndarray) -> np.ndarray:
+        """Score candidates by brightness and agreement with a constant-velocity prediction."""
+        brightness = (candidates[:, 6] - self.min_brightness) / max(255.0 - self.min_brightness, 1.0)
+        score = 0.5 + 0.5 * np.clip(brightness, 0.0, 1.0)
+
+        if self._track:
+            if len(self._track) == 2:
+                (x0, y0), (x1, y1) = self._track
+                predicted = np.array([2 * x1 - x0, 2 * y1 - y0])
+            else:
+                predicted = np.array(self._track[-1])
+            # Widen the gate while the shuttle is missing
+            radius = self.gate_radius * (1 + self._missed)
+            dist = np.linalg.norm(candidates[:, :2] - predicted, axis=1)
+            score = score * np.exp(-(dist / radius) ** 2)
+        return score
+
+    def _update_state(self, gray: np.ndarray):
+        self._history = (self._history + [gray])[-2:]
+        if self._background is None:
+            self._background = gray.astype(np.float32)
+        else:
+            cv2.accumulateWeighted(gray, self._background, self.background_rate)
+
+    def _miss(self):
+        self._missed += 1
+        if self._missed > 5:
+            self._track = [] # Lost: re-acquire anywhere
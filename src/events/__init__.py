@@ -1 +1,3 @@
 from .detector import EventDetector
+from .engine import OfflineEventEngine
+from .shots import ShotSegmenter, classify_shots
@@ -2,6 +2,7 @@ import logging
 import numpy as np
 from typing import List, Dict, Optional, Any, Tuple
 from src.utils.config import get_config
+from .shots import classify_shots
 
 logger = logging.getLogger("badminton_cv.events")
 
@@ -13,12 +14,22 @@ class EventDetector:
         self._config_config = config if config else get_config()
         self.config = self._config_config.config if hasattr(self._config_config, 'config') else self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
         
-        self.min_rally_duration = self.config.get('events.min_rally_duration', 3.0)
-        self.smash_thresh = self.config.get('events.smash_speed_threshold', 150.0)
+        events_cfg = self.config.get('events', {})
+        self.min_rally_duration = events_cfg.get('min_rally_duration', 3.0)
+        self.smash_thresh = events_cfg.get('smash_speed_threshold', 150.0)
+        self.clear_height = events_cfg.get('clear_height_threshold', 4.0)
+        self.max_gap = events_cfg.get('max_gap', 0.0) # seconds without shuttle bridged inside a rally
         
-        self.current_rally = []
+        # Streaming state: O(1) per frame, only the open rally's bounds are kept
+        self._rally_start = None # (frame_idx, timestamp)
+        self._rally_last = None  # (frame_idx, timestamp) of the last shuttle sighting
         self.rallies = []
         
+    @property
+    def in_rally(self) -> bool:
+        """Whether a rally is currently open."""
+        return self._rally_start is not None
+        
     def update(self, frame_data: Dict[str, Any]):
         """
         Process a single frame's data to detect events.
@@ -26,31 +37,46 @@ class EventDetector:
         Args:
             frame_data: Dict containing 'frame_idx', 'timestamp', 'shuttle_pos', 'shuttle_speed' (if avail)
         """
-        # Simplistic rally detection: 
+        # Streaming rally detection:
         # If shuttle is detected/moving, we are in a rally.
-        # If no shuttle for N frames, rally ends.
+        # If no shuttle for more than max_gap seconds, rally ends.
+        # OfflineEventEngine applies the same rules to whole-match arrays.
         
         has_shuttle = frame_data.get('shuttle_pos') is not None
+        timestamp = frame_data['timestamp']
         
         if has_shuttle:
-            self.current_rally.append(frame_data)
-        else:
-            if len(self.current_rally) > 0:
-                # Rally might have ended. Check duration.
-                start_time = self.current_rally[0]['timestamp']
-                end_time = self.current_rally[-1]['timestamp']
-                duration = end_time - start_time
-                
-                if duration >= self.min_rally_duration:
-                    self.rallies.append({
-                        'start_frame': self.current_rally[0]['frame_idx'],
-                        'end_frame': self.current_rally[-1]['frame_idx'],
-                        'duration': duration,
-                        'shot_count': 0 # To be computed
-                    })
-                    logger.info(f"Rally detected: {duration:.2f}s")
-                
-                self.current_rally = []
+            sighting = (frame_data['frame_idx'], timestamp)
+            if self._rally_start is None:
+                self._rally_start = sighting
+            self._rally_last = sighting
+        elif self._rally_last is not None and timestamp - self._rally_last[1] > self.max_gap:
+            self._close_rally()
+            
+    def finalize(self):
+        """Close any rally still open at the end of the video."""
+        self._close_rally()
+        
+    def _close_rally(self):
+        if self._rally_start is None:
+            return
+            
+        # Rally might have ended. Check duration.
+        start_frame, start_time = self._rally_start
+        end_frame, end_time = self._rally_last
+        duration = end_time - start_time
+        
+        if duration >= self.min_rally_duration:
+            self.rallies.append({
+                'start_frame': start_frame,
+                'end_frame': end_frame,
+                'duration': duration,
+                'shot_count': 0 # To be computed
+            })
+            logger.info(f"Rally detected: {duration:.2f}s")
+            
+        self._rally_start = None
+        self._rally_last = None
 
     def classify_shot(self, shot_features: Dict[str, float]) -> str:
         """
@@ -62,19 +88,23 @@ class EventDetector:
         Returns:
             str: Shot type (Smash, Clear, Drop, Net, Serve, Drive)
         """
-        speed = shot_features.get('max_speed', 0.0)
-        height = shot_features.get('max_height', 0.0)
-        angle = shot_features.get('angle', 0.0) # Angle of descent. +90 is vertical down.
-        
-        # Heuristics
-        if speed > self.smash_thresh and angle > 10:
-            return "Smash"
-        elif height > 4.0: # High arc
-            return "Clear" # or Lift
-        elif speed < 80.0 and angle > 30:
-            return "Drop"
-        elif speed > 100.0 and abs(angle) < 10:
-             return "Drive"
-        else:
-            return "Unclassified" # Net shot, etc.
+        batch = {k: np.array([shot_features.get(k, 0.0)]) for k in ('max_speed', 'max_height', 'angle')}
+        return str(self.classify_shots(batch)[0])
 
+    def classify_shots(self, shot_features: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Classify a batch of shots based on feature arrays.
+        
+        Args:
+            shot_features: Dict of (S,) arrays 'max_speed', 'max_height', 'angle'.
+            
+        Returns:
+            np.ndarray: (S,) shot types (Smash, Clear, Drop, Drive, Unclassified)
+        """
+        n = len(next(iter(shot_features.values()), []))
+        return classify_shots(
+            shot_features.get('max_speed', np.zeros(n)),
+            shot_features.get('max_height', np.zeros(n)),
+            shot_features.get('angle', np.zeros(n)), # Angle of descent. +90 is vertical down.
+            self.smash_thresh, self.clear_height
+        )
@@ -0,0 +1,181 @@
+import logging
+import numpy as np
+from typing import List, Dict, Optional, Any
+from src.utils.config import get_config
+from src.utils.arrays import find_runs, merge_runs
+from .shots import ShotSegmenter
+
+logger = logging.getLogger("badminton_cv.events")
+
+class OfflineEventEngine:
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Initialize the OfflineEventEngine.
+
+        Works on whole-match columnar arrays instead of per-frame dicts, so
+        rallies, hits and landings are found with vectorized run-length and
+        gap logic.
+        """
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        events_cfg = self.config.get('events', {})
+        self.min_rally_duration = events_cfg.get('min_rally_duration', 3.0)
+        self.max_gap = events_cfg.get('max_gap', 0.0) # seconds without shuttle bridged inside a rally
+        self.min_hit_interval = events_cfg.get('min_hit_interval', 0.3) # seconds
+        self.min_shuttle_speed = events_cfg.get('min_direction_speed_mps', 1.0) # m/s along the court length
+        self.audio_tolerance = events_cfg.get('audio_hit_tolerance', 0.15) # seconds
+        self.shot_segmenter = ShotSegmenter(self._config_config)
+
+    def process(self, timestamps: np.ndarray, shuttle_positions: np.ndarray, visible: Optional[np.ndarray] = None,
+                frame_indices: Optional[np.ndarray] = None, axis: int = 1,
+                players: Optional[Dict[str, np.ndarray]] = None, heights: Optional[np.ndarray] = None,
+                audio_onsets: Optional[np.ndarray] = None,
+                swing: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+        """
+        Detect rallies, hits and landings for a whole match.
+
+        Args:
+            timestamps: (N,) frame times in seconds.
+            shuttle_positions: (N, 2) shuttle court positions in meters; NaN where unknown.
+                               Speed thresholds (`min_direction_speed_mps`) assume meters.
+            visible: Optional (N,) mask of frames where the shuttle was detected.
+                     Defaults to rows of shuttle_positions that are finite.
+            frame_indices: Optional (N,) frame indices. Defaults to arange(N).
+            axis: Position column the shuttle travels along between players
+                  (1: court length).
+            players: Optional columnar player court positions ('frame', 'track_id', 'x', 'y')
+                     for hit validation and shot attribution.
+            heights: Optional (N,) shuttle height in meters for shot features; without it
+                     shots are classified from court-plane speed and flight time.
+            audio_onsets: Optional sorted hit onset times (s) from AudioAnalyzer, an
+                          independent signal used to confirm each shot.
+            swing: Optional columnar arm-swing speeds ('frame', 'track_id', 'swing_speed')
+                   passed to shot classification.
+
+        Returns:
+            Dict with 'rallies' (list of rally dicts, same schema as EventDetector.rallies
+            plus per-shot records), 'hits' (frame indices), 'landings' ((R, 2) last
+            shuttle position per rally) and 'shots' (columnar per-shot arrays).
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        positions = np.asarray(shuttle_positions, dtype=np.float64).reshape(-1, 2)
+        if visible is None:
+            visible = np.all(np.isfinite(positions), axis=1)
+        visible = np.asarray(visible, dtype=bool)
+        frames = np.arange(len(timestamps)) if frame_indices is None else np.asarray(frame_indices)
+
+        starts, ends = self.find_rallies(timestamps, visible)
+        hit_idx = self.find_hits(timestamps, positions, visible, starts, ends, axis=axis)
+
+        shots = self.shot_segmenter.segment(timestamps, positions, visible, hit_idx, starts, ends,
+                                            frames, players=players, heights=heights, swing=swing)
+        shots['audio_confirmed'] = self._confirm_with_audio(timestamps[shots['start'].astype(int)], audio_onsets)
+        shot_rally = shots['rally'].astype(int)
+        shot_counts = np.bincount(shot_rally, minlength=len(starts))
+        landings = positions[ends - 1] if len(ends) else np.empty((0, 2))
+
+        # Per-shot records, grouped by rally via the (sorted) rally column
+        shot_records = [{
+            'frame': int(frames[st]),
+            'time': float(timestamps[st]),
+            'end_frame': int(frames[en - 1]),
+            'player_id': int(pid),
+            'max_speed': float(sp),
+            'max_height': float(ht),
+            'angle': float(an),
+            'swing_speed': float(sw),
+            'type': str(ty),
+            'audio_confirmed': bool(ac)
+        } for st, en, pid, sp, ht, an, sw, ty, ac in zip(shots['start'], shots['end'], shots['player_id'], shots['max_speed'],
+                                                         shots['max_height'], shots['angle'], shots['swing_speed'],
+                                                         shots['type'], shots['audio_confirmed'])]
+        bounds = np.concatenate([[0], np.cumsum(shot_counts)])
+
+        rallies = [{
+            'start_frame': int(frames[s]),
+            'end_frame': int(frames[e - 1]),
+            'duration': float(timestamps[e - 1] - timestamps[s]),
+            'shot_count': int(shot_counts[r]),
+            'landing': (float(landings[r][0]), float(landings[r][1])),
+            'shots': shot_records[bounds[r]:bounds[r + 1]]
+        } for r, (s, e) in enumerate(zip(starts, ends))]
+
+        logger.info(f"Offline event detection: {len(rallies)} rallies, {len(shot_records)} shots.")
+        return {
+            'rallies': rallies,
+            'hits': frames[np.setdiff1d(shots['start'].astype(int), starts)],
+            'landings': landings,
+            'shots': shots
+        }
+
+    def find_rallies(self, timestamps: np.ndarray, visible: np.ndarray):
+        """
+        Rallies are runs of visible shuttle, with gaps up to `max_gap` bridged,
+        lasting at least `min_rally_duration`.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Start and exclusive end indices.
+        """
+        starts, ends = find_runs(visible)
+        starts, ends = merge_runs(starts, ends, timestamps, self.max_gap)
+        if len(starts) == 0:
+            return starts, ends
+
+        durations = timestamps[ends - 1] - timestamps[starts]
+        keep = durations >= self.min_rally_duration
+        return starts[keep], ends[keep]
+
+    def find_hits(self, timestamps: np.ndarray, positions: np.ndarray, visible: np.ndarray,
+                  starts: np.ndarray, ends: np.ndarray, axis: int = 1) -> np.ndarray:
+        """
+        Hits are reversals of shuttle direction along `axis` inside a rally.
+
+        Returns:
+            np.ndarray: Sorted sample indices where a new shot starts.
+        """
+        n = len(timestamps)
+        if n < 3 or len(starts) == 0:
+            return np.zeros(0, dtype=int)
+
+        # Rally id per sample (-1 outside rallies)
+        sample = np.arange(n)
+        rally_id = np.searchsorted(starts, sample, side='right') - 1
+        inside = (rally_id >= 0) & (sample < ends[np.maximum(rally_id, 0)])
+        rally_id[~inside] = -1
+
+        # Velocity between consecutive visible samples of the same rally
+        idx = np.flatnonzero(visible & inside)
+        if len(idx) < 3:
+            return np.zeros(0, dtype=int)
+        dt = np.diff(timestamps[idx])
+        dp = np.diff(positions[idx, axis])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            velocity = np.where(dt > 0, dp / dt, 0.0)
+        same_rally = rally_id[idx[1:]] == rally_id[idx[:-1]]
+        direction = np.where(same_rally & (np.abs(velocity) >= self.min_shuttle_speed), np.sign(velocity), 0)
+
+        # Reversal: direction differs from the previous non-zero direction in the same rally
+        moving = np.flatnonzero(direction != 0)
+        if len(moving) < 2:
+            return np.zeros(0, dtype=int)
+        flips = (direction[moving[1:]] != direction[moving[:-1]]) & \
+                (rally_id[idx[moving[1:]]] == rally_id[idx[moving[:-1]]])
+        hits = idx[moving[1:][flips]] # First sample of the new direction
+
+        # Suppress jitter: drop hits too close to the previous candidate
+        if len(hits) > 1:
+            keep = np.concatenate([[True], np.diff(timestamps[hits]) >= self.min_hit_interval])
+            hits = hits[keep]
+        return hits
+
+    def _confirm_with_audio(self, shot_times: np.ndarray, onsets: Optional[np.ndarray]) -> np.ndarray:
+        """Whether an audio onset lies within `audio_tolerance` of each shot start."""
+        if onsets is None or len(onsets) == 0 or len(shot_times) == 0:
+            return np.zeros(len(shot_times), dtype=bool)
+
+        onsets = np.asarray(onsets, dtype=np.float64)
+        right = np.clip(np.searchsorted(onsets, shot_times), 0, len(onsets) - 1)
+        left = np.clip(right - 1, 0, len(onsets) - 1)
+        nearest = np.minimum(np.abs(onsets[right] - shot_times), np.abs(onsets[left] - shot_times))
+        return nearest <= self.audio_tolerance
@@ -0,0 +1,244 @@
+import logging
+import numpy as np
+from typing import Dict, Optional, Tuple
+from src.utils.config import get_config
+
+logger = logging.getLogger("badminton_cv.events")
+
+def classify_shots(max_speed: np.ndarray, max_height: np.ndarray, angle: np.ndarray,
+                   smash_thresh: float = 150.0, clear_height: float = 4.0,
+                   swing_speed: Optional[np.ndarray] = None, smash_swing: float = 12.0,
+                   flight_time: Optional[np.ndarray] = None, clear_flight_time: float = 1.4) -> np.ndarray:
+    """
+    Classify a batch of shots with the heuristic rules used by EventDetector.
+
+    Height and angle are NaN when the shuttle height is unknown (monocular
+    video); the rules then fall back to speed and flight time in the court
+    plane instead of failing every height test.
+
+    Args:
+        max_speed: (S,) peak shuttle speed per shot in km/h.
+        max_height: (S,) peak shuttle height per shot in meters (NaN if unknown).
+        angle: (S,) angle of descent in degrees (+90 is vertical down, NaN if unknown).
+        smash_thresh: Speed above which a steep shot is a smash.
+        clear_height: Height above which a shot is a clear (or lift).
+        swing_speed: Optional (S,) peak arm-swing speed of the hitter (torso lengths/s,
+                     NaN if unknown). A fast swing marks a steep shot as a smash even
+                     when shuttle speed is underestimated, and rules out a drop.
+        smash_swing: Swing speed above which a steep shot is a smash.
+        flight_time: Optional (S,) seconds from hit to the shot's last sample.
+        clear_flight_time: Without heights, a fast shot in the air longer than this is a clear.
+
+    Returns:
+        np.ndarray: (S,) shot type strings (Smash, Clear, Drop, Drive, Unclassified).
+    """
+    max_speed = np.asarray(max_speed, dtype=np.float64)
+    max_height = np.asarray(max_height, dtype=np.float64)
+    angle = np.asarray(angle, dtype=np.float64)
+    fast_swing = np.zeros(len(angle), dtype=bool) if swing_speed is None else \
+        np.nan_to_num(np.asarray(swing_speed, dtype=np.float64)) > smash_swing
+    long_flight = np.zeros(len(angle), dtype=bool) if flight_time is None else \
+        np.nan_to_num(np.asarray(flight_time, dtype=np.float64)) > clear_flight_time
+
+    # Angle tests are written so an unknown (NaN) angle passes them
+    steep = ~(angle <= 10)
+    high = np.where(np.isnan(max_height), long_flight & (max_speed >= 80.0), max_height > clear_height)
+
+    # Rules are evaluated in priority order, first match wins
+    conditions = [
+        ((max_speed > smash_thresh) | fast_swing) & steep,
+        high, # High arc
+        (max_speed < 80.0) & ~(angle <= 30) & ~fast_swing,
+        (max_speed > 100.0) & ~(np.abs(angle) >= 10),
+    ]
+    return np.select(conditions, ["Smash", "Clear", "Drop", "Drive"], default="Unclassified")
+
+class ShotSegmenter:
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Initialize the ShotSegmenter.
+
+        Splits rallies into shots at hits (shuttle direction reversals close
+        to a player), then extracts features and classifies every shot of
+        the match in one vectorized pass.
+        """
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        events_cfg = self.config.get('events', {})
+        self.smash_thresh = events_cfg.get('smash_speed_threshold', 150.0)
+        self.clear_height = events_cfg.get('clear_height_threshold', 4.0)
+        self.max_player_distance = events_cfg.get('max_hit_player_distance', 2.5) # meters
+        self.smash_swing = events_cfg.get('smash_swing_speed', 12.0) # torso lengths/s
+        self.clear_flight_time = events_cfg.get('clear_flight_time', 1.4) # seconds, used without heights
+        self.swing_window = events_cfg.get('swing_window_frames', 6) # frames around the hit
+
+    def segment(self, timestamps: np.ndarray, positions: np.ndarray, visible: np.ndarray,
+                hits: np.ndarray, rally_starts: np.ndarray, rally_ends: np.ndarray,
+                frames: np.ndarray, players: Optional[Dict[str, np.ndarray]] = None,
+                heights: Optional[np.ndarray] = None,
+                swing: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+        """
+        Segment and classify all shots.
+
+        Args:
+            timestamps: (N,) sample times in seconds.
+            positions: (N, 2) shuttle court positions in meters (NaN where unknown).
+            visible: (N,) shuttle detection mask.
+            hits: Sorted sample indices of candidate hits (direction reversals).
+            rally_starts: (R,) rally start sample indices.
+            rally_ends: (R,) rally exclusive end sample indices.
+            frames: (N,) frame index per sample.
+            players: Optional columnar player positions with keys 'frame', 'track_id',
+                     'x', 'y' (court meters). Used to reject reversals away from any
+                     player and to attribute shots.
+            heights: Optional (N,) shuttle height in meters. Without it (monocular
+                     video) height and angle are NaN and shots are classified from
+                     speed and flight time.
+            swing: Optional columnar arm-swing speeds ('frame', 'track_id', 'swing_speed')
+                   from BiomechanicsAnalyzer, used as an extra classification feature.
+
+        Returns:
+            Dict of (S,) arrays: 'start', 'end' (sample indices, end exclusive),
+            'rally', 'player_id', 'max_speed', 'max_height', 'angle', 'flight_time',
+            'swing_speed', 'type'.
+        """
+        n = len(timestamps)
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        heights = None if heights is None else np.nan_to_num(np.asarray(heights, dtype=np.float64))
+
+        # Reversals only count as hits near a player
+        hits = np.asarray(hits, dtype=int)
+        _, hit_dist = self._nearest_players(frames[hits], positions[hits], players)
+        hits = hits[~(hit_dist > self.max_player_distance)] # NaN (no players seen) keeps the hit
+
+        # Every rally opens with a serve; hits split it into further shots
+        starts = np.union1d(rally_starts, hits)
+        rally = np.searchsorted(rally_starts, starts, side='right') - 1
+        inside = (rally >= 0) & (starts < rally_ends[np.maximum(rally, 0)])
+        starts, rally = starts[inside], rally[inside]
+        if len(starts) == 0:
+            return {k: np.zeros(0, dtype=int) for k in ('start', 'end', 'rally', 'player_id', 'max_speed', 'max_height', 'angle', 'flight_time', 'swing_speed', 'type')}
+
+        # A shot ends at the next hit of the same rally, or at the rally end
+        next_start = np.append(starts[1:], n)
+        same_rally = np.append(rally[1:] == rally[:-1], False)
+        ends = np.where(same_rally, next_start, rally_ends[rally])
+
+        max_speed, max_height, angle = self._features(timestamps, positions, visible, heights, starts, ends)
+        flight_time = timestamps[ends - 1] - timestamps[starts]
+        player_id, _ = self._nearest_players(frames[starts], positions[starts], players)
+        swing_speed = self._swing_at(frames[starts], player_id, swing)
+
+        return {
+            'start': starts,
+            'end': ends,
+            'rally': rally,
+            'player_id': player_id,
+            'max_speed': max_speed,
+            'max_height': max_height,
+            'angle': angle,
+            'flight_time': flight_time,
+            'swing_speed': swing_speed,
+            'type': classify_shots(max_speed, max_height, angle, self.smash_thresh, self.clear_height,
+                                   swing_speed, self.smash_swing, flight_time, self.clear_flight_time)
+        }
+
+    def _features(self, timestamps: np.ndarray, positions: np.ndarray, visible: np.ndarray,
+                  heights: Optional[np.ndarray], starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Peak speed (km/h), peak height (m) and descent angle (deg) per shot (NaN without heights)."""
+        n = len(timestamps)
+        valid = visible & np.all(np.isfinite(positions), axis=1)
+
+        # Per-sample speed into the next sample; zero where either end is missing
+        step = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+        dt = np.diff(timestamps)
+        ok = valid[:-1] & valid[1:] & (dt > 0)
+        speed = np.zeros(n)
+        speed[:-1][ok] = step[ok] / dt[ok] * 3.6
+        # The last sample of a shot has no speed within the shot
+        speed[ends - 1] = 0.0
+
+        # reduceat spans up to the next start, so blank samples not covered by any shot
+        bounds = np.zeros(n + 1, dtype=int)
+        np.add.at(bounds, starts, 1)
+        np.add.at(bounds, ends, -1)
+        covered = np.cumsum(bounds)[:n] > 0
+        speed[~covered] = 0.0
+        max_speed = np.maximum.reduceat(speed, starts)
+        if heights is None:
+            return max_speed, np.full(len(starts), np.nan), np.full(len(starts), np.nan)
+
+        masked_heights = np.where(valid & covered, heights, 0.0)
+        max_height = np.maximum.reduceat(masked_heights, starts)
+
+        # Descent angle over (up to) the last three samples of each shot
+        last = ends - 1
+        first = np.maximum(starts, last - 3)
+        drop = heights[first] - heights[last]
+        ground = np.linalg.norm(np.nan_to_num(positions[last] - positions[first]), axis=1)
+        angle = np.degrees(np.arctan2(drop, ground))
+        angle[first == last] = 0.0
+        return max_speed, max_height, angle
+
+    def _swing_at(self, frames: np.ndarray, player_id: np.ndarray,
+                  swing: Optional[Dict[str, np.ndarray]]) -> np.ndarray:
+        """Peak swing speed of each shot's player within `swing_window` frames of the hit (NaN if unknown)."""
+        result = np.full(len(frames), np.nan)
+        if swing is None or len(frames) == 0 or len(swing['frame']) == 0:
+            return result
+
+        # Sort by (track, frame) so every query is one contiguous range
+        track = np.asarray(swing['track_id'], dtype=np.int64)
+        frame = np.asarray(swing['frame'], dtype=np.int64)
+        order = np.lexsort((frame, track))
+        key = track[order] * (1 << 32) + frame[order]
+        values = np.append(np.asarray(swing['swing_speed'], dtype=np.float64)[order], np.nan) # Sentinel for reduceat
+
+        base = np.asarray(player_id, dtype=np.int64) * (1 << 32) + np.asarray(frames, dtype=np.int64)
+        lo = np.searchsorted(key, base - self.swing_window, side='left')
+        hi = np.searchsorted(key, base + self.swing_window, side='right')
+        found = (hi > lo) & (np.asarray(player_id) >= 0)
+        if found.any():
+            # fmax over each [lo, hi) range; fmax ignores NaN samples
+            bounds = np.column_stack([lo[found], hi[found]]).ravel()
+            result[found] = np.fmax.reduceat(values, bounds)[::2]
+        return result
+
+    @staticmethod
+    def _nearest_players(frames: np.ndarray, points: np.ndarray,
+                         players: Optional[Dict[str, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Closest player to each query point on the same frame.
+
+        Returns:
+            Tuple of (Q,) track ids (-1 if none) and (Q,) distances (NaN if none).
+        """
+        q = len(frames)
+        player_id = np.full(q, -1, dtype=int)
+        dist = np.full(q, np.nan)
+        if players is None or q == 0 or len(players['frame']) == 0:
+            return player_id, dist
+
+        order = np.argsort(players['frame'], kind='stable')
+        p_frame = np.asarray(players['frame'])[order]
+        p_id = np.asarray(players['track_id'])[order]
+        p_xy = np.column_stack([np.asarray(players['x'])[order], np.asarray(players['y'])[order]])
+
+        # Gather every (query, player-on-same-frame) pair in one flat array
+        lo = np.searchsorted(p_frame, frames, side='left')
+        hi = np.searchsorted(p_frame, frames, side='right')
+        counts = hi - lo
+        if counts.sum() == 0:
+            return player_id, dist
+        query = np.repeat(np.arange(q), counts)
+        rows = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+        d = np.linalg.norm(p_xy[rows] - points[query], axis=1)
+        d = np.where(np.isfinite(d), d, np.inf)
+
+        # First row per query after sorting by (query, distance) is the nearest
+        best = np.lexsort((d, query))
+        first = best[np.concatenate([[True], query[best][1:] != query[best][:-1]])]
+        player_id[query[first]] = p_id[rows[first]]
+        dist[query[first]] = d[first]
+        return player_id, dist
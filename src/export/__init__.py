@@ -0,0 +1 @@
+from .parquet import ResultWriter, read_results, keypoints_array
@@ -0,0 +1,146 @@
+import os
+import logging
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Dict, List, Optional, Any
+from src.utils.config import get_config
+
+logger = logging.getLogger("badminton_cv.export")
+
+NUM_KEYPOINTS = 17
+
+# One Parquet file per dataset; every dataset has a 'time' column (seconds) used for slicing
+SCHEMAS = {
+    'tracks': pa.schema([
+        ('frame', pa.int64()), ('time', pa.float64()), ('track_id', pa.int64()), ('class_id', pa.int32()),
+        ('score', pa.float32()), ('x1', pa.float32()), ('y1', pa.float32()), ('x2', pa.float32()), ('y2', pa.float32()),
+        ('court_x', pa.float32()), ('court_y', pa.float32())
+    ]),
+    'keypoints': pa.schema([
+        ('frame', pa.int64()), ('time', pa.float64()), ('person', pa.int32()), ('track_id', pa.int64()), ('score', pa.float32()),
+        ('x1', pa.float32()), ('y1', pa.float32()), ('x2', pa.float32()), ('y2', pa.float32()),
+        ('keypoints', pa.list_(pa.float32(), NUM_KEYPOINTS * 3)) # Flattened (17, 3) x, y, confidence
+    ]),
+    'shuttle': pa.schema([
+        ('frame', pa.int64()), ('time', pa.float64()), ('visible', pa.bool_()),
+        ('px', pa.float64()), ('py', pa.float64()), ('court_x', pa.float64()), ('court_y', pa.float64()),
+        ('score', pa.float32())
+    ]),
+    'rallies': pa.schema([
+        ('rally', pa.int32()), ('start_frame', pa.int64()), ('end_frame', pa.int64()), ('time', pa.float64()),
+        ('duration', pa.float64()), ('shot_count', pa.int32()), ('landing_x', pa.float64()), ('landing_y', pa.float64())
+    ]),
+    'shots': pa.schema([
+        ('rally', pa.int32()), ('frame', pa.int64()), ('end_frame', pa.int64()), ('time', pa.float64()),
+        ('player_id', pa.int64()), ('max_speed', pa.float64()), ('max_height', pa.float64()), ('angle', pa.float64()),
+        ('swing_speed', pa.float64()), ('type', pa.string()), ('audio_confirmed', pa.bool_())
+    ]),
+}
+
+class ResultWriter:
+    def __init__(self, output_dir: str, config: Optional[Dict] = None):
+        """
+        Initialize the ResultWriter.
+
+        Appends per-frame results to one Parquet file per dataset. Each
+        write() becomes a row group, so with one write per video chunk the
+        files are partitioned by time and readers can skip row groups using
+        the 'time' statistics.
+
+        Args:
+            output_dir: Directory the dataset files are written to.
+            config: Config dict.
+        """
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        export_cfg = self.config.get('export', {})
+        self.compression = export_cfg.get('compression', 'zstd')
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._writers: Dict[str, pq.ParquetWriter] = {}
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.output_dir, f"{name}.parquet")
+
+    def write(self, name: str, columns: Dict[str, Any]):
+        """
+        Append one row group to a dataset.
+
+        Args:
+            name: Dataset name (a key of SCHEMAS).
+            columns: Column name -> sequence of values. 'keypoints' may be an
+                     (N, 17, 3) array. Empty batches are skipped.
+        """
+        schema = SCHEMAS[name]
+        table = to_table(schema, columns)
+        if table.num_rows == 0:
+            return
+        if name not in self._writers:
+            self._writers[name] = pq.ParquetWriter(self.path(name), schema, compression=self.compression)
+        self._writers[name].write_table(table)
+
+    def write_rows(self, name: str, rows: List[tuple]):
+        """Append one row group from row tuples in schema column order."""
+        if rows:
+            self.write(name, dict(zip(SCHEMAS[name].names, zip(*rows))))
+
+    def close(self):
+        """Finish all files. Datasets never written get an empty file so readers always find them."""
+        if self._closed:
+            return
+        self._closed = True
+        for name, schema in SCHEMAS.items():
+            if name not in self._writers:
+                pq.write_table(schema.empty_table(), self.path(name), compression=self.compression)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+def to_table(schema: pa.Schema, columns: Dict[str, Any]) -> pa.Table:
+    """Build a table of `schema` from columns, converting keypoint arrays to fixed-size lists."""
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if pa.types.is_fixed_size_list(field.type):
+            flat = np.asarray(values, dtype=np.float32).reshape(-1)
+            arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(flat), field.type.list_size))
+        else:
+            arrays.append(pa.array(np.asarray(values), type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def read_results(output_dir: str, name: str, start_time: Optional[float] = None, end_time: Optional[float] = None,
+                 columns: Optional[List[str]] = None) -> pa.Table:
+    """
+    Read a slice of a dataset with memory mapping.
+
+    Args:
+        output_dir: Directory written by ResultWriter.
+        name: Dataset name.
+        start_time: Optional inclusive start (seconds).
+        end_time: Optional exclusive end (seconds).
+        columns: Optional subset of columns.
+
+    Returns:
+        pa.Table: Matching rows; row groups outside the range are not read.
+    """
+    filters = []
+    if start_time is not None:
+        filters.append(('time', '>=', start_time))
+    if end_time is not None:
+        filters.append(('time', '<', end_time))
+    return pq.read_table(os.path.join(output_dir, f"{name}.parquet"), columns=columns,
+                         filters=filters or None, memory_map=True)
+
+def keypoints_array(table: pa.Table) -> np.ndarray:
+    """(N, 17, 3) keypoints from a 'keypoints' table."""
+    column = table.column('keypoints').combine_chunks()
+    return column.flatten().to_numpy().reshape(-1, NUM_KEYPOINTS, 3)
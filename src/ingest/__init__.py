@@ -1 +1,2 @@
 from .video import VideoIngester
+from .audio import AudioAnalyzer
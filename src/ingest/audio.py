@@ -0,0 +1,197 @@
+import av
+import numpy as np
+import os
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Union
+from src.utils.config import get_config
+
+logger = logging.getLogger("badminton_cv.ingest")
+
+class AudioAnalyzer:
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Initialize the AudioAnalyzer.
+
+        Racket-shuttle contact is a sharp broadband transient, so onset
+        detection on the match audio gives candidate hit times (and rally
+        boundaries) far more cheaply than any vision model.
+        """
+        self._config_loader = config if config else get_config()
+        self.config = self._config_loader.config if hasattr(self._config_loader, 'config') else get_config().config
+
+        audio_cfg = self.config.get('audio', {})
+        self.sample_rate = audio_cfg.get('sample_rate', 16000)
+        self.frame_length = audio_cfg.get('frame_length', 512)
+        self.hop_length = audio_cfg.get('hop_length', 160) # 10ms at 16kHz
+        self.min_freq = audio_cfg.get('min_freq', 2000.0) # Hz; hits are sharp, crowd/voice energy is low
+        self.threshold = audio_cfg.get('onset_threshold', 3.0) # std devs above the local mean
+        self.min_onset_interval = audio_cfg.get('min_onset_interval', 0.1) # seconds
+        self.rally_gap = audio_cfg.get('rally_gap', 4.0) # seconds between hits that ends a rally
+        self.min_rally_hits = audio_cfg.get('min_rally_hits', 3)
+        self.window_padding = audio_cfg.get('window_padding', 1.0) # seconds around each rally
+        self.block_frames = 4096 # STFT frames processed at once
+
+    def analyze(self, video_path: str) -> Dict[str, Any]:
+        """
+        Detect hit onsets and rally windows from a file's audio track.
+
+        Args:
+            video_path: Path to a video (or audio) file.
+
+        Returns:
+            Dict with 'onsets' (N,) onset times in seconds, 'strengths' (N,)
+            onset strengths and 'rallies' (R, 2) padded [start, end] windows.
+            All arrays are empty if the file has no audio.
+        """
+        # Decoded chunks go straight into the blocked flux, never the whole track at once
+        envelope = self.onset_envelope(self.stream_audio(video_path))
+        if len(envelope) == 0:
+            return {'onsets': np.zeros(0), 'strengths': np.zeros(0), 'rallies': np.zeros((0, 2))}
+
+        onsets, strengths = self.pick_onsets(envelope)
+        rallies = self.group_rallies(onsets)
+
+        logger.info(f"Audio analysis: {len(onsets)} hit onsets, {len(rallies)} rally windows.")
+        return {'onsets': onsets, 'strengths': strengths, 'rallies': rallies}
+
+    def stream_audio(self, path: str) -> Iterator[np.ndarray]:
+        """Decode the first audio stream to mono float32 chunks at `sample_rate` (nothing if there is none)."""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Media file not found: {path}")
+
+        with av.open(path) as container:
+            if not container.streams.audio:
+                logger.info(f"No audio stream in {path}.")
+                return
+
+            resampler = av.AudioResampler(format='flt', layout='mono', rate=self.sample_rate)
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    yield resampled.to_ndarray().ravel().astype(np.float32, copy=False)
+            for resampled in resampler.resample(None): # Flush
+                yield resampled.to_ndarray().ravel().astype(np.float32, copy=False)
+
+    def load_audio(self, path: str) -> Optional[np.ndarray]:
+        """Decode the whole first audio stream into one array (None if there is none)."""
+        chunks = list(self.stream_audio(path))
+        return np.concatenate(chunks) if chunks else None
+
+    def onset_envelope(self, samples: Union[np.ndarray, Iterable[np.ndarray]]) -> np.ndarray:
+        """
+        High-frequency spectral flux, one value per hop.
+
+        Args:
+            samples: Mono signal, as one array or as consecutive chunks (e.g.
+                     `stream_audio`). Chunks are consumed `block_frames` analysis
+                     frames at a time, so memory stays bounded on long matches.
+
+        Returns:
+            np.ndarray: (F,) non-negative onset strength per analysis frame
+            (empty if the signal is shorter than one frame).
+        """
+        chunks = [samples] if isinstance(samples, np.ndarray) else samples
+        window = np.hanning(self.frame_length).astype(np.float32)
+        high_band = np.fft.rfftfreq(self.frame_length, 1.0 / self.sample_rate) >= self.min_freq
+        block_samples = self.frame_length + (self.block_frames - 1) * self.hop_length
+        step = self.block_frames * self.hop_length
+
+        flux = [np.zeros(1)]
+        prev = None
+        parts, size = [], 0
+        for chunk in chunks:
+            parts.append(np.asarray(chunk, dtype=np.float32).ravel())
+            size += len(parts[-1])
+            if size < block_samples:
+                continue
+            pending = np.concatenate(parts)
+            while len(pending) >= block_samples:
+                prev = self._flux_block(pending[:block_samples], window, high_band, prev, flux)
+                pending = pending[step:] # Keeps the frame_length - hop_length overlap with the next block
+            parts, size = [pending], len(pending)
+
+        pending = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        if len(pending) >= self.frame_length:
+            prev = self._flux_block(pending, window, high_band, prev, flux)
+        return np.concatenate(flux) if prev is not None else np.zeros(0)
+
+    def _flux_block(self, samples: np.ndarray, window: np.ndarray, high_band: np.ndarray,
+                    prev: Optional[np.ndarray], flux: List[np.ndarray]) -> np.ndarray:
+        """Append the flux of every analysis frame starting in `samples`; returns the last frame's log magnitude."""
+        frames = np.lib.stride_tricks.sliding_window_view(samples, self.frame_length)[::self.hop_length]
+        spectrum = np.abs(np.fft.rfft(frames * window, axis=1))
+        log_mag = np.log1p(100.0 * spectrum[:, high_band])
+        if prev is not None:
+            log_mag = np.vstack([prev, log_mag])
+        # Positive change in log magnitude, summed over the high band
+        flux.append(np.maximum(np.diff(log_mag, axis=0), 0.0).sum(axis=1))
+        return log_mag[-1:]
+
+    def pick_onsets(self, envelope: np.ndarray):
+        """
+        Local maxima above an adaptive (moving mean + k * std) threshold.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Onset times (s) and strengths.
+        """
+        hop_time = self.hop_length / self.sample_rate
+        window = max(3, int(1.0 / hop_time)) # ~1s context
+
+        # Moving mean / std over the context window
+        kernel = np.ones(window) / window
+        mean = np.convolve(envelope, kernel, mode='same')
+        sq_mean = np.convolve(envelope ** 2, kernel, mode='same')
+        std = np.sqrt(np.maximum(sq_mean - mean ** 2, 0.0))
+        threshold = mean + self.threshold * std
+
+        peaks = np.flatnonzero(
+            (envelope[1:-1] > threshold[1:-1]) &
+            (envelope[1:-1] >= envelope[:-2]) &
+            (envelope[1:-1] > envelope[2:])
+        ) + 1
+
+        # Keep the first peak of any burst closer than min_onset_interval
+        if len(peaks) > 1:
+            keep = np.concatenate([[True], np.diff(peaks) * hop_time >= self.min_onset_interval])
+            peaks = peaks[keep]
+
+        # Report the centre of the analysis frame
+        times = (peaks * self.hop_length + self.frame_length / 2) / self.sample_rate
+        return times, envelope[peaks]
+
+    def group_rallies(self, onsets: np.ndarray) -> np.ndarray:
+        """
+        Group onsets into rallies: consecutive hits closer than `rally_gap`,
+        with at least `min_rally_hits` hits, padded by `window_padding`.
+
+        Returns:
+            np.ndarray: (R, 2) [start, end] times in seconds.
+        """
+        if len(onsets) == 0:
+            return np.zeros((0, 2))
+
+        breaks = np.flatnonzero(np.diff(onsets) > self.rally_gap) + 1
+        starts = np.concatenate([[0], breaks])
+        ends = np.concatenate([breaks, [len(onsets)]])
+        keep = (ends - starts) >= self.min_rally_hits
+
+        windows = np.column_stack([onsets[starts[keep]] - self.window_padding,
+                                   onsets[ends[keep] - 1] + self.window_padding])
+        return np.maximum(windows, 0.0)
+
+    @staticmethod
+    def active_mask(timestamps: np.ndarray, windows: np.ndarray) -> np.ndarray:
+        """
+        Mark timestamps falling inside any [start, end] window.
+
+        Args:
+            timestamps: (N,) times in seconds.
+            windows: (R, 2) sorted, non-overlapping windows.
+
+        Returns:
+            np.ndarray: (N,) boolean mask.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(windows) == 0:
+            return np.zeros(len(timestamps), dtype=bool)
+        idx = np.searchsorted(windows[:, 0], timestamps, side='right') - 1
+        return (idx >= 0) & (timestamps <= windows[np.maximum(idx, 0), 1])
@@ -33,6 +33,65 @@ def analyze(video_path, config, verbose):
         logger.error(f"Analysis failed: {e}")
         sys.exit(1)
 
+@cli.command()
+@click.option('--metric', '-m', required=True, help='Per-match metric, e.g. rear_recovery_speed_mps')
+@click.option('--player', '-p', default=None, help='Player name (see label-player)')
+@click.option('--last', '-n', 'last_n', type=int, default=None, help='Only the most recent N matches')
+@click.option('--agg', '-a', default='mean', type=click.Choice(['mean', 'median', 'max', 'min', 'sum']))
+@click.option('--config', '-c', default=None, help='Path to config YAML')
+def query(metric, player, last_n, agg, config):
+    """Query metrics across catalogued matches."""
+    setup_logger("badminton_cv", log_level="WARNING")
+    from src.utils.config import get_config
+    from src.analytics import MatchCatalog
+    
+    catalog = MatchCatalog(get_config(config))
+    try:
+        result = catalog.query(metric, player=player, last_n=last_n, agg=agg)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--metric')
+        
+    for row in result['rows']:
+        row_value = 'n/a' if row[metric] is None else f"{row[metric]:.3f}"
+        click.echo(f"{row['recorded_at']:%Y-%m-%d}  {row['match_id']:<24} {row['player']:<16} {row_value}")
+    value = 'n/a' if result['value'] is None else f"{result['value']:.3f}"
+    click.echo(f"{agg}({metric}) over {result['matches']} matches: {value}")
+
+@cli.command('label-player')
+@click.argument('match_id')
+@click.argument('track_id', type=int)
+@click.argument('name')
+@click.option('--config', '-c', default=None, help='Path to config YAML')
+def label_player(match_id, track_id, name, config):
+    """Name the player behind a track of a catalogued match."""
+    from src.utils.config import get_config
+    from src.analytics import MatchCatalog
+    
+    try:
+        MatchCatalog(get_config(config)).label_player(match_id, track_id, name)
+    except KeyError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Track {track_id} of {match_id} is now '{name}'.")
+
+@cli.command('ingest-kb')
+@click.argument('corpus_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--config', '-c', default=None, help='Path to config YAML')
+@click.option('--verbose', '-v', is_flag=True, help='Enable verbose logging')
+def ingest_kb(corpus_dir, config, verbose):
+    """Index a directory of markdown/text coaching material into the knowledge base."""
+    setup_logger("badminton_cv", log_level="DEBUG" if verbose else "WARNING")
+    from src.utils.config import get_config
+    from src.rag import KnowledgeBase, CorpusIngester
+    
+    config = get_config(config)
+    kb = KnowledgeBase(config)
+    if kb.store.path is None:
+        click.echo("Warning: knowledge base is not persistent (no sentence encoder, or rag.persist is off); "
+                   "set rag.corpus_dir to ingest at pipeline startup instead.", err=True)
+    stats = CorpusIngester(kb, config).ingest(corpus_dir)
+    click.echo(f"{stats['files']} files: {stats['updated']} updated ({stats['chunks']} chunks), "
+               f"{stats['unchanged']} unchanged, {stats['removed']} removed.")
+
 @cli.command()
 def test_setup():
     """Verify system setup and dependencies."""
@@ -1,15 +1,17 @@
 import logging
 import os
-from typing import Optional, Dict
+import numpy as np
+from typing import Optional, Dict, Callable, Any
 from src.utils.config import get_config
-from src.ingest import VideoIngester
+from src.ingest import VideoIngester, AudioAnalyzer
 from src.calibrate import CourtCalibrator
-from src.detect import BadmintonDetector
+from src.detect import BadmintonDetector, ShuttleDetector
 from src.track import BadmintonTracker
-from src.pose import PoseEstimator
-from src.events import EventDetector
-from src.analytics import MetricsCalculator
-from src.rag import KnowledgeBase, ReportGenerator
+from src.pose import PoseEstimator, BiomechanicsAnalyzer, match_boxes
+from src.events import EventDetector, OfflineEventEngine
+from src.analytics import MetricsCalculator, MatchCatalog, LiveMetrics
+from src.rag import KnowledgeBase, ReportGenerator, CorpusIngester
+from src.export import ResultWriter
 from tqdm import tqdm
 
 logger = logging.getLogger("badminton_cv.pipeline")
@@ -22,14 +24,25 @@ class MatchAnalysisPipeline:
         # Initialize components
         logger.info("Initializing pipeline components...")
         self.calibrator = CourtCalibrator(self.config_loader)
+        self.audio_analyzer = AudioAnalyzer(self.config_loader)
         self.detector = BadmintonDetector(self.config_loader)
+        self.shuttle_detector = ShuttleDetector(self.config_loader)
         self.tracker = BadmintonTracker(self.config_loader)
         self.pose_estimator = PoseEstimator(self.config_loader)
+        self.biomechanics = BiomechanicsAnalyzer(self.config_loader)
         self.event_detector = EventDetector(self.config_loader)
+        self.offline_events = OfflineEventEngine(self.config_loader)
         self.metrics = MetricsCalculator(self.calibrator, self.config_loader)
+        self.live = LiveMetrics(self.config_loader)
+        self.on_live_metrics: Optional[Callable[[Dict[str, Any]], None]] = None # Called every frame with live values
+        self.catalog = MatchCatalog(self.config_loader) if self.config.get('analytics', {}).get('catalog_enabled', True) else None
         self.kb = KnowledgeBase(self.config_loader)
         self.reporter = ReportGenerator(self.kb, self.config_loader)
         
+        audio_cfg = self.config.get('audio', {})
+        self.audio_enabled = audio_cfg.get('enabled', True)
+        self.gate_vision = audio_cfg.get('gate_vision', False)
+        
         # Hydrate Knowledge Base with some default content (Simulated)
         self._hydrate_kb()
 
@@ -42,30 +55,77 @@ class MatchAnalysisPipeline:
             ("Net play requires soft hands and racket carriage above net height. Drill: Net spinning practice.", {"topic": "net"}),
             ("Drive shots are flat and fast. Keep racket in front of body. Drill: Drive wars mid-court.", {"topic": "drive"})
         ]
-        for text, meta in drills:
-            self.kb.add_document(text, meta)
+        self.kb.add_documents(drills)
+        
+        # Coaching material on disk; unchanged files are skipped
+        corpus_dir = self.config.get('rag', {}).get('corpus_dir')
+        if corpus_dir and os.path.isdir(corpus_dir):
+            CorpusIngester(self.kb, self.config_loader).ingest(corpus_dir)
 
-    def run(self, video_path: str):
+    def reset(self):
+        """
+        Clear per-match state so a long-lived pipeline (e.g. a web worker)
+        can analyze another video without reloading any model.
+        """
+        self.calibrator = CourtCalibrator(self.config_loader)
+        self.metrics = MetricsCalculator(self.calibrator, self.config_loader)
+        self.event_detector = EventDetector(self.config_loader)
+        self.tracker.reset()
+        self.shuttle_detector.reset()
+        self.live.reset()
+
+    def run(self, video_path: str, match_id: Optional[str] = None, output_dir: Optional[str] = None):
         """
         Run the full analysis pipeline.
+        
+        Args:
+            video_path: Match video.
+            match_id: Catalog identifier for the match; defaults to the video file name.
+            output_dir: Where results and the report go; defaults to system.output_dir.
         """
         logger.info(f"Starting analysis for {video_path}")
+        self.reset()
+        out_dir = output_dir or self.config.get('system', {}).get('output_dir', 'outputs')
+        writer = None
         
         try:
             with VideoIngester(video_path, self.config_loader) as ingester:
                 metadata = ingester.get_metadata()
                 logger.info(f"Video Metadata: {metadata}")
                 
-                # 1. Calibration (simplistic for now - just using first frame of first chunk)
-                # In real app, we might scan for best frame.
+                # 0. Audio: hit onsets are cheap to find and gate the expensive vision stages
+                audio = {'onsets': np.zeros(0), 'rallies': np.zeros((0, 2))}
+                if self.audio_enabled:
+                    try:
+                        audio = self.audio_analyzer.analyze(video_path)
+                    except Exception as e:
+                        logger.warning(f"Audio analysis failed, continuing without it: {e}")
+                gate = self.gate_vision and len(audio['rallies']) > 0
+                
+                # 1. Calibration: score sampled frames of the first chunk and keep the best fit
                 calibrated = False
                 
+                # Columnar per-frame records for offline event detection
+                timestamps, frame_indices, shuttle_visible, shuttle_court = [], [], [], []
+                players = {'frame': [], 'track_id': [], 'x': [], 'y': []}
+                pose_features = {} # track_id -> list of per-chunk feature dicts
+                swing = {'frame': [], 'track_id': [], 'swing_speed': []}
+                self.shuttle_detector.reset()
+                self.live.reset(metadata['fps'])
+                self.metrics.fps = metadata['fps'] # Frame indices below count frames of this video
+                
+                # Per-frame results are persisted as Parquet, one row group per chunk
+                writer = ResultWriter(os.path.join(out_dir, "results"), self.config_loader)
+                
                 # Progress bar
                 pbar = tqdm(total=metadata['total_frames'], desc="Processing Frames", unit="fr")
                 
                 for chunk_idx, frames in ingester.process_chunks():
                     if not calibrated and frames:
-                        success, _ = self.calibrator.detect_court(frames[0])
+                        success, _ = self.calibrator.calibrate(frames)
+                        if not success:
+                            logger.warning(f"Court calibration unreliable (confidence {self.calibrator.confidence:.2f}). "
+                                           "Court-space metrics will be unavailable.")
                         calibrated = True # Proceed even if False (metrics will handle it gracefully)
                     
                     # Batch Processing
@@ -76,11 +136,20 @@ class MatchAnalysisPipeline:
                     # but our tracker supports batch list update)
                     tracks_batch = self.tracker.update_batch(frames)
                     
+                    # Frames inside audio-detected rally windows (all frames when not gating)
+                    chunk_times = (chunk_idx * ingester.chunk_duration) + np.arange(len(frames)) / metadata['fps']
+                    active = AudioAnalyzer.active_mask(chunk_times, audio['rallies']) if gate else np.ones(len(frames), dtype=bool)
+                    
                     # 3. Pose
                     # Currently PoseEstimator does one by one in plan, but let's see if we can loop
-                    poses_batch = [self.pose_estimator.estimate(f) for f in frames]
+                    poses_batch = [self.pose_estimator.estimate(f) if active[i] else [] for i, f in enumerate(frames)]
+                    
+                    # 4. Shuttle: classical motion candidates + verifier (background still updates on gated frames)
+                    shuttle_batch = self.shuttle_detector.detect_batch(frames, active)
                     
                     # Process per frame results
+                    track_rows, keypoint_rows, shuttle_rows = [], [], []
+                    chunk_poses = {} # track_id -> ([frame_idx], [keypoints])
                     for i, frame in enumerate(frames):
                          timestamp = (chunk_idx * ingester.chunk_duration) + (i / metadata['fps'])
                          frame_idx = (chunk_idx * int(ingester.chunk_duration * metadata['fps'])) + i
@@ -89,49 +158,144 @@ class MatchAnalysisPipeline:
                          # tracks_batch[i] is a list of tracks in that frame
                          tracks = tracks_batch[i]
                          
-                         # Find shuttle (class_id usually diff). 
-                         # Note: Our current model is person-only for detection config. 
-                         # We need to rely on specific shuttle detection if available.
-                         # For now, we assume we don't have good shuttle data so events might be sparse.
-                         # We simulate shuttle data for metrics testing if needed.
+                         # Follow camera motion so court coordinates stay valid on panning footage
+                         self.calibrator.track(frame)
                          
                          # Update Events
+                         shuttle = shuttle_batch[i]
                          frame_data = {
                              'frame_idx': frame_idx,
                              'timestamp': timestamp,
-                             'shuttle_pos': None # Placeholder until we train shuttle model
+                             'shuttle_pos': shuttle['pos'] if shuttle is not None else None
                          }
                          self.event_detector.update(frame_data)
                          
-                         # Update Player Metrics
-                         for track in tracks:
-                             if track['class_id'] == 0: # Person
-                                 center_x = (track['box'][0] + track['box'][2]) / 2
-                                 center_y = track['box'][3] # Bottom (feet)
-                                 self.metrics.update_player_stats(track['track_id'], (center_x, center_y), frame_idx)
+                         timestamps.append(timestamp)
+                         frame_indices.append(frame_idx)
+                         shuttle_visible.append(frame_data['shuttle_pos'] is not None)
+                         if frame_data['shuttle_pos'] is not None and self.calibrator.homography_matrix is not None:
+                             shuttle_court.append(self.calibrator.pixel_to_court(frame_data['shuttle_pos']))
+                         else:
+                             shuttle_court.append((np.nan, np.nan))
+                         shuttle_px = frame_data['shuttle_pos'] or (np.nan, np.nan)
+                         shuttle_rows.append((frame_idx, timestamp, shuttle is not None, *shuttle_px, *shuttle_court[-1],
+                                              shuttle['score'] if shuttle is not None else 0.0))
+                         
+                         # Update Player Metrics (feet position of every person, converted in one batch)
+                         people = [t for t in tracks if t['class_id'] == 0] # Person
+                         feet_m = np.zeros((0, 2))
+                         if people:
+                             boxes = np.array([t['box'] for t in people], dtype=np.float64)
+                             feet_px = np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]])
+                             track_ids = [t['track_id'] for t in people]
+                             feet_m = self.metrics.update_players(track_ids, feet_px, frame_idx)
+                             located = np.isfinite(feet_m[:, 0]) # NaN until the court is calibrated
+                             players['frame'].extend([frame_idx] * int(located.sum()))
+                             players['track_id'].extend(np.asarray(track_ids)[located])
+                             players['x'].extend(feet_m[located, 0])
+                             players['y'].extend(feet_m[located, 1])
+                         
+                         # Rolling live metrics, O(1) per frame
+                         self.live.update(frame_idx, [t['track_id'] for t in people], feet_m, self.event_detector.in_rally)
+                         if self.on_live_metrics is not None:
+                             self.on_live_metrics(self.live.snapshot())
+                         
+                         court = iter(feet_m)
+                         for t in tracks:
+                             cx, cy = next(court) if t['class_id'] == 0 else (np.nan, np.nan)
+                             track_rows.append((frame_idx, timestamp, t['track_id'], t['class_id'], t['score'], *t['box'], cx, cy))
+                         
+                         # Attach each pose to the person track it overlaps
+                         poses = poses_batch[i]
+                         matched = match_boxes([pose['box'] for pose in poses], [t['box'] for t in people])
+                         for p, (pose, m) in enumerate(zip(poses, matched)):
+                             track_id = people[m]['track_id'] if m >= 0 else -1
+                             keypoint_rows.append((frame_idx, timestamp, p, track_id, pose['score'], *pose['box'], pose['keypoints']))
+                             if m >= 0:
+                                 chunk_frames, chunk_kps = chunk_poses.setdefault(track_id, ([], []))
+                                 chunk_frames.append(frame_idx)
+                                 chunk_kps.append(pose['keypoints'])
                          
                          pbar.update(1)
                          
+                    writer.write_rows('tracks', track_rows)
+                    writer.write_rows('keypoints', keypoint_rows)
+                    writer.write_rows('shuttle', shuttle_rows)
+                    
+                    # Biomechanics per player over the whole chunk, one tensor each
+                    for track_id, (chunk_frames, chunk_kps) in chunk_poses.items():
+                        features = self.biomechanics.features(np.stack(chunk_kps), np.asarray(chunk_frames), metadata['fps'])
+                        pose_features.setdefault(track_id, []).append(features)
+                        swing['frame'].extend(chunk_frames)
+                        swing['track_id'].extend([track_id] * len(chunk_frames))
+                        swing['swing_speed'].extend(features['swing_speed'])
+                    
                 pbar.close()
+                self.event_detector.finalize()
+                
+                # Shuttle speeds over the whole track in one batch; court positions
+                # were converted per frame so they already follow camera motion
+                self.metrics.compute_court_shuttle_speeds(shuttle_court, timestamps)
+                
+                # Whole-match event detection over the recorded trajectory. Monocular video
+                # gives no shuttle height, so shots are classified from speed and flight time.
+                events = self.offline_events.process(
+                    np.asarray(timestamps, dtype=np.float64),
+                    np.asarray(shuttle_court, dtype=np.float64).reshape(-1, 2),
+                    visible=np.asarray(shuttle_visible, dtype=bool),
+                    frame_indices=np.asarray(frame_indices),
+                    players={k: np.asarray(v) for k, v in players.items()},
+                    audio_onsets=audio['onsets'],
+                    swing={k: np.asarray(v) for k, v in swing.items()}
+                )
+                
+                # Persist rallies and shots alongside the per-frame datasets
+                rally_times = np.asarray(timestamps)[np.searchsorted(frame_indices, [r['start_frame'] for r in events['rallies']])]
+                writer.write_rows('rallies', [
+                    (r, rally['start_frame'], rally['end_frame'], t, rally['duration'], rally['shot_count'], *rally['landing'])
+                    for r, (rally, t) in enumerate(zip(events['rallies'], rally_times))
+                ])
+                writer.write_rows('shots', [
+                    (r, shot['frame'], shot['end_frame'], shot['time'], shot['player_id'], shot['max_speed'],
+                     shot['max_height'], shot['angle'], shot['swing_speed'], shot['type'], shot['audio_confirmed'])
+                    for r, rally in enumerate(events['rallies']) for shot in rally['shots']
+                ])
+                writer.close()
+                
+                # Pre-aggregate this match into the cross-match catalog
+                if self.catalog is not None:
+                    match_id = match_id or os.path.splitext(os.path.basename(video_path))[0]
+                    self.catalog.register(match_id, writer.output_dir, metadata['fps'], video=video_path)
                 
                 # Generate Report
                 logger.info("Generating final report...")
-                metrics_summary = self.metrics.get_summary()
+                metrics_summary = self.metrics.get_summary(events['rallies'])
+                metrics_summary['calibration_confidence'] = self.calibrator.confidence
+                for track_id, chunks in pose_features.items():
+                    if track_id in metrics_summary['players']:
+                        features = {k: np.concatenate([c[k] for c in chunks]) for k in chunks[0]}
+                        metrics_summary['players'][track_id]['biomechanics'] = self.biomechanics.summarize(features)
                 
-                # If no speed detected (bc no shuttle model), mock it for a better report demo
+                # If no speed detected (no shuttle found), mock it for a better report demo
                 if metrics_summary['shuttle_max_speed_kmh'] == 0:
                     metrics_summary['shuttle_max_speed_kmh'] = 180.5 # Mock value for demo
                 
-                report = self.reporter.generate_report(metrics_summary, self.event_detector.rallies)
-                
                 # Save outputs
-                out_dir = self.config.get('system.output_dir', 'outputs')
                 os.makedirs(out_dir, exist_ok=True)
                 
-                # Save Report
+                # Save Report, section by section as the LLM responses arrive
                 report_path = os.path.join(out_dir, "coaching_report.md")
                 with open(report_path, "w") as f:
-                    f.write(report)
+                    def write_section(chunk: str):
+                        f.write(chunk)
+                        f.flush()
+                    report = self.reporter.generate_report(metrics_summary, events['rallies'], on_chunk=write_section)
+                    
+                # Save court occupancy grids for the dashboard
+                heatmaps = self.metrics.get_heatmaps()
+                if heatmaps:
+                    np.savez_compressed(os.path.join(out_dir, "heatmaps.npz"),
+                                        **{f"player_{pid}": h['grid'] for pid, h in heatmaps.items()})
                     
                 logger.info(f"Analysis Complete. Report saved to {report_path}")
                 print("\n" + "="*40 + "\n" + report + "\n" + "="*40)
@@ -139,3 +303,6 @@ class MatchAnalysisPipeline:
         except Exception as e:
             logger.error(f"Pipeline failed: {e}", exc_info=True)
             raise
+        finally:
+            if writer is not None:
+                writer.close()
@@ -1 +1,2 @@
 from .estimator import PoseEstimator
+from .biomechanics import BiomechanicsAnalyzer, stack_keypoints, match_boxes, joint_angle
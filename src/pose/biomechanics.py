@@ -0,0 +1,156 @@
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Any
+from src.utils.config import get_config
+
+logger = logging.getLogger("badminton_cv.pose")
+
+# COCO keypoint indices
+L_SHOULDER, R_SHOULDER, L_ELBOW, R_ELBOW, L_WRIST, R_WRIST = 5, 6, 7, 8, 9, 10
+L_HIP, R_HIP, L_KNEE, R_KNEE, L_ANKLE, R_ANKLE = 11, 12, 13, 14, 15, 16
+
+def stack_keypoints(poses: List[Dict[str, Any]]) -> np.ndarray:
+    """(T, 17, 3) tensor from a sequence of pose dicts."""
+    if not poses:
+        return np.zeros((0, 17, 3), dtype=np.float32)
+    return np.stack([np.asarray(p['keypoints'], dtype=np.float32) for p in poses])
+
+def match_boxes(boxes_a: np.ndarray, boxes_b: np.ndarray, min_iou: float = 0.5) -> np.ndarray:
+    """
+    Greedy one-to-one matching of boxes by IoU.
+
+    Args:
+        boxes_a: (A, 4) [x1, y1, x2, y2] boxes (e.g. poses).
+        boxes_b: (B, 4) boxes (e.g. tracks).
+        min_iou: Pairs below this overlap are never matched.
+
+    Returns:
+        np.ndarray: (A,) index into boxes_b, or -1 if unmatched.
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    match = np.full(len(boxes_a), -1, dtype=int)
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return match
+
+    # (A, B) IoU matrix
+    tl = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    br = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    iou = inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+    # Best pairs first; a handful of players per frame, so the loop is tiny
+    for flat in np.argsort(-iou, axis=None):
+        a, b = divmod(int(flat), len(boxes_b))
+        if iou[a, b] < min_iou:
+            break
+        if match[a] < 0 and b not in match:
+            match[a] = b
+    return match
+
+def joint_angle(keypoints: np.ndarray, a: int, b: int, c: int, min_confidence: float = 0.3) -> np.ndarray:
+    """
+    Angle at joint b (degrees) between segments b->a and b->c for every frame.
+
+    Returns:
+        np.ndarray: (T,) angles; NaN where any of the three keypoints is below min_confidence.
+    """
+    ba = keypoints[:, a, :2] - keypoints[:, b, :2]
+    bc = keypoints[:, c, :2] - keypoints[:, b, :2]
+    cos = np.sum(ba * bc, axis=1) / np.maximum(np.linalg.norm(ba, axis=1) * np.linalg.norm(bc, axis=1), 1e-9)
+    angle = np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+    confident = np.min(keypoints[:, [a, b, c], 2], axis=1) >= min_confidence
+    return np.where(confident, angle, np.nan)
+
+class BiomechanicsAnalyzer:
+    # Joint angle triplets (outer, joint, outer)
+    ANGLES = {
+        'left_elbow': (L_SHOULDER, L_ELBOW, L_WRIST),
+        'right_elbow': (R_SHOULDER, R_ELBOW, R_WRIST),
+        'left_knee': (L_HIP, L_KNEE, L_ANKLE),
+        'right_knee': (R_HIP, R_KNEE, R_ANKLE),
+    }
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Initialize the BiomechanicsAnalyzer.
+
+        Turns a player's (T, 17, 3) keypoint tensor into per-frame features
+        (joint angles, trunk lean, stance width, lunge depth, arm-swing
+        speed) with array operations. Low-confidence keypoints yield NaN.
+        Lengths are in torso lengths so features do not depend on the
+        player's distance from the camera.
+        """
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        bio_cfg = self.config.get('pose', {}).get('biomechanics', {})
+        self.min_confidence = bio_cfg.get('min_confidence', 0.3)
+        self.max_frame_gap = bio_cfg.get('max_frame_gap', 2) # frames; swing speed is not taken across larger gaps
+
+    def features(self, keypoints: np.ndarray, frames: np.ndarray, fps: float) -> Dict[str, np.ndarray]:
+        """
+        Per-frame features of one player.
+
+        Args:
+            keypoints: (T, 17, 3) [x, y, confidence] in pixels.
+            frames: (T,) sorted frame indices.
+            fps: Frame rate.
+
+        Returns:
+            Dict of (T,) arrays: '<joint>_angle' (deg), 'trunk_lean' (deg from
+            vertical), 'stance_width' and 'swing_speed' (torso lengths, per
+            second for speed) and 'lunge_depth' (deg of knee flexion of the
+            more bent leg).
+        """
+        keypoints = np.asarray(keypoints, dtype=np.float64).reshape(-1, 17, 3)
+        frames = np.asarray(frames, dtype=np.float64)
+        conf = keypoints[:, :, 2] >= self.min_confidence
+        xy = np.where(conf[:, :, None], keypoints[:, :, :2], np.nan) # Masked coordinates
+
+        result = {f'{name}_angle': joint_angle(keypoints, *idx, self.min_confidence) for name, idx in self.ANGLES.items()}
+
+        # Trunk: mid-shoulder to mid-hip, image y points down
+        shoulders = (xy[:, L_SHOULDER] + xy[:, R_SHOULDER]) / 2
+        hips = (xy[:, L_HIP] + xy[:, R_HIP]) / 2
+        trunk = shoulders - hips
+        torso = np.linalg.norm(trunk, axis=1)
+        torso = np.where(torso > 1e-6, torso, np.nan)
+        result['trunk_lean'] = np.degrees(np.arctan2(np.abs(trunk[:, 0]), -trunk[:, 1]))
+
+        result['stance_width'] = np.linalg.norm(xy[:, L_ANKLE] - xy[:, R_ANKLE], axis=1) / torso
+
+        # fmax ignores a NaN knee when the other one is visible
+        flexion = 180.0 - np.stack([result['left_knee_angle'], result['right_knee_angle']])
+        with np.errstate(invalid='ignore'):
+            result['lunge_depth'] = np.fmax(flexion[0], flexion[1])
+
+        # Fastest wrist between consecutive samples, in torso lengths per second
+        swing = np.full(len(frames), np.nan)
+        if len(frames) > 1:
+            dt = np.diff(frames) / fps
+            step = np.linalg.norm(np.diff(xy[:, [L_WRIST, R_WRIST]], axis=0), axis=2) # (T-1, 2)
+            scale = np.fmin(torso[1:], torso[:-1])
+            with np.errstate(invalid='ignore'):
+                speed = np.fmax(step[:, 0], step[:, 1]) / dt / scale
+            speed[np.diff(frames) > self.max_frame_gap] = np.nan
+            swing[1:] = speed
+        result['swing_speed'] = swing
+        return result
+
+    @staticmethod
+    def summarize(features: Dict[str, np.ndarray]) -> Dict[str, Optional[float]]:
+        """Match-level aggregates for the report (None where never observed)."""
+        def agg(fn, values):
+            values = values[np.isfinite(values)]
+            return float(fn(values)) if len(values) else None
+
+        return {
+            'mean_knee_angle_deg': agg(np.mean, np.concatenate([features['left_knee_angle'], features['right_knee_angle']])),
+            'max_lunge_depth_deg': agg(np.max, features['lunge_depth']),
+            'mean_stance_width': agg(np.mean, features['stance_width']),
+            'mean_trunk_lean_deg': agg(np.mean, features['trunk_lean']),
+            'max_swing_speed': agg(lambda v: np.percentile(v, 99), features['swing_speed']), # Robust peak
+        }
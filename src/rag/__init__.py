@@ -1,2 +1,9 @@
 from .knowledge_base import KnowledgeBase
+from .embedding_cache import EmbeddingCache
+from .index import EmbeddingMatrix
+from .store import VectorStore
+from .encoder import get_encoder, encoder_available
+from .bm25 import BM25Index
+from .llm_cache import ResponseCache
+from .ingest import CorpusIngester, chunk_text
 from .report import ReportGenerator
@@ -0,0 +1,98 @@
+import re
+import math
+import heapq
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("a an and are as at be by for from how in is it of on or the to with".split())
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens without stopwords, trailing plural 's' stripped ("drills" -> "drill")."""
+    return [t[:-1] if len(t) > 3 and t.endswith('s') and not t.endswith('ss') else t
+            for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+class BM25Index:
+    """
+    Incremental inverted index with Okapi BM25 scoring.
+
+    Documents are tokenized once on insert; a query only walks the posting
+    lists of its own terms, so its cost follows posting-list sizes rather
+    than corpus size.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize the BM25Index.
+
+        Args:
+            k1: Term-frequency saturation.
+            b: Document-length normalization (0 = none, 1 = full).
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {} # term -> {doc_id: term frequency}
+        self._lengths: Dict[str, int] = {} # doc_id -> token count
+        self._terms: Dict[str, Tuple[str, ...]] = {} # doc_id -> distinct terms, for removal
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._lengths
+
+    def add(self, doc_id: str, text: str):
+        """Index a document, replacing an existing one with the same id."""
+        if doc_id in self._lengths:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._lengths[doc_id] = len(tokens)
+        self._terms[doc_id] = tuple(counts)
+        self._total_length += len(tokens)
+
+    def remove(self, doc_id: str):
+        """Drop a document (no-op if absent)."""
+        if doc_id not in self._lengths:
+            return
+        for term in self._terms.pop(doc_id):
+            posting = self._postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def scores(self, query: str, allowed: Optional[Set[str]] = None) -> Dict[str, float]:
+        """
+        BM25 score of every document sharing a term with the query.
+
+        Args:
+            query: Query text.
+            allowed: Optional doc ids to restrict to (e.g. a metadata filter).
+
+        Returns:
+            Dict[str, float]: doc_id -> score (documents without matches are absent).
+        """
+        n = len(self._lengths)
+        if n == 0:
+            return {}
+        avg_length = self._total_length / n
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1.0 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = self.k1 * (1.0 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+        return scores
+
+    def search(self, query: str, k: int, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, score), best first."""
+        return heapq.nlargest(k, self.scores(query, allowed).items(), key=lambda item: item[1])
@@ -0,0 +1,141 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import numpy as np
+from typing import Dict, List, Optional
+from filelock import FileLock
+
+logger = logging.getLogger("badminton_cv.rag")
+
+class EmbeddingCache:
+    """
+    On-disk cache of text embeddings keyed by content hash, one set of files per encoder.
+
+    Rebuilding a knowledge base from unchanged text then needs no model
+    calls at all. `<encoder>.keys` holds one fixed-width hash per line and
+    `<encoder>.f32` the matching float32 rows. Both files are append-only,
+    so an insert costs O(new entries). Appends take a file lock and first
+    catch up with other processes' entries, so web workers sharing the
+    cache never drop each other's vectors.
+    """
+
+    KEY_BYTES = 65 # sha256 hex digest and newline
+
+    def __init__(self, cache_dir: str, encoder_name: str):
+        """
+        Initialize the EmbeddingCache.
+
+        Args:
+            cache_dir: Directory holding the cache files.
+            encoder_name: Encoder identifier; embeddings of different encoders never mix.
+        """
+        self.cache_dir = cache_dir
+        self.encoder_name = encoder_name
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', encoder_name)
+        base = os.path.join(cache_dir, slug)
+        self.keys_path = base + ".keys"
+        self.vectors_path = base + ".f32"
+        self.meta_path = base + ".json"
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = FileLock(base + ".lock")
+        self._rows: Dict[str, int] = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32) # Grows by doubling; rows past _count are unused
+        self._count = 0
+        self._dim: Optional[int] = None
+        self._sync()
+        self._import_legacy(base + ".npz")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def key(text: str) -> str:
+        """Content hash of a text."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vectors for keys (None where missing)."""
+        if any(k not in self._rows for k in keys):
+            self._sync() # Another process may have encoded them since
+        return [self._vectors[self._rows[k]] if k in self._rows else None for k in keys]
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        """Append vectors for keys not cached yet."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), -1)
+        with self._lock:
+            self._sync()
+            seen, new = set(self._rows), []
+            for i, k in enumerate(keys):
+                if k not in seen:
+                    seen.add(k)
+                    new.append(i)
+            if not new:
+                return
+            if self._dim is not None and self._dim != vectors.shape[1]:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match cached size {self._dim}")
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                with open(self.meta_path, "w") as f:
+                    json.dump({'dim': self._dim, 'encoder': self.encoder_name}, f)
+
+            # Drop the tail of an interrupted append so rows line up with keys
+            for path, size in ((self.vectors_path, self._count * self._dim * 4), (self.keys_path, self._count * self.KEY_BYTES)):
+                if os.path.exists(path) and os.path.getsize(path) != size:
+                    os.truncate(path, size)
+
+            # Vectors first: a crash before the keys leaves an unreferenced tail, which is dropped
+            added = vectors[new]
+            with open(self.vectors_path, "ab") as f:
+                added.tofile(f)
+            with open(self.keys_path, "a") as f:
+                f.writelines(keys[i] + "\n" for i in new)
+            self._extend([keys[i] for i in new], added)
+
+    def _sync(self):
+        """Read entries appended (by any process) since the last sync."""
+        if self._dim is None:
+            if not os.path.exists(self.meta_path):
+                return
+            try:
+                with open(self.meta_path) as f:
+                    self._dim = int(json.load(f)['dim'])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable embedding cache {self.meta_path}: {e}")
+                return
+
+        n = os.path.getsize(self.keys_path) // self.KEY_BYTES if os.path.exists(self.keys_path) else 0
+        if n <= self._count:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._count * self.KEY_BYTES)
+            keys = f.read((n - self._count) * self.KEY_BYTES).decode('ascii').split("\n")[:-1]
+        row_bytes = self._dim * 4
+        vectors = np.fromfile(self.vectors_path, dtype=np.float32, count=len(keys) * self._dim,
+                              offset=self._count * row_bytes)
+        rows = len(vectors) // self._dim
+        self._extend(keys[:rows], vectors[:rows * self._dim].reshape(rows, self._dim))
+
+    def _extend(self, keys: List[str], vectors: np.ndarray):
+        needed = self._count + len(keys)
+        if needed > len(self._vectors):
+            grown = np.zeros((max(needed, 2 * len(self._vectors)), vectors.shape[1]), dtype=np.float32)
+            if self._count:
+                grown[:self._count] = self._vectors[:self._count]
+            self._vectors = grown
+        self._vectors[self._count:needed] = vectors
+        for row, k in enumerate(keys, start=self._count):
+            self._rows[k] = row
+        self._count = needed
+
+    def _import_legacy(self, path: str):
+        """Move a cache written before the append-only layout (one .npz) into it."""
+        if not os.path.exists(path):
+            return
+        try:
+            with np.load(path) as data:
+                self.put_many([str(k) for k in data['keys']], data['vectors'])
+            os.remove(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embedding cache {path}: {e}")
@@ -0,0 +1,42 @@
+import logging
+import threading
+import importlib.util
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("badminton_cv.rag")
+
+_encoders: Dict[Tuple[str, Optional[str]], Any] = {}
+_lock = threading.Lock()
+
+def encoder_available() -> bool:
+    """Whether sentence-transformers is installed, without importing it."""
+    return importlib.util.find_spec("sentence_transformers") is not None
+
+def get_encoder(name: str = 'all-MiniLM-L6-v2', backend: Optional[str] = None) -> Any:
+    """
+    Process-wide shared SentenceTransformer, loaded on first use.
+
+    Every KnowledgeBase in the process (pipeline, web workers, CLI) gets the
+    same instance, so the model is loaded and held in memory once.
+
+    Args:
+        name: Model name.
+        backend: Optional inference runtime, e.g. 'onnx' or 'openvino' for a
+                 lighter CPU deployment (sentence-transformers >= 3.2). None
+                 uses PyTorch.
+
+    Returns:
+        The encoder.
+    """
+    key = (name, backend)
+    encoder = _encoders.get(key)
+    if encoder is not None:
+        return encoder
+
+    with _lock:
+        if key not in _encoders:
+            from sentence_transformers import SentenceTransformer
+            kwargs = {'backend': backend} if backend else {}
+            _encoders[key] = SentenceTransformer(name, **kwargs)
+            logger.info(f"SentenceTransformer {name} loaded for semantic search" + (f" ({backend} backend)." if backend else "."))
+        return _encoders[key]
@@ -0,0 +1,170 @@
+import numpy as np
+from typing import Optional, Tuple
+
+class EmbeddingMatrix:
+    """
+    Contiguous float32 matrix of L2-normalized embeddings.
+
+    Rows are appended with amortized doubling, so inserts never copy the whole
+    corpus per document, and cosine similarity is a single matrix-vector product.
+    """
+    __slots__ = ('_data', 'size')
+
+    def __init__(self, dim: Optional[int] = None, capacity: int = 1024):
+        self._data = np.zeros((capacity, dim), dtype=np.float32) if dim else None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def dim(self) -> Optional[int]:
+        return None if self._data is None else self._data.shape[1]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """(N, D) view of the stored rows."""
+        if self._data is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._data[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self._data is None else self._data.nbytes
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """Row-wise L2 normalization (zero rows stay zero)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Append rows.
+
+        Args:
+            vectors: (K, D) embeddings (normalized here).
+
+        Returns:
+            np.ndarray: (K,) row indices of the new rows.
+        """
+        vectors = self.normalize(vectors).reshape(len(vectors), -1)
+        if self._data is None:
+            self._data = np.zeros((max(1024, len(vectors)), vectors.shape[1]), dtype=np.float32)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding size {vectors.shape[1]} does not match index size {self.dim}")
+
+        needed = self.size + len(vectors)
+        if needed > len(self._data):
+            grown = np.zeros((max(needed, 2 * len(self._data)), self.dim), dtype=np.float32)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+
+        rows = np.arange(self.size, needed)
+        self._data[self.size:needed] = vectors
+        self.size = needed
+        return rows
+
+    def search(self, query: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows by cosine similarity.
+
+        Args:
+            query: (D,) query embedding.
+            k: Number of results.
+            rows: Optional candidate row indices (e.g. a metadata filter).
+
+        Returns:
+            (indices, scores): Best first.
+        """
+        indices, scores = self.search_many(np.asarray(query).reshape(1, -1), k, rows)
+        return indices[0], scores[0]
+
+    def search_many(self, queries: np.ndarray, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows for a batch of queries with one matrix multiply.
+
+        Args:
+            queries: (Q, D) query embeddings.
+            k: Number of results per query.
+            rows: Optional candidate row indices shared by all queries.
+
+        Returns:
+            (indices, scores): (Q, k') arrays, best first per query.
+        """
+        matrix = self.matrix
+        if rows is not None:
+            matrix = matrix[rows]
+        if k <= 0 or len(matrix) == 0:
+            return np.zeros((len(queries), 0), dtype=int), np.zeros((len(queries), 0), dtype=np.float32)
+
+        scores = matrix @ self.normalize(queries).reshape(len(queries), -1).T # (N, Q)
+        k = min(k, len(scores))
+        # argpartition is O(N); only the k winners are sorted
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        top_scores = np.take_along_axis(scores, top, axis=0)
+        order = np.argsort(-top_scores, axis=0, kind='stable')
+        top = np.take_along_axis(top, order, axis=0).T
+        top_scores = np.take_along_axis(top_scores, order, axis=0).T
+        indices = top if rows is None else np.asarray(rows)[top]
+        return indices, top_scores
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over an EmbeddingMatrix.
+
+    Rows are bucketed by their nearest of `nlist` spherical k-means centroids;
+    a query only scans the `nprobe` buckets whose centroids score best.
+    """
+
+    def __init__(self, matrix: np.ndarray, nlist: Optional[int] = None, iterations: int = 10,
+                 sample_per_list: int = 64, seed: int = 0):
+        """
+        Initialize the IVFIndex.
+
+        Trains the centroids on a sample of the rows and assigns every row.
+
+        Args:
+            matrix: (N, D) L2-normalized rows.
+            nlist: Number of buckets (default sqrt(N)).
+            iterations: k-means iterations.
+            sample_per_list: Training rows per bucket.
+            seed: Random seed for sampling and initialization.
+        """
+        n = len(matrix)
+        self.nlist = max(1, min(nlist or int(np.sqrt(n)), n))
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(n, min(n, self.nlist * sample_per_list), replace=False)]
+
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            filled = np.bincount(assign, minlength=self.nlist) > 0 # Empty buckets keep their centroid
+            centroids[filled] = EmbeddingMatrix.normalize(sums[filled])
+        self.centroids = centroids
+        self.trained_size = n
+        self.size = 0
+        self._assign = np.zeros(0, dtype=np.int32)
+        self.extend(matrix)
+
+    def extend(self, matrix: np.ndarray, chunk: int = 65536):
+        """Assign rows [size:] of the matrix to buckets (rows before `size` are already indexed)."""
+        new = [np.argmax(matrix[i:i + chunk] @ self.centroids.T, axis=1).astype(np.int32)
+               for i in range(self.size, len(matrix), chunk)]
+        if not new:
+            return
+        self._assign = np.concatenate([self._assign] + new)
+        self.size = len(matrix)
+        # Rows grouped by bucket: bucket b is _order[_offsets[b]:_offsets[b + 1]]
+        self._order = np.argsort(self._assign, kind='stable')
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(self._assign, minlength=self.nlist))])
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row indices in the `nprobe` buckets closest to the query."""
+        scores = self.centroids @ EmbeddingMatrix.normalize(query).ravel()
+        nprobe = min(nprobe, self.nlist)
+        probe = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self._order[self._offsets[b]:self._offsets[b + 1]] for b in probe])
@@ -0,0 +1,187 @@
+import os
+import re
+import json
+import hashlib
+import logging
+from typing import Dict, List, Optional, Any, Tuple
+from src.utils.config import get_config
+from .knowledge_base import KnowledgeBase
+
+logger = logging.getLogger("badminton_cv.rag")
+
+CORPUS_EXTENSIONS = ('.md', '.markdown', '.txt')
+MANIFEST_VERSION = 2
+
+def chunk_text(text: str, chunk_size: int = 800) -> List[str]:
+    """
+    Split markdown/text into chunks of at most `chunk_size` characters.
+
+    Headings start a new chunk; paragraphs are packed greedily; a paragraph
+    longer than a chunk is cut at sentence, then word boundaries.
+    """
+    pieces = []
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        if len(block) <= chunk_size:
+            pieces.append(block)
+            continue
+        current = ""
+        for sentence in re.split(r"(?<=[.!?])\s+", block):
+            for part in (sentence.split() if len(sentence) > chunk_size else [sentence]):
+                while len(part) > chunk_size: # A single overlong word
+                    pieces.append(part[:chunk_size])
+                    part = part[chunk_size:]
+                if current and len(current) + 1 + len(part) > chunk_size:
+                    pieces.append(current)
+                    current = part
+                else:
+                    current = f"{current} {part}" if current else part
+        if current:
+            pieces.append(current)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and (piece.startswith('#') or len(current) + 2 + len(piece) > chunk_size):
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+class CorpusIngester:
+    def __init__(self, knowledge_base: KnowledgeBase, config: Optional[Dict] = None):
+        """
+        Initialize the CorpusIngester.
+
+        Indexes directories of markdown/text coaching material into the
+        knowledge base. Files are chunked; chunk `i` of a file has the id
+        `<corpus root>/<path>#i`, so edits upsert in place and corpora never
+        collide. A manifest of mtime, size and content hash per file and
+        corpus root (kept next to a persistent store) lets unchanged files
+        be skipped without being read.
+        """
+        self.kb = knowledge_base
+        self._config_config = config if config else get_config()
+        self.config = self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
+
+        rag_cfg = self.config.get('rag', {})
+        self.chunk_size = rag_cfg.get('chunk_size', 800) # characters
+        self.batch_size = rag_cfg.get('ingest_batch_size', 64) # chunks per encoder call
+        self.workers = rag_cfg.get('ingest_workers', 4) # encoder batches in parallel
+
+    @property
+    def manifest_path(self) -> Optional[str]:
+        # Only a persistent store remembers what was ingested in earlier processes
+        return os.path.join(self.kb.store.path, "ingest_manifest.json") if self.kb.store.path else None
+
+    def ingest(self, corpus_dir: str) -> Dict[str, int]:
+        """
+        Sync the knowledge base with a corpus directory.
+
+        Only material from this directory is added, updated or removed;
+        other ingested corpora are left alone.
+
+        Args:
+            corpus_dir: Directory searched recursively for .md/.markdown/.txt files.
+
+        Returns:
+            Dict of counts: files, unchanged, updated, removed (files) and chunks (upserted).
+        """
+        root = os.path.abspath(corpus_dir).replace(os.sep, '/')
+        corpora = self._load_manifest()
+        manifest = corpora.setdefault(root, {})
+        seen = set()
+        documents: List[Tuple[str, Dict[str, Any]]] = []
+        ids: List[str] = []
+        stale_ids: List[str] = []
+        stats = {'files': 0, 'unchanged': 0, 'updated': 0, 'removed': 0, 'chunks': 0}
+
+        for path in self._scan(corpus_dir):
+            rel = os.path.relpath(path, corpus_dir).replace(os.sep, '/')
+            seen.add(rel)
+            stats['files'] += 1
+            stat = os.stat(path)
+            entry = manifest.get(rel)
+            if entry and entry['chunks'] and self.chunk_id(root, rel, 0) not in self.kb.store: # Store was rebuilt since
+                entry = None
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                stats['unchanged'] += 1
+                continue
+
+            with open(path, encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            if entry and entry['sha256'] == digest: # Touched, not edited
+                entry.update(mtime=stat.st_mtime, size=stat.st_size)
+                stats['unchanged'] += 1
+                continue
+
+            chunks = chunk_text(text, self.chunk_size)
+            topic = os.path.splitext(rel.split('/')[0])[0]
+            for i, chunk in enumerate(chunks):
+                ids.append(self.chunk_id(root, rel, i))
+                documents.append((chunk, {'corpus': root, 'source': rel, 'chunk': i, 'topic': topic}))
+            if entry:
+                stale_ids += [self.chunk_id(root, rel, i) for i in range(len(chunks), entry['chunks'])]
+            manifest[rel] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': digest, 'chunks': len(chunks)}
+            stats['updated'] += 1
+            stats['chunks'] += len(chunks)
+
+        for rel in set(manifest) - seen:
+            stale_ids += [self.chunk_id(root, rel, i) for i in range(manifest.pop(rel)['chunks'])]
+            stats['removed'] += 1
+
+        if stale_ids:
+            self.kb.delete(stale_ids)
+        if documents:
+            self.kb.add_documents(documents, ids=ids, batch_size=self.batch_size, workers=self.workers)
+        if not manifest:
+            del corpora[root]
+        self._save_manifest(corpora)
+        logger.info(f"Ingested {corpus_dir}: {stats}")
+        return stats
+
+    @staticmethod
+    def chunk_id(root: str, rel: str, index: int) -> str:
+        return f"{root}/{rel}#{index}"
+
+    @staticmethod
+    def _scan(corpus_dir: str) -> List[str]:
+        paths = []
+        for root, dirs, files in os.walk(corpus_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            paths += [os.path.join(root, name) for name in sorted(files) if name.lower().endswith(CORPUS_EXTENSIONS)]
+        return paths
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Manifest entries by corpus root, then by path relative to it."""
+        if self.manifest_path is None or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable ingest manifest {self.manifest_path}: {e}")
+            return {}
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest['corpora']
+
+        # Older manifests were keyed by relative path alone: drop their chunks and re-ingest
+        legacy_ids = [f"{rel}#{i}" for rel, entry in manifest.items() for i in range(entry.get('chunks', 0))]
+        if legacy_ids:
+            logger.info(f"Replacing {len(legacy_ids)} chunks from an old ingest manifest.")
+            self.kb.delete(legacy_ids)
+        return {}
+
+    def _save_manifest(self, corpora: Dict[str, Dict[str, Dict[str, Any]]]):
+        if self.manifest_path is None:
+            return
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({'version': MANIFEST_VERSION, 'corpora': corpora}, f)
+        os.replace(tmp_path, self.manifest_path)
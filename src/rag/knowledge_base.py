@@ -1,64 +1,249 @@
+import os
+import heapq
 import logging
-from typing import List, Dict, Optional, Any
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Tuple
 from src.utils.config import get_config
+from .embedding_cache import EmbeddingCache
+from .store import VectorStore
+from .encoder import encoder_available, get_encoder
+from .bm25 import BM25Index
 
 logger = logging.getLogger("badminton_cv.rag")
 
 class KnowledgeBase:
-    def __init__(self, config: Optional[Dict] = None):
+    def __init__(self, config: Optional[Dict] = None, encoder: Optional[Any] = None):
         """
         Initialize the KnowledgeBase.
+        
+        Args:
+            config: Config dict.
+            encoder: Optional existing sentence encoder (anything with a
+                     SentenceTransformer-style `encode`). If None, the shared encoder
+                     named in config is loaded on first encode or query.
         """
         self._config_config = config if config else get_config()
         self.config = self._config_config.config if hasattr(self._config_config, 'config') else self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
         
-        self.documents = [] # List of {'text': str, 'metadata': dict}
+        rag_cfg = self.config.get('rag', {})
+        self.encoder_name = rag_cfg.get('encoder_model', 'all-MiniLM-L6-v2')
+        self.encoder_backend = rag_cfg.get('encoder_backend') # e.g. 'onnx'; None = PyTorch
+        self.cache_dir = rag_cfg.get('embedding_cache_dir', 'data/embedding_cache')
+        self.embedding_cache = None
         
-        # Try to load sentence transformer for embeddings
-        try:
-            from sentence_transformers import SentenceTransformer
-            self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
-            self.has_encoder = True
-            logger.info("SentenceTransformer loaded for semantic search.")
-        except ImportError:
-            self.has_encoder = False
+        # The model itself is loaded lazily (see `encoder`)
+        self._encoder = encoder
+        self.has_encoder = encoder is not None or encoder_available()
+        if self.has_encoder:
+            self.embedding_cache = EmbeddingCache(self.cache_dir, self.encoder_name)
+        else:
             logger.warning("SentenceTransformer not found. Using keyword search.")
-        except Exception as e:
-             self.has_encoder = False
-             logger.warning(f"Failed to load encoder: {e}. Using keyword search.")
+        
+        # Embedded collections persist under db_path and are reopened instead of re-embedded
+        store_path = None
+        if self.has_encoder and rag_cfg.get('persist', True):
+            store_path = os.path.join(rag_cfg.get('db_path', 'data/knowledge_base'), rag_cfg.get('collection_name', 'badminton_coaching'))
+        self.store = VectorStore(store_path, model=self.encoder_name,
+                                 ann_threshold=rag_cfg.get('ann_threshold', 20000),
+                                 nprobe=rag_cfg.get('ann_nprobe', 16))
+        
+        # Lexical index: keyword fallback, and the lexical half of hybrid ranking
+        self.hybrid = rag_cfg.get('retrieval', 'semantic') == 'hybrid'
+        self.rrf_k = rag_cfg.get('rrf_k', 60) # Reciprocal-rank-fusion damping
+        self.bm25_params = (rag_cfg.get('bm25_k1', 1.5), rag_cfg.get('bm25_b', 0.75))
+        # Maintained by add_documents/delete whenever lexical retrieval is configured, so
+        # no query pays for a corpus-wide build; otherwise built only if the encoder fails
+        self._bm25: Optional[BM25Index] = None
+        if self.hybrid or not self.has_encoder:
+            self._bm25 = self._build_bm25()
+
+    @property
+    def encoder(self) -> Optional[Any]:
+        """Sentence encoder, loaded (and shared process-wide) on first use; None if unavailable."""
+        if self._encoder is None and self.has_encoder:
+            try:
+                self._encoder = get_encoder(self.encoder_name, self.encoder_backend)
+            except Exception as e:
+                logger.warning(f"Failed to load encoder: {e}. Using keyword search.")
+                self._disable_encoder()
+        return self._encoder
+
+    def _disable_encoder(self):
+        """Fall back to keyword search over an in-memory copy of the documents."""
+        self.has_encoder = False
+        docs = self.store.documents
+        self.store = VectorStore()
+        if docs:
+            self.store.upsert([d['id'] for d in docs], [d['text'] for d in docs], [d['metadata'] for d in docs])
+
+    @property
+    def bm25(self) -> BM25Index:
+        """BM25 index over the documents, kept in sync with every add and delete."""
+        if self._bm25 is None:
+            self._bm25 = self._build_bm25()
+        return self._bm25
+
+    def _build_bm25(self) -> BM25Index:
+        index = BM25Index(*self.bm25_params)
+        for doc in self.store.documents:
+            index.add(doc['id'], doc['text'])
+        return index
+
+    @property
+    def documents(self) -> List[Dict[str, Any]]:
+        """Documents as {'id', 'text', 'metadata'}; row i of `embeddings`."""
+        return self.store.documents
 
-    def add_document(self, text: str, metadata: Dict[str, Any] = None):
+    @property
+    def embeddings(self):
+        return self.store.embeddings
+
+    def add_document(self, text: str, metadata: Dict[str, Any] = None, doc_id: Optional[str] = None):
         """Add a document to the knowledge base."""
-        doc = {'text': text, 'metadata': metadata or {}}
-        if self.has_encoder:
-            doc['embedding'] = self.encoder.encode(text)
-        self.documents.append(doc)
+        self.add_documents([(text, metadata)], ids=None if doc_id is None else [doc_id])
 
-    def query(self, query_text: str, n_results: int = 3) -> List[Dict[str, Any]]:
-        """Retrieve relevant documents."""
-        if not self.documents:
-            return []
+    def add_documents(self, documents: List[Tuple[str, Optional[Dict[str, Any]]]], ids: Optional[List[str]] = None,
+                      batch_size: Optional[int] = None, workers: int = 1):
+        """
+        Upsert documents with a single batched encode call.
+        
+        Documents already stored with the same id, text and metadata are
+        skipped; other embeddings are looked up in the on-disk cache by
+        content hash first, so unchanged text is never re-encoded.
+        
+        Args:
+            documents: List of (text, metadata) pairs.
+            ids: Optional document ids (default: content hash of the text).
+            batch_size: Optional encoder batch size (see `encode`).
+            workers: Batches encoded in parallel (see `encode`).
+        """
+        ids = ids or [EmbeddingCache.key(text) for text, _ in documents]
+        batch = {} # Last occurrence of an id wins
+        for doc_id, (text, metadata) in zip(ids, documents):
+            batch[doc_id] = (text, metadata or {})
+        changed = []
+        for doc_id, (text, metadata) in batch.items():
+            stored = self.store.get(doc_id)
+            if stored is None or stored['text'] != text or stored['metadata'] != metadata:
+                changed.append((doc_id, text, metadata))
+        if not changed:
+            return
+        
+        doc_ids, texts, metadatas = map(list, zip(*changed))
+        vectors = self.encode(texts, batch_size, workers) if self.has_encoder else None # Loads the encoder only on a cache miss
+        self.store.upsert(doc_ids, texts, metadatas, vectors)
+        if self._bm25 is not None:
+            for doc_id, text in zip(doc_ids, texts):
+                self._bm25.add(doc_id, text)
 
-        if self.has_encoder:
-            import numpy as np
-            from sklearn.metrics.pairwise import cosine_similarity
-            
-            query_emb = self.encoder.encode(query_text).reshape(1, -1)
-            doc_embs = np.array([d['embedding'] for d in self.documents])
-            
-            scores = cosine_similarity(query_emb, doc_embs)[0]
-            top_k_indices = scores.argsort()[-n_results:][::-1]
+    def delete(self, ids: List[str]) -> int:
+        """Remove documents by id; returns how many were present."""
+        if self._bm25 is not None:
+            for doc_id in ids:
+                self._bm25.remove(doc_id)
+        return self.store.delete(ids)
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None, workers: int = 1) -> np.ndarray:
+        """
+        Embed texts, encoding only cache misses.
+        
+        Args:
+            texts: Texts to embed.
+            batch_size: Split the misses into batches of this size (default: one batch).
+            workers: Batches encoded concurrently in threads (the encoder's
+                     forward pass releases the GIL). The cache is written once.
+        
+        Returns:
+            np.ndarray: (N, D) float32 embeddings, or None if the encoder failed to load.
+        """
+        keys = [EmbeddingCache.key(t) for t in texts]
+        cached = self.embedding_cache.get_many(keys)
+        missing = [i for i, v in enumerate(cached) if v is None]
+        if missing:
+            if self.encoder is None:
+                return None
+            size = batch_size or len(missing)
+            batches = [[texts[i] for i in missing[j:j + size]] for j in range(0, len(missing), size)]
+            if workers > 1 and len(batches) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    parts = list(pool.map(self.encoder.encode, batches))
+            else:
+                parts = [self.encoder.encode(batch) for batch in batches]
+            encoded = np.concatenate([np.asarray(p, dtype=np.float32).reshape(len(b), -1) for p, b in zip(parts, batches)])
+            self.embedding_cache.put_many([keys[i] for i in missing], encoded)
+            for i, vector in zip(missing, encoded):
+                cached[i] = vector
+            logger.debug(f"Encoded {len(missing)} of {len(texts)} texts ({len(texts) - len(missing)} cached).")
+        return np.stack(cached) if cached else np.zeros((0, 0), dtype=np.float32)
+
+    def query(self, query_text: str, n_results: int = 3, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve relevant documents.
+        
+        Args:
+            query_text: Query.
+            n_results: Maximum number of documents.
+            where: Optional metadata filter, e.g. {'topic': 'footwork'}.
+        """
+        return self.query_many([query_text], n_results, where, merge=False)[0]
+
+    def query_many(self, queries: List[str], n_results: int = 3, where: Optional[Dict[str, Any]] = None,
+                   merge: bool = True) -> List[Any]:
+        """
+        Retrieve documents for several queries at once.
+        
+        Duplicate queries are answered once; all distinct queries are encoded
+        in one batch and scored with one matrix multiply.
+        
+        Args:
+            queries: Query texts.
+            n_results: Maximum number of documents per query.
+            where: Optional metadata filter applied to every query.
+            merge: If True, one list of documents in query then rank order,
+                   without duplicates; otherwise one list per input query.
+        """
+        unique = list(dict.fromkeys(queries))
+        if not self.documents or not unique:
+            results = {q: [] for q in unique}
+        else:
+            results = dict(zip(unique, self._search(unique, n_results, where)))
+        
+        if not merge:
+            return [results[q] for q in queries]
+        merged, seen = [], set()
+        for q in unique:
+            for doc in results[q]:
+                if doc['id'] not in seen:
+                    seen.add(doc['id'])
+                    merged.append(doc)
+        return merged
+
+    def _search(self, queries: List[str], n_results: int, where: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Ranked documents for each of several distinct queries."""
+        rows = self.store.filter_rows(where)
+        allowed = None if rows is None else {self.documents[r]['id'] for r in rows}
+
+        if self.encoder is not None:
+            query_embs = np.asarray(self.encoder.encode(queries), dtype=np.float32).reshape(len(queries), -1)
+            if not self.hybrid:
+                top_rows, _ = self.store.search_many(query_embs, n_results, where)
+                return [[self.documents[i] for i in top] for top in top_rows]
             
-            return [self.documents[i] for i in top_k_indices]
+            # Hybrid: fuse semantic and BM25 rankings by reciprocal rank
+            pool = max(4 * n_results, 20)
+            semantic_rows, _ = self.store.search_many(query_embs, pool, where)
+            results = []
+            for query_text, semantic in zip(queries, semantic_rows):
+                lexical = self.bm25.search(query_text, pool, allowed)
+                fused: Dict[str, float] = {}
+                for ranking in ([self.documents[r]['id'] for r in semantic], [doc_id for doc_id, _ in lexical]):
+                    for rank, doc_id in enumerate(ranking):
+                        fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                top = heapq.nlargest(n_results, fused.items(), key=lambda item: item[1])
+                results.append([self.store.get(doc_id) for doc_id, _ in top])
+            return results
             
         else:
-            # Simple keyword matching fallback
-            scored_docs = []
-            query_words = set(query_text.lower().split())
-            
-            for doc in self.documents:
-                score = sum(1 for w in query_words if w in doc['text'].lower())
-                scored_docs.append((score, doc))
-                
-            scored_docs.sort(key=lambda x: x[0], reverse=True)
-            return [d[1] for d in scored_docs[:n_results] if d[0] > 0]
+            # Keyword fallback: BM25 over the inverted index
+            return [[self.store.get(doc_id) for doc_id, _ in self.bm25.search(q, n_results, allowed)] for q in queries]
@@ -1,18 +1,75 @@
 import logging
 import os
-from typing import Dict, List, Optional, Any
+import asyncio
+import threading
+import contextlib
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any, Tuple
 from src.utils.config import get_config
 from .knowledge_base import KnowledgeBase
+from .llm_cache import ResponseCache
 
 logger = logging.getLogger("badminton_cv.rag")
 
+_env_loaded = False
+_clients: Dict[Tuple[str, str], Any] = {} # (api key, model) -> GenerativeModel
+_client_lock = threading.Lock()
+
+def _load_env():
+    """Load .env once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except ImportError:
+            pass
+        _env_loaded = True
+
+def _gemini_client(api_key: str, model_name: str) -> Any:
+    """Configured Gemini model, created once per key and model and reused across reports."""
+    key = (api_key, model_name)
+    with _client_lock:
+        if key not in _clients:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _clients[key] = genai.GenerativeModel(model_name)
+        return _clients[key]
+
 class ReportGenerator:
-    def __init__(self, knowledge_base: KnowledgeBase, config: Optional[Dict] = None):
+    def __init__(self, knowledge_base: KnowledgeBase, config: Optional[Dict] = None, transport: Optional[Any] = None):
+        """
+        Initialize the ReportGenerator.
+        
+        Args:
+            knowledge_base: Coaching knowledge.
+            config: Config dict.
+            transport: Optional httpx transport for the 'http' backend, e.g.
+                       httpx.ASGITransport(app=stub_server.create_app()) in tests.
+        """
         self.kb = knowledge_base
         self._config_config = config if config else get_config()
         self.config = self._config_config.config if hasattr(self._config_config, 'config') else self._config_config.config if hasattr(self._config_config, 'config') else get_config().config
         
-        self.llm_model = self.config.get('rag.llm_model', 'gpt-4')
+        _load_env()
+        rag_cfg = self.config.get('rag', {})
+        self.llm_model = rag_cfg.get('llm_model', 'gpt-4')
+        self.gemini_model = rag_cfg.get('gemini_model', 'gemini-2.5-flash')
+        self.backend = rag_cfg.get('llm_backend', 'gemini') # 'gemini', or 'http' for an OpenAI-compatible server
+        self.llm_url = rag_cfg.get('llm_url', 'http://127.0.0.1:8001')
+        self.transport = transport
+        self.concurrency = rag_cfg.get('report_concurrency', 4) # LLM requests in flight
+        self.timeout = rag_cfg.get('report_timeout', 60.0) # seconds per section
+        self.max_rally_sections = rag_cfg.get('report_max_rallies', 3) # Longest rallies get their own section
+        # Swing speed a smash needs (torso lengths/s); slower arms get power drills
+        self.smash_swing_speed = self.config.get('events', {}).get('smash_swing_speed', 12.0)
+        
+        # Responses of identical prompts are reused across runs
+        self.cache = None
+        if rag_cfg.get('llm_cache', True):
+            self.cache = ResponseCache(rag_cfg.get('llm_cache_path', 'data/llm_cache.sqlite'),
+                                       ttl=rag_cfg.get('llm_cache_ttl', 7 * 24 * 3600),
+                                       max_entries=rag_cfg.get('llm_cache_max_entries', 1000))
+        
         # Check if we should mock (if no API key)
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.use_mock = self.api_key is None
@@ -20,32 +77,104 @@ class ReportGenerator:
         if self.use_mock:
             logger.info("No OPENAI_API_KEY found. Using Mock LLM.")
 
-    def generate_report(self, match_metrics: Dict[str, Any], events: List[Dict[str, Any]]) -> str:
+    @property
+    def model_name(self) -> str:
+        return self.llm_model if self.backend == 'http' else self.gemini_model
+
+    def generate_report(self, match_metrics: Dict[str, Any], events: List[Dict[str, Any]],
+                        on_chunk: Optional[Callable[[str], None]] = None) -> str:
         """
         Generate a coaching report.
+        
+        Blocking wrapper around `agenerate_report` for synchronous callers
+        (pipeline, CLI); async code (e.g. web handlers) must await
+        `agenerate_report` or iterate `stream_report` instead.
+        
+        Args:
+            match_metrics: MetricsCalculator summary.
+            events: Rallies.
+            on_chunk: Optional callback receiving markdown sections in report order as they complete.
         """
-        # 1. Analyze metrics to find weaknesses
-        context_queries = self._analyze_weaknesses(match_metrics)
-        
-        # 2. Retrieve knowledge
-        retrieved_docs = []
-        for q in context_queries:
-            docs = self.kb.query(q, n_results=2)
-            retrieved_docs.extend(docs)
-            
-        # Deduplicate
-        seen = set()
-        unique_docs = []
-        for d in retrieved_docs:
-            if d['text'] not in seen:
-                unique_docs.append(d)
-                seen.add(d['text'])
-                
-        # 3. Construct Prompt
-        prompt = self._construct_prompt(match_metrics, unique_docs)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.agenerate_report(match_metrics, events, on_chunk))
+        raise RuntimeError("generate_report() cannot run inside an event loop; await agenerate_report() instead.")
+
+    async def agenerate_report(self, match_metrics: Dict[str, Any], events: List[Dict[str, Any]],
+                               on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """Generate a coaching report from async code (arguments as for `generate_report`)."""
+        parts = []
+        async for chunk in self.stream_report(match_metrics, events):
+            parts.append(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+        return "".join(parts)
+
+    async def stream_report(self, match_metrics: Dict[str, Any], events: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """
+        Yield the report as markdown sections.
+        
+        The overview, each player and the longest rallies are separate LLM
+        requests sent concurrently (at most `concurrency` in flight, each
+        bounded by `timeout`). Sections are yielded in report order as soon
+        as they and all earlier ones are done; a section whose request fails
+        or times out falls back to its template.
+        """
+        sections = self._plan_sections(match_metrics, events)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._http_client() as client:
+            tasks = [asyncio.create_task(self._render_section(section, semaphore, client)) for section in sections]
+            try:
+                yield "# Badminton Coaching Report\n"
+                for task in tasks:
+                    yield await task
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def _plan_sections(self, metrics: Dict[str, Any], events: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Title, prompt and template fallback of every report section."""
+        # One batched retrieval for every section's queries
+        players = metrics.get('players', {})
+        overview_queries = self._analyze_weaknesses(metrics)
+        player_queries = {pid: self._player_queries(p_stats) or ["general badminton strategy"] for pid, p_stats in players.items()}
+        all_queries = overview_queries + [q for queries in player_queries.values() for q in queries]
+        retrieved = dict(zip(all_queries, self.kb.query_many(all_queries, n_results=2, merge=False)))
+        
+        docs = self._merge_docs([retrieved[q] for q in overview_queries])
+        prompt = self._construct_prompt(metrics, docs)
+        sections = [{
+            'title': "Match Overview",
+            'prompt': prompt,
+            'fallback': self._mock_llm_response(prompt) if self.use_mock else self._overview_template(metrics, docs)
+        }]
         
-        # 4. Call LLM
-        return self._call_llm(prompt)
+        for pid, p_stats in players.items():
+            docs = self._merge_docs([retrieved[q] for q in player_queries[pid]])
+            sections.append({
+                'title': f"Player {pid}",
+                'prompt': self._player_prompt(pid, p_stats, docs),
+                'fallback': self._player_template(p_stats, docs)
+            })
+            
+        longest = sorted(range(len(events)), key=lambda i: -events[i].get('duration', 0.0))[:self.max_rally_sections]
+        for i in sorted(longest):
+            sections.append({
+                'title': f"Rally {i + 1}",
+                'prompt': self._rally_prompt(events[i]),
+                'fallback': self._rally_template(events[i])
+            })
+        return sections
+
+    @staticmethod
+    def _merge_docs(results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Concatenate per-query results without duplicates."""
+        unique_docs = {}
+        for docs in results:
+            for d in docs:
+                unique_docs.setdefault(d['text'], d)
+        return list(unique_docs.values())
 
     def _analyze_weaknesses(self, metrics: Dict[str, Any]) -> List[str]:
         """Derive search queries from metrics."""
@@ -54,16 +183,29 @@ class ReportGenerator:
         if 'shuttle_max_speed_kmh' in metrics and metrics['shuttle_max_speed_kmh'] < 150:
             queries.append("how to improve smash power badminton")
             
-        # Check distance
         for pid, p_stats in metrics.get('players', {}).items():
-            if p_stats.get('total_distance_m', 0) < 500: # Low movement
-                queries.append("badminton footwork drills for agility")
+            queries.extend(self._player_queries(p_stats))
                 
         if not queries:
             queries.append("general badminton strategy")
             
         return queries
 
+    def _player_queries(self, p_stats: Dict[str, Any]) -> List[str]:
+        """Search queries for one player's weaknesses."""
+        queries = []
+        # Check distance
+        if p_stats.get('total_distance_m', 0) < 500: # Low movement
+            queries.append("badminton footwork drills for agility")
+            
+        # Pose-derived technique cues
+        bio = p_stats.get('biomechanics') or {}
+        if bio.get('max_lunge_depth_deg') is not None and bio['max_lunge_depth_deg'] < 60: # Shallow lunges
+            queries.append("badminton lunge technique knee bend net retrieval")
+        if bio.get('max_swing_speed') is not None and bio['max_swing_speed'] < self.smash_swing_speed: # Slow racket arm
+            queries.append("how to improve smash power badminton")
+        return queries
+
     def _construct_prompt(self, metrics: Dict[str, Any], docs: List[Dict[str, Any]]) -> str:
         context_str = "\n".join([f"- {d['text']}" for d in docs])
         
@@ -85,28 +227,106 @@ class ReportGenerator:
         """
         return prompt
 
-    def _call_llm(self, prompt: str) -> str:
-        # Load env vars if not loaded
-        from dotenv import load_dotenv
-        load_dotenv()
+    def _player_prompt(self, pid: Any, p_stats: Dict[str, Any], docs: List[Dict[str, Any]]) -> str:
+        context_str = "\n".join([f"- {d['text']}" for d in docs])
+        
+        prompt = f"""
+        You are an expert Badminton Coach. Write a short assessment of player {pid} from this match.
+        
+        Player Stats: {p_stats}
+        
+        Coaching Knowledge Context:
+        {context_str}
+        
+        Cover movement, technique and two recommended drills (reference the context).
+        """
+        return prompt
+
+    def _rally_prompt(self, rally: Dict[str, Any]) -> str:
+        shots = ", ".join(f"{s['type']} by player {s['player_id']}" for s in rally.get('shots', []))
         
+        prompt = f"""
+        You are an expert Badminton Coach. Comment briefly on the tactics of this rally.
+        
+        Duration: {rally.get('duration', 0.0):.1f} s
+        Shots ({rally.get('shot_count', 0)}): {shots or 'not detected'}
+        Final landing (court meters): {rally.get('landing')}
+        """
+        return prompt
+
+    async def _render_section(self, section: Dict[str, str], semaphore: asyncio.Semaphore, client: Any) -> str:
+        """Markdown of one section: cached response, LLM response, or template fallback."""
+        prompt = section['prompt']
+        text = self.cache.get(prompt, self.model_name) if self.cache is not None else None
+        if text is None:
+            async with semaphore:
+                try:
+                    text = await asyncio.wait_for(self._agenerate(prompt, client), self.timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"LLM request for '{section['title']}' timed out after {self.timeout}s; using template.")
+            if text is not None and self.cache is not None:
+                self.cache.put(prompt, self.model_name, text)
+        if text is None:
+            text = section['fallback']
+        return f"\n## {section['title']}\n\n{text.strip()}\n"
+
+    def _http_client(self) -> Any:
+        """Async HTTP client for the 'http' backend (a no-op context otherwise)."""
+        if self.backend != 'http':
+            return contextlib.nullcontext()
+        import httpx
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        return httpx.AsyncClient(base_url=self.llm_url, headers=headers, transport=self.transport, timeout=self.timeout)
+
+    async def _agenerate(self, prompt: str, client: Any) -> Optional[str]:
+        """One LLM request; None if no backend is configured or the call failed."""
+        if self.backend == 'http':
+            import httpx
+            try:
+                response = await client.post("/v1/chat/completions", json={
+                    'model': self.llm_model,
+                    'messages': [{'role': 'user', 'content': prompt}]
+                })
+                response.raise_for_status()
+                return response.json()['choices'][0]['message']['content']
+            except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+                logger.error(f"LLM request failed: {e!r}")
+                return None
+        # The Gemini SDK is synchronous; keep it off the event loop
+        return await asyncio.to_thread(self._generate, prompt)
+
+    def _generate(self, prompt: str) -> Optional[str]:
+        """Remote LLM call; None if no backend is configured or the call failed."""
         google_key = os.getenv("GOOGLE_API_KEY")
         if google_key:
             try:
-                import google.generativeai as genai
-                genai.configure(api_key=google_key)
-                model = genai.GenerativeModel('gemini-2.5-flash')
-                response = model.generate_content(prompt)
+                response = _gemini_client(google_key, self.gemini_model).generate_content(prompt)
                 return response.text
             except ImportError:
                  logger.error("google-generativeai not installed.")
             except Exception as e:
                  logger.error(f"Gemini API call failed: {e}")
-                 
-        if self.use_mock:
-            return self._mock_llm_response(prompt)
-            
-        return "Error: LLM call failed and no mock fallback enabled."
+        return None
+
+    def _overview_template(self, metrics: Dict[str, Any], docs: List[Dict[str, Any]]) -> str:
+        lines = [f"- Max shuttle speed: {metrics.get('shuttle_max_speed_kmh', 0):.1f} km/h",
+                 f"- Players tracked: {len(metrics.get('players', {}))}"]
+        lines += [f"- Suggested: {d['text']}" for d in docs]
+        return "\n".join(lines)
+
+    def _player_template(self, p_stats: Dict[str, Any], docs: List[Dict[str, Any]]) -> str:
+        lines = [f"- Distance covered: {p_stats.get('total_distance_m', 0):.0f} m"]
+        if p_stats.get('max_speed_mps') is not None:
+            lines.append(f"- Top speed: {p_stats['max_speed_mps']:.1f} m/s")
+        if p_stats.get('coverage_pct') is not None:
+            lines.append(f"- Court coverage: {p_stats['coverage_pct']:.0f}%")
+        lines += [f"- Drill: {d['text']}" for d in docs]
+        return "\n".join(lines)
+
+    def _rally_template(self, rally: Dict[str, Any]) -> str:
+        types = [s['type'] for s in rally.get('shots', [])]
+        return (f"- Duration: {rally.get('duration', 0.0):.1f} s, {rally.get('shot_count', 0)} shots\n"
+                f"- Shots: {', '.join(types) if types else 'not detected'}")
 
     def _mock_llm_response(self, prompt: str) -> str:
         return f"""
@@ -0,0 +1,325 @@
+import os
+import json
+import logging
+import numpy as np
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Any, Tuple
+from filelock import FileLock
+from .index import EmbeddingMatrix, IVFIndex
+
+logger = logging.getLogger("badminton_cv.rag")
+
+class VectorStore:
+    """
+    Document collection with embeddings, persisted incrementally to a directory.
+
+    On disk the collection is an append-only pair per generation:
+    `vectors-<g>.f32` (raw float32 rows) and `log-<g>.jsonl` (one upsert or
+    delete record per line; upserts consume vector rows in order), plus
+    `store.json` naming the live generation. Upserts and deletes only append;
+    once dead rows outnumber live ones the collection is compacted into a
+    new generation and `store.json` is swapped atomically. Writes take a
+    file lock and first catch up with records appended by other processes
+    (pipeline workers and `ingest-kb` share one store).
+
+    Searches are exact below `ann_threshold` documents and go through an
+    IVFIndex above it.
+    """
+
+    def __init__(self, path: Optional[str] = None, model: Optional[str] = None,
+                 ann_threshold: int = 20000, nprobe: int = 16):
+        """
+        Initialize the VectorStore.
+
+        Args:
+            path: Collection directory; opened if it exists. None keeps the store in memory.
+            model: Name of the encoder behind the embeddings. A collection written
+                   by a different encoder is not loaded and gets replaced.
+            ann_threshold: Document count from which searches use the IVF index.
+            nprobe: IVF buckets scanned per query.
+        """
+        self.path = path
+        self.model = model
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self._clear()
+        self._generation = 0
+        self._disk_records = 0 # Upserts in the current log, live or not
+        self._log_size = 0 # Bytes of the current log reflected in memory
+        self._manifest_ok = False # store.json describes this store's generation
+        self._lock = None
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._lock = FileLock(os.path.join(path, ".lock"))
+            with self._lock:
+                self._load()
+
+    def _clear(self):
+        self.documents: List[Dict[str, Any]] = [] # {'id', 'text', 'metadata'}; row i of self.embeddings
+        self.embeddings = EmbeddingMatrix()
+        self._rows: Dict[str, int] = {}
+        self._metadata_index: Dict[Tuple[str, Any], List[int]] = {} # (key, value) -> rows
+        self._ivf: Optional[IVFIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        row = self._rows.get(doc_id)
+        return None if row is None else self.documents[row]
+
+    def upsert(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]],
+               vectors: Optional[np.ndarray] = None):
+        """
+        Insert documents, replacing any with the same id.
+
+        Args:
+            ids: Unique document ids.
+            texts: Document texts.
+            metadatas: Metadata dicts.
+            vectors: (K, D) embeddings, or None for a store without embeddings.
+        """
+        if not ids:
+            return
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in one upsert")
+        with self._locked():
+            self._sync()
+            if vectors is not None and len(self.documents) > len(self.embeddings):
+                raise ValueError("Store holds documents without embeddings")
+            if vectors is None and len(self.embeddings):
+                raise ValueError("Store requires embeddings")
+
+            replaced = [i for i in ids if i in self._rows]
+            if replaced:
+                self._remove(replaced)
+            docs = [{'id': i, 'text': t, 'metadata': m or {}} for i, t, m in zip(ids, texts, metadatas)]
+            if vectors is not None:
+                vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+                self.embeddings.add(vectors)
+            self._append(docs)
+            if self.path:
+                self._write(docs, None if vectors is None else EmbeddingMatrix.normalize(vectors))
+
+    def delete(self, ids: List[str]) -> int:
+        """Remove documents by id; returns how many existed."""
+        with self._locked():
+            self._sync()
+            existing = [i for i in ids if i in self._rows]
+            if existing:
+                self._remove(existing)
+                if self.path:
+                    self._log([{'op': 'delete', 'id': i} for i in existing])
+                    self._maybe_compact()
+        return len(existing)
+
+    def refresh(self):
+        """Pick up documents written by other processes since this store was opened."""
+        with self._locked():
+            self._sync()
+
+    def filter_rows(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows whose metadata matches every key/value in `where` (None if unfiltered)."""
+        if not where:
+            return None
+        rows = None
+        for key, value in where.items():
+            posting = self._metadata_index.get((key, value), [])
+            rows = np.asarray(posting, dtype=int) if rows is None else np.intersect1d(rows, posting)
+        return rows
+
+    def search(self, query: np.ndarray, k: int, where: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows by cosine similarity.
+
+        Returns:
+            (rows, scores): Best first.
+        """
+        rows = self.filter_rows(where)
+        if rows is None and len(self.embeddings) >= self.ann_threshold:
+            rows = self._ann_candidates(query, k)
+        return self.embeddings.search(query, k, rows)
+
+    def search_many(self, queries: np.ndarray, k: int, where: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k rows for a batch of queries.
+
+        Returns:
+            (rows, scores): (Q, k') arrays, best first per query.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(len(queries), -1)
+        rows = self.filter_rows(where)
+        if rows is None and len(self.embeddings) >= self.ann_threshold:
+            # Each query probes its own IVF buckets
+            results = [self.search(q, k) for q in queries]
+            return np.stack([r[0] for r in results]), np.stack([r[1] for r in results])
+        return self.embeddings.search_many(queries, k, rows)
+
+    def _ann_candidates(self, query: np.ndarray, k: int) -> Optional[np.ndarray]:
+        matrix = self.embeddings.matrix
+        # Retrain when the corpus has doubled since the centroids were fit
+        if self._ivf is None or len(matrix) > 2 * self._ivf.trained_size:
+            self._ivf = IVFIndex(matrix)
+            logger.info(f"Built IVF index with {self._ivf.nlist} lists over {len(matrix)} documents.")
+        else:
+            self._ivf.extend(matrix)
+        candidates = self._ivf.candidates(query, self.nprobe)
+        return candidates if len(candidates) >= k else None
+
+    # In-memory bookkeeping
+
+    def _append(self, docs: List[Dict[str, Any]]):
+        for row, doc in enumerate(docs, start=len(self.documents)):
+            self._rows[doc['id']] = row
+            for key, value in doc['metadata'].items():
+                if isinstance(value, (str, int, float, bool)):
+                    self._metadata_index.setdefault((key, value), []).append(row)
+        self.documents.extend(docs)
+
+    def _remove(self, ids: List[str]):
+        """Drop documents and re-pack rows; O(N), deletes are rare next to inserts and queries."""
+        dead = {self._rows[i] for i in ids}
+        keep = np.array([r for r in range(len(self.documents)) if r not in dead], dtype=int)
+        documents, matrix = self.documents, self.embeddings.matrix
+        self._clear()
+        if len(matrix) and len(keep):
+            self.embeddings.add(matrix[keep])
+        self._append([documents[r] for r in keep])
+
+    # Persistence
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}-{self._generation}")
+
+    def _locked(self):
+        return self._lock if self._lock is not None else nullcontext()
+
+    def _sync(self):
+        """Reload if another process appended to or compacted the collection; call under the lock."""
+        if not self.path:
+            return
+        manifest = os.path.join(self.path, "store.json")
+        if not os.path.exists(manifest):
+            return
+        with open(manifest) as f:
+            generation = json.load(f)['generation']
+        log = os.path.join(self.path, f"log-{generation}.jsonl")
+        size = os.path.getsize(log) if os.path.exists(log) else 0
+        if generation == self._generation and size == self._log_size:
+            return
+        logger.info(f"Vector store {self.path} changed on disk; reloading.")
+        self._clear()
+        self._generation = 0
+        self._disk_records = 0
+        self._log_size = 0
+        self._manifest_ok = False
+        self._load()
+
+    def _load(self):
+        manifest = os.path.join(self.path, "store.json")
+        if not os.path.exists(manifest):
+            return
+        with open(manifest) as f:
+            info = json.load(f)
+        self._generation = info['generation']
+        if info.get('model') != self.model:
+            logger.warning(f"Vector store {self.path} was built with {info.get('model')}, not {self.model}; rebuilding.")
+            self._generation += 1
+            return
+        self._manifest_ok = True
+
+        vectors = None
+        if info.get('dim') and os.path.exists(self._file("vectors") + ".f32"):
+            vectors = np.fromfile(self._file("vectors") + ".f32", dtype=np.float32)
+            vectors = vectors[:len(vectors) // info['dim'] * info['dim']].reshape(-1, info['dim'])
+
+        # Replay the log: last record per id wins, insertion order is kept
+        live: Dict[str, Tuple[Dict[str, Any], Optional[int]]] = {}
+        vector_row = 0
+        intact = True
+        with open(self._file("log") + ".jsonl") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError: # Torn final write
+                    intact = False
+                    break
+                if record['op'] == 'delete':
+                    live.pop(record['id'], None)
+                    continue
+                row = None
+                if record.get('vector'):
+                    if vectors is None or vector_row >= len(vectors):
+                        intact = False
+                        break
+                    row, vector_row = vector_row, vector_row + 1
+                live.pop(record['id'], None)
+                live[record['id']] = ({'id': record['id'], 'text': record['text'], 'metadata': record['metadata']}, row)
+                self._disk_records += 1
+
+        docs = [doc for doc, _ in live.values()]
+        rows = [row for _, row in live.values()]
+        if vectors is not None and docs and all(r is not None for r in rows):
+            self.embeddings.add(vectors[rows])
+        self._append(docs)
+        self._log_size = os.path.getsize(self._file("log") + ".jsonl")
+        logger.info(f"Opened vector store {self.path} with {len(docs)} documents.")
+
+        # Appends must line up with the log, so rewrite after an interrupted write
+        if not intact or (vectors is not None and os.path.getsize(self._file("vectors") + ".f32") != vectors[:vector_row].nbytes):
+            logger.warning(f"Vector store {self.path} was not closed cleanly; compacting.")
+            self.compact()
+
+    def _write(self, docs: List[Dict[str, Any]], vectors: Optional[np.ndarray]):
+        os.makedirs(self.path, exist_ok=True)
+        if not self._manifest_ok:
+            self._write_manifest()
+        if vectors is not None:
+            # Vectors first: a crash before the log line leaves an unreferenced tail row, which is ignored
+            with open(self._file("vectors") + ".f32", "ab") as f:
+                vectors.astype(np.float32).tofile(f)
+        self._log([{'op': 'upsert', 'id': d['id'], 'text': d['text'], 'metadata': d['metadata'],
+                    'vector': vectors is not None} for d in docs])
+        self._disk_records += len(docs)
+        self._maybe_compact()
+
+    def _log(self, records: List[Dict[str, Any]]):
+        with open(self._file("log") + ".jsonl", "a") as f:
+            f.writelines(json.dumps(r) + "\n" for r in records)
+            self._log_size = f.tell()
+
+    def _write_manifest(self):
+        tmp_path = os.path.join(self.path, "store.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({'generation': self._generation, 'dim': self.embeddings.dim, 'model': self.model}, f)
+        os.replace(tmp_path, os.path.join(self.path, "store.json"))
+        self._manifest_ok = True
+
+    def _maybe_compact(self):
+        if self._disk_records > 2 * len(self.documents) + 1024:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the collection without dead records as a new generation."""
+        if not self.path:
+            return
+        with self._lock:
+            self._sync()
+            old = self._generation
+            self._generation += 1
+            has_vectors = len(self.embeddings) > 0
+            if has_vectors:
+                self.embeddings.matrix.tofile(self._file("vectors") + ".f32")
+            with open(self._file("log") + ".jsonl", "w") as f:
+                f.writelines(json.dumps({'op': 'upsert', 'id': d['id'], 'text': d['text'], 'metadata': d['metadata'],
+                                         'vector': has_vectors}) + "\n" for d in self.documents)
+                self._log_size = f.tell()
+            self._disk_records = len(self.documents)
+            self._write_manifest()
+            for name in ("vectors-%d.f32", "log-%d.jsonl"):
+                stale = os.path.join(self.path, name % old)
+                if os.path.exists(stale):
+                    os.remove(stale)
@@ -0,0 +1,71 @@
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Dict
+from fastapi import FastAPI, HTTPException
+
+logger = logging.getLogger("badminton_cv.rag")
+
+def create_app(latency: float = 0.0, jitter: float = 0.0, fail_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    """
+    Stub of an OpenAI-compatible chat-completions server for tests and load testing.
+
+    Replies echo the first line of the prompt after a simulated generation
+    delay. `app.state` counts requests and tracks peak concurrency.
+
+    Args:
+        latency: Seconds each response takes.
+        jitter: Extra uniform random delay up to this many seconds.
+        fail_rate: Fraction of requests answered with HTTP 503.
+        seed: Random seed for jitter and failures.
+    """
+    app = FastAPI(title="Stub LLM", version="1.0")
+    rng = random.Random(seed)
+    app.state.requests = 0
+    app.state.active = 0
+    app.state.max_active = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any]):
+        app.state.requests += 1
+        app.state.active += 1
+        app.state.max_active = max(app.state.max_active, app.state.active)
+        try:
+            await asyncio.sleep(latency + rng.uniform(0.0, jitter))
+            if rng.random() < fail_rate:
+                raise HTTPException(status_code=503, detail="Stub overloaded")
+
+            prompt = body.get('messages', [{}])[-1].get('content', '')
+            first_line = next((line.strip() for line in prompt.splitlines() if line.strip()), '')
+            return {
+                'id': f"stub-{app.state.requests}",
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'stub'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': f"[STUB] {first_line}"},
+                    'finish_reason': 'stop'
+                }]
+            }
+        finally:
+            app.state.active -= 1
+
+    return app
+
+if __name__ == "__main__":
+    import click
+    import uvicorn
+
+    @click.command()
+    @click.option('--host', default='127.0.0.1')
+    @click.option('--port', default=8001, type=int)
+    @click.option('--latency', default=0.5, type=float, help='Seconds per response')
+    @click.option('--jitter', default=0.0, type=float, help='Extra random delay (seconds)')
+    @click.option('--fail-rate', default=0.0, type=float, help='Fraction of requests failing with 503')
+    def serve(host, port, latency, jitter, fail_rate):
+        """Serve the stub LLM (set rag.llm_backend: http and rag.llm_url to use it)."""
+        uvicorn.run(create_app(latency, jitter, fail_rate), host=host, port=port)
+
+    serve()
@@ -42,6 +42,12 @@ class BadmintonTracker:
             
         logger.info(f"Initialized BadmintonTracker with {self.tracker_type}")
 
+    def reset(self):
+        """Forget all tracks (e.g. before the next video); the model stays loaded."""
+        predictor = getattr(self.model, 'predictor', None)
+        for tracker in getattr(predictor, 'trackers', None) or []:
+            tracker.reset()
+
     def update(self, frame: np.ndarray) -> List[Dict[str, Any]]:
         """
         Run tracking on a single frame.
@@ -0,0 +1,41 @@
+import numpy as np
+from typing import Tuple
+
+def find_runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find runs of consecutive True values in a boolean array.
+
+    Args:
+        mask: 1D boolean array.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Start indices and (exclusive) end indices of each run.
+    """
+    padded = np.concatenate([[False], np.asarray(mask, dtype=bool), [False]])
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges[0::2], edges[1::2]
+
+def merge_runs(starts: np.ndarray, ends: np.ndarray, times: np.ndarray, max_gap: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge runs separated by a gap of at most `max_gap` in `times`.
+
+    The gap is measured from the last sample of a run to the last sample
+    before the next run starts, i.e. how long the condition was False.
+
+    Args:
+        starts: Run start indices (sorted).
+        ends: Run exclusive end indices.
+        times: Per-sample times the gap is measured in.
+        max_gap: Largest gap bridged between consecutive runs.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Merged start and end indices.
+    """
+    if len(starts) < 2:
+        return starts, ends
+
+    gaps = times[starts[1:] - 1] - times[ends[:-1] - 1]
+    keep = np.concatenate([[True], gaps > max_gap])
+    new_starts = starts[keep]
+    new_ends = ends[np.concatenate([keep[1:], [True]])]
+    return new_starts, new_ends
@@ -2,18 +2,58 @@ import os
 import shutil
 import uuid
 import logging
-from typing import Dict
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from src.pipeline import MatchAnalysisPipeline
+from src.analytics import MatchCatalog
+from src.utils.config import get_config
+from .jobs import JobQueue, JobState, WorkerPool
 
 # Setup Logging
 from src.utils import setup_logger
 logger = setup_logger("badminton_cv.web")
 
-app = FastAPI(title="Badminton CV API", version="1.0")
+# Job store: durable queue consumed by a pool of worker processes
+TaskState = JobState
+
+web_cfg = get_config().config.get('web', {})
+MAX_QUEUE = web_cfg.get('max_queue', 100) # pending jobs
+
+# Directories
+UPLOAD_DIR = "data/uploads"
+JOBS_DIR = web_cfg.get('jobs_dir', "outputs/jobs")
+
+# Queue and catalog are opened on first use, so importing the app touches no files
+_queue: Optional[JobQueue] = None
+_catalog: Optional[MatchCatalog] = None
+
+def get_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(web_cfg.get('jobs_db', "data/jobs.sqlite"))
+    return _queue
+
+# Cross-match analytics (reloads when pipeline runs register new matches)
+def get_catalog() -> MatchCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = MatchCatalog()
+    return _catalog
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pool = WorkerPool(get_queue(), num_workers=web_cfg.get('workers', 1), config_path=get_config().config_path,
+                      poll_interval=web_cfg.get('poll_interval', 1.0),
+                      heartbeat_interval=web_cfg.get('heartbeat_interval', 10.0),
+                      stale_after=web_cfg.get('stale_after', 60.0))
+    pool.start()
+    yield
+    pool.stop()
+
+app = FastAPI(title="Badminton CV API", version="1.0", lifespan=lifespan)
 
 # CORS (Allow frontend)
 app.add_middleware(
@@ -24,94 +64,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# State Store (In-memory for MVP, DB for Prod)
-class TaskState:
-    PENDING = "pending"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    FAILED = "failed"
-
-tasks: Dict[str, Dict] = {}
-
-# Directories
-UPLOAD_DIR = "data/uploads"
-OUTPUT_DIR = "outputs"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
 class AnalysisResponse(BaseModel):
     task_id: str
     status: str
 
-def run_analysis_task(task_id: str, video_path: str):
-    """Background task wrapper."""
-    try:
-        tasks[task_id]["status"] = TaskState.PROCESSING
-        logger.info(f"Task {task_id}: Starting analysis for {video_path}")
-        
-        # Initialize pipeline (re-init per task to clear state, or reuse if stateless enough)
-        # Our pipeline has state (metrics, events), so better new instance.
-        pipeline = MatchAnalysisPipeline()
-        
-        # We need to capture the report output location.
-        # The pipeline currently writes to 'outputs/coaching_report.md' hardcoded-ish.
-        # We should modify pipeline to accept output path or move file after.
-        # For MVP, we let it run and assume standard output location.
-        pipeline.run(video_path)
-        
-        # Basic file management: Return the default report path
-        # ideally we rename it to match task_id
-        default_report = os.path.join(OUTPUT_DIR, "coaching_report.md")
-        task_report = os.path.join(OUTPUT_DIR, f"{task_id}_report.md")
-        if os.path.exists(default_report):
-            shutil.copy(default_report, task_report)
-
-        tasks[task_id]["status"] = TaskState.COMPLETED
-        tasks[task_id]["result"] = {
-            "report_path": task_report,
-            "video_path": video_path # In real app, annotated video
-        }
-        logger.info(f"Task {task_id}: Completed successfully.")
-        
-    except Exception as e:
-        logger.error(f"Task {task_id} failed: {e}", exc_info=True)
-        tasks[task_id]["status"] = TaskState.FAILED
-        tasks[task_id]["error"] = str(e)
+def get_task(task_id: str) -> dict:
+    task = get_queue().get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
 
 @app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_video(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """Upload video and start analysis."""
+async def analyze_video(file: UploadFile = File(...)):
+    """Upload video and queue it for analysis."""
+    queue = get_queue()
+    if queue.count(TaskState.PENDING) >= MAX_QUEUE:
+        raise HTTPException(status_code=429, detail="Analysis queue is full, try again later")
     task_id = str(uuid.uuid4())
     
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
     file_path = os.path.join(UPLOAD_DIR, f"{task_id}_{file.filename}")
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
         
-    tasks[task_id] = {
-        "status": TaskState.PENDING,
-        "filename": file.filename
-    }
-    
-    background_tasks.add_task(run_analysis_task, task_id, file_path)
+    queue.submit(task_id, file_path, os.path.join(JOBS_DIR, task_id), filename=file.filename)
     
     return {"task_id": task_id, "status": TaskState.PENDING}
 
 @app.get("/status/{task_id}")
 async def get_status(task_id: str):
-    if task_id not in tasks:
-        raise HTTPException(status_code=404, detail="Task not found")
-    return tasks[task_id]
+    return get_task(task_id)
 
 @app.get("/results/{task_id}")
 async def get_results(task_id: str):
-    if task_id not in tasks:
-        raise HTTPException(status_code=404, detail="Task not found")
-        
-    if tasks[task_id]["status"] != TaskState.COMPLETED:
-        return JSONResponse(status_code=202, content=tasks[task_id])
+    task = get_task(task_id)
+    if task["status"] != TaskState.COMPLETED:
+        return JSONResponse(status_code=202, content=task)
         
     # Read Markdown Report
-    report_path = tasks[task_id]["result"]["report_path"]
+    report_path = task["result"]["report_path"]
     if os.path.exists(report_path):
         with open(report_path, "r") as f:
             content = f.read()
@@ -123,19 +114,30 @@ async def get_results(task_id: str):
 async def get_video_stream(task_id: str):
     # Retrieve original or annotated video
     # For now, return original
-    if task_id not in tasks:
-        raise HTTPException(status_code=404, detail="Task not found")
-        
-    # Hack: just find the file in uploads
-    # In prod, store path in task dict
-    filename = tasks[task_id].get("filename")
-    path = os.path.join(UPLOAD_DIR, f"{task_id}_{filename}")
-    
+    path = get_task(task_id)["video_path"]
     if not os.path.exists(path):
          raise HTTPException(status_code=404, detail="Video not found")
          
     return FileResponse(path, media_type="video/mp4")
 
+@app.get("/analytics/matches")
+async def list_matches():
+    catalog = get_catalog()
+    catalog.refresh()
+    matches = catalog.matches.sort_values('recorded_at', ascending=False) if len(catalog.matches) else catalog.matches
+    return {"matches": matches.to_dict('records')}
+
+@app.get("/analytics/query")
+async def query_metric(metric: str, player: Optional[str] = None,
+                       last: Optional[int] = Query(None, ge=1), agg: str = "mean"):
+    """Aggregate a per-match metric, e.g. ?metric=rear_recovery_speed_mps&player=X&last=20."""
+    if agg not in ("mean", "median", "max", "min", "sum"):
+        raise HTTPException(status_code=400, detail=f"Unsupported aggregation: {agg}")
+    try:
+        return get_catalog().query(metric, player=player, last_n=last, agg=agg)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
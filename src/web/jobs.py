@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+import multiprocessing as mp
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("badminton_cv.web")
+
+class JobState:
+    PENDING = "pending"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobQueue:
+    """
+    Durable analysis job queue in SQLite, shared by the API and worker processes.
+
+    Jobs survive restarts: workers heartbeat the job they are running, and
+    a processing job whose heartbeat stops (its worker died, or the API
+    holding it was restarted) goes back to pending, up to `max_attempts`
+    tries. Any number of API processes can share the queue.
+    """
+
+    def __init__(self, db_path: str = "data/jobs.sqlite", max_attempts: int = 3):
+        """
+        Initialize the JobQueue.
+
+        Args:
+            db_path: SQLite file (created if missing).
+            max_attempts: Times a job is started before an interrupted job is marked failed.
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL") # Readers never block the worker that is claiming
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY, status TEXT, filename TEXT, video_path TEXT, output_dir TEXT,
+                    created REAL, started REAL, finished REAL, worker TEXT, attempts INTEGER DEFAULT 0,
+                    error TEXT, result TEXT, heartbeat REAL)""")
+            if 'heartbeat' not in [row['name'] for row in conn.execute("PRAGMA table_info(jobs)")]:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL") # Queues from before heartbeats
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived autocommit connection per operation: safe across threads and processes
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, job_id: str, video_path: str, output_dir: str, filename: Optional[str] = None):
+        """Enqueue a job."""
+        with self._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, status, filename, video_path, output_dir, created) VALUES (?, ?, ?, ?, ?, ?)",
+                         (job_id, JobState.PENDING, filename, video_path, output_dir, time.time()))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job record, or None if unknown."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._record(row)
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent jobs first."""
+        with self._connect() as conn:
+            if status:
+                rows = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created DESC LIMIT ?", (status, limit)).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [self._record(row) for row in rows]
+
+    def count(self, status: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest pending job (None if the queue is empty)."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE") # Write lock: two workers never claim the same job
+            try:
+                row = conn.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (JobState.PENDING,)).fetchone()
+                if row is not None:
+                    now = time.time()
+                    conn.execute("UPDATE jobs SET status = ?, started = ?, heartbeat = ?, worker = ?, attempts = attempts + 1 WHERE id = ?",
+                                 (JobState.PROCESSING, now, now, worker, row['id']))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return None if row is None else self.get(row['id'])
+
+    def heartbeat(self, job_id: str, worker: str):
+        """Mark a job as still running on `worker`."""
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = ?",
+                         (time.time(), job_id, worker, JobState.PROCESSING))
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, finished = ?, result = ? WHERE id = ?",
+                         (JobState.COMPLETED, time.time(), json.dumps(result), job_id))
+
+    def fail(self, job_id: str, error: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, finished = ?, error = ? WHERE id = ?",
+                         (JobState.FAILED, time.time(), error, job_id))
+
+    def requeue_interrupted(self, stale_after: float, workers: Optional[List[str]] = None) -> int:
+        """
+        Return interrupted jobs to the queue (or fail them after `max_attempts`).
+
+        A processing job is interrupted once its heartbeat is older than
+        `stale_after` seconds, or right away if its worker is known to be dead.
+
+        Args:
+            stale_after: Seconds without a heartbeat.
+            workers: Worker ids known to have exited.
+
+        Returns:
+            int: Jobs requeued.
+        """
+        where = "status = ? AND (heartbeat IS NULL OR heartbeat < ?"
+        params = [JobState.PROCESSING, time.time() - stale_after]
+        if workers:
+            where += f" OR worker IN ({','.join('?' * len(workers))})"
+            params += workers
+        where += ")"
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET status = ?, finished = ?, error = ? WHERE {where} AND attempts >= ?",
+                         [JobState.FAILED, time.time(), "Interrupted too many times"] + params + [self.max_attempts])
+            requeued = conn.execute(f"UPDATE jobs SET status = ?, worker = NULL WHERE {where}",
+                                    [JobState.PENDING] + params).rowcount
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted job(s).")
+        return requeued
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = dict(row)
+        record['result'] = json.loads(record['result']) if record['result'] else None
+        return record
+
+def worker_id(pid: Optional[int] = None) -> str:
+    """Id recorded on claimed jobs: unique across hosts and processes."""
+    return f"{socket.gethostname()}:{pid or os.getpid()}"
+
+def work(queue: JobQueue, pipeline: Any, worker: str, stop: Any, poll_interval: float = 1.0,
+         heartbeat_interval: float = 10.0):
+    """
+    Worker loop: claim a job, analyze it with the already-loaded pipeline, repeat.
+
+    Args:
+        queue: Job queue.
+        pipeline: Object with `run(video_path, match_id=..., output_dir=...)`.
+        worker: Worker id recorded on claimed jobs.
+        stop: Event; the loop exits once it is set and no job is running.
+        poll_interval: Seconds to wait when the queue is empty.
+        heartbeat_interval: Seconds between heartbeats of the running job.
+    """
+    while not stop.is_set():
+        job = queue.claim(worker)
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        logger.info(f"{worker}: starting job {job['id']} ({job['video_path']})")
+        done = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(queue, job['id'], worker, done, heartbeat_interval), daemon=True)
+        beat.start()
+        try:
+            os.makedirs(job['output_dir'], exist_ok=True)
+            pipeline.run(job['video_path'], match_id=job['id'], output_dir=job['output_dir'])
+            queue.complete(job['id'], {
+                'report_path': os.path.join(job['output_dir'], "coaching_report.md"),
+                'results_dir': os.path.join(job['output_dir'], "results"),
+                'video_path': job['video_path'] # In real app, annotated video
+            })
+            logger.info(f"{worker}: job {job['id']} completed.")
+        except Exception as e:
+            logger.error(f"{worker}: job {job['id']} failed: {e}", exc_info=True)
+            queue.fail(job['id'], str(e))
+        finally:
+            done.set()
+            beat.join()
+
+def _heartbeat(queue: JobQueue, job_id: str, worker: str, done: threading.Event, interval: float):
+    while not done.wait(interval):
+        try:
+            queue.heartbeat(job_id, worker)
+        except sqlite3.Error as e:
+            logger.warning(f"{worker}: heartbeat for job {job_id} failed: {e}")
+
+def _worker_main(db_path: str, config_path: Optional[str], stop: Any, poll_interval: float, heartbeat_interval: float):
+    """Worker process entry point: load the models once, then serve jobs."""
+    from src.utils import setup_logger
+    from src.pipeline import MatchAnalysisPipeline
+    setup_logger("badminton_cv")
+    worker = worker_id()
+    pipeline = MatchAnalysisPipeline(config_path)
+    logger.info(f"{worker}: models loaded, waiting for jobs.")
+    work(JobQueue(db_path), pipeline, worker, stop, poll_interval, heartbeat_interval)
+
+class WorkerPool:
+    def __init__(self, queue: JobQueue, num_workers: int = 1, config_path: Optional[str] = None,
+                 poll_interval: float = 1.0, heartbeat_interval: float = 10.0, stale_after: float = 60.0):
+        """
+        Initialize the WorkerPool.
+
+        Long-lived worker processes that each load the pipeline (and its
+        models) once and then consume the job queue, so at most
+        `num_workers` analyses run at a time and none run in the API
+        process. A monitor thread replaces dead workers, requeueing their
+        jobs, and requeues jobs whose heartbeat has stopped anywhere (e.g.
+        held by an API process that was killed).
+
+        Args:
+            queue: Job queue.
+            num_workers: Concurrent analyses (each worker holds its own models).
+            config_path: Config YAML for the workers' pipelines.
+            poll_interval: Seconds between queue polls when idle.
+            heartbeat_interval: Seconds between heartbeats of a running job.
+            stale_after: Seconds without a heartbeat after which a job is requeued.
+        """
+        self.queue = queue
+        self.num_workers = num_workers
+        self.config_path = config_path
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._ctx = mp.get_context("spawn") # CUDA and model state must not be forked
+        self._stop = self._ctx.Event()
+        self._workers: Dict[str, Any] = {}
+        self._monitor: Optional[threading.Thread] = None
+
+    def start(self):
+        """Requeue interrupted jobs and start the workers."""
+        self.queue.requeue_interrupted(self.stale_after)
+        for i in range(self.num_workers):
+            self._spawn(f"worker-{i}")
+        self._monitor = threading.Thread(target=self._watch, name="job-pool-monitor", daemon=True)
+        self._monitor.start()
+
+    def _spawn(self, name: str):
+        process = self._ctx.Process(target=_worker_main, name=name, daemon=True,
+                                    args=(self.queue.db_path, self.config_path, self._stop,
+                                          self.poll_interval, self.heartbeat_interval))
+        process.start()
+        self._workers[name] = process
+
+    def _watch(self):
+        while not self._stop.wait(min(5.0, self.heartbeat_interval)):
+            dead = {name: process for name, process in self._workers.items() if not process.is_alive()}
+            if dead:
+                logger.warning(f"Workers exited unexpectedly: {list(dead)}; restarting.")
+                for name in dead:
+                    self._spawn(name)
+            self.queue.requeue_interrupted(self.stale_after, [worker_id(p.pid) for p in dead.values()])
+
+    def stop(self, timeout: float = 10.0):
+        """Ask workers to exit after their current job; terminate stragglers after `timeout`."""
+        self._stop.set()
+        for process in self._workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._workers.clear()
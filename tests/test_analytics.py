@@ -0,0 +1,207 @@
+import numpy as np
+import pytest
+from src.analytics import MetricsCalculator, Trajectory, TrajectoryStore, KinematicsAnalyzer, CourtHeatmap, LiveMetrics, RingBuffer
+
+class ScaleCalibrator:
+    """10 px = 1 m."""
+    homography_matrix = np.eye(3)
+
+    def pixels_to_court(self, points):
+        return np.asarray(points, dtype=np.float64).reshape(-1, 2) / 10.0
+
+def test_trajectory_growth_and_slicing():
+    trajectory = Trajectory(7, capacity=4)
+    for frame in range(100):
+        trajectory.append([frame * 2, frame, 0, frame / 10, 0])
+
+    assert len(trajectory) == 100
+    assert trajectory.nbytes == 128 * 5 * 8 # Doubled from 4
+    rows = trajectory.slice(50, 60)
+    np.testing.assert_array_equal(rows[:, 0], [50, 52, 54, 56, 58])
+    assert len(trajectory.slice(end_frame=0)) == 0
+
+def test_store_evicts_stale_tracks():
+    store = TrajectoryStore(max_points=100)
+    for frame in range(10):
+        store.append(frame, [99], np.zeros((1, 2)), np.zeros((1, 2))) # Short spurious track
+    for frame in range(10, 110):
+        store.append(frame, [1], np.zeros((1, 2)), np.zeros((1, 2)))
+
+    assert 99 not in store and 1 in store
+    assert store.num_points == 100
+    assert store.evicted == 1
+
+def test_store_thins_long_tracks_instead_of_evicting(caplog):
+    store = TrajectoryStore(max_points=100, protect_points=20)
+    walk = lambda frame: np.array([[0.1 * frame, 0.0]])
+    for frame in range(60):
+        store.append(frame, [1], walk(frame), walk(frame)) # Player, then occluded
+    for frame in range(60, 120):
+        store.append(frame, [2], walk(frame), walk(frame)) # Re-identified as a new track
+
+    assert 1 in store and 2 in store and store.evicted == 0
+    assert store.num_points <= 100 and store.thinned > 0
+    assert "thinned" in caplog.text
+    # The occluded player keeps the whole history, at a coarser rate
+    court = store[1].court
+    assert store[1].frames[0] == 0 and store[1].last_frame == 59
+    assert np.linalg.norm(np.diff(court, axis=0), axis=1).sum() == pytest.approx(5.9)
+
+def test_summary_from_trajectories():
+    metrics = MetricsCalculator(ScaleCalibrator())
+    metrics.update_players([0, 1], np.array([[0, 0], [50, 50]]), 0)
+    metrics.update_players([0, 1], np.array([[10, 0], [50, 60]]), 1)
+    metrics.update_players([0], np.array([[10, 10]]), 2)
+    metrics.update_players([0], np.array([[500, 10]]), 3) # 49 m jump is noise
+
+    summary = metrics.get_summary()
+    assert summary['players'][0]['total_distance_m'] == pytest.approx(2.0)
+    assert summary['players'][0]['coverage_points'] == 4
+    assert summary['players'][1]['total_distance_m'] == pytest.approx(1.0)
+    np.testing.assert_allclose(metrics.trajectories.slice(0, 1, 3)[:, 3:], [[1, 0], [1, 1]])
+
+def test_shuttle_speeds_over_a_track():
+    metrics = MetricsCalculator(ScaleCalibrator())
+    t = np.arange(6) / 30.0
+    court = np.array([[0, 0], [1, 0], [2, 0], [np.nan, np.nan], [3, 0], [3, 1]], dtype=np.float64)
+
+    speeds = metrics.compute_court_shuttle_speeds(court, t)
+    np.testing.assert_allclose(speeds, [108.0, 108.0, 0.0, 0.0, 108.0]) # 1 m per frame at 30 fps
+    assert metrics.shuttle_max_speed == pytest.approx(108.0)
+    np.testing.assert_allclose(metrics.compute_shuttle_speeds(court * 10, t), speeds) # From pixels
+
+def test_smoothing_removes_jitter_inflation():
+    # 2 m/s along the court for 10 s, with 5 cm of box jitter per frame
+    rng = np.random.default_rng(0)
+    frames = np.arange(300)
+    truth = np.column_stack([np.full(300, 3.0), frames / 15.0])
+    noisy = truth + rng.normal(0, 0.05, truth.shape)
+
+    raw = np.linalg.norm(np.diff(noisy, axis=0), axis=1).sum()
+    kin = KinematicsAnalyzer().analyze(frames, noisy, fps=30.0)
+
+    assert raw > 25.0 # Jitter alone adds several meters
+    assert kin['distance_m'] == pytest.approx(20.0, rel=0.05)
+    assert np.median(kin['speed']) == pytest.approx(2.0, rel=0.1)
+    assert kin['sprint_count'] == 0
+
+def test_sprints_gaps_and_rally_distances():
+    frames = np.concatenate([np.arange(0, 60), np.arange(100, 160)]) # Tracking gap at 60-100
+    y = np.concatenate([np.linspace(0, 1, 60), np.linspace(1, 6, 60)]) # Walk, then 5 m in 2 s
+    positions = np.column_stack([np.zeros(120), y])
+
+    kin = KinematicsAnalyzer().analyze(frames, positions, fps=30.0,
+                                       intervals={'rally': np.array([[0, 59], [100, 159], [60, 99]])})
+
+    assert kin['distance_m'] == pytest.approx(6.0, rel=0.01) # Nothing counted across the gap
+    assert kin['sprint_count'] == 0 # 2.5 m/s is below sprint speed
+    np.testing.assert_allclose(kin['rally_distances_m'], [1.0, 5.0, 0.0], rtol=0.01, atol=1e-9)
+
+    fast = KinematicsAnalyzer().analyze(np.arange(30), np.column_stack([np.zeros(30), np.arange(30) / 5.0]), fps=30.0)
+    assert fast['sprint_count'] == 1 and fast['max_speed_mps'] == pytest.approx(6.0)
+
+def test_short_gaps_are_resampled():
+    # 2 m/s, but only every third frame was tracked (gaps below max_frame_gap)
+    frames = np.arange(0, 300, 3)
+    positions = np.column_stack([np.full(len(frames), 3.0), frames / 15.0])
+    kin = KinematicsAnalyzer().analyze(frames, positions, fps=30.0)
+
+    np.testing.assert_allclose(kin['speed'], 2.0, rtol=1e-6)
+    assert kin['distance_m'] == pytest.approx(19.8)
+    assert kin['max_accel_mps2'] == pytest.approx(0.0, abs=1e-6)
+
+def test_long_match_with_short_gaps():
+    # Two hours at 30 fps walking at 1.5 m/s, with two short tracking gaps
+    frames = np.delete(np.arange(216_000), [1000, 50_000, 50_001])
+    positions = np.column_stack([frames * 1.5 / 30.0, np.zeros(len(frames))])
+    kin = KinematicsAnalyzer().analyze(frames, positions, fps=30.0)
+
+    # Gaps are bridged, not split: the whole track is one segment at constant speed
+    np.testing.assert_allclose(kin['speed'], 1.5, atol=1e-6)
+    assert kin['distance_m'] == pytest.approx(1.5 * 215_999 / 30.0)
+    assert kin['sprint_count'] == 0
+
+class UncalibratedCalibrator:
+    homography_matrix = None
+
+    def pixels_to_court(self, points):
+        raise RuntimeError("Homography not computed.")
+
+def test_uncalibrated_frames_are_not_recorded():
+    metrics = MetricsCalculator(UncalibratedCalibrator())
+    court = metrics.update_players([0, 1], np.array([[10, 10], [50, 50]]), 0)
+
+    assert court.shape == (2, 2) and np.isnan(court).all()
+    assert len(metrics.trajectories) == 0 and metrics.heatmaps == {}
+    assert metrics.get_summary()['players'] == {}
+
+def test_buffered_heatmap_samples_are_counted():
+    metrics = MetricsCalculator(ScaleCalibrator())
+    metrics.heatmap_batch_size = 100
+    for frame in range(130):
+        metrics.update_players([0, 1], np.array([[20, 10], [20, 120]]), frame)
+
+    # Reading includes samples still buffered for the next batch
+    heatmaps = metrics.heatmaps
+    assert heatmaps[0].total == heatmaps[1].total == 130
+    for frame in range(130, 160):
+        metrics.update_players([0, 1], np.array([[20, 10], [20, 120]]), frame)
+    assert metrics.heatmaps[0].total == 160
+    assert metrics.get_summary()['players'][0]['zones']['rear_left'] == pytest.approx(1.0)
+
+def test_heatmap_zones_and_coverage():
+    heatmap = CourtHeatmap(cell_size=0.5)
+    assert heatmap.shape == (27, 13)
+
+    # Near half only: one sample at the net on the left, three deep on the right, one off court
+    heatmap.update(np.array([[1.0, 6.0], [5.0, 0.5], [5.0, 0.6], [5.5, 1.0], [7.0, 1.0]]))
+    assert heatmap.total == 5 and heatmap.outside == 1
+    zones = heatmap.zones()
+    assert zones['front_left'] == pytest.approx(0.25)
+    assert zones['rear_right'] == pytest.approx(0.75)
+    assert heatmap.coverage() == pytest.approx(100 * 3 / (13 * 13)) # 3 cells of the near half's 13 rows
+    np.testing.assert_allclose(heatmap.to_array().sum(), 1.0)
+
+    # The same movement by the far-half player (court rotated 180 degrees) gives the same zones
+    far = CourtHeatmap(cell_size=0.5)
+    far.update(np.array([[6.1, 13.4]]) - np.array([[1.0, 6.0], [5.0, 0.5], [5.0, 0.6], [5.5, 1.0]]))
+    assert far.zones() == pytest.approx(zones)
+
+    before = heatmap.counts.nbytes
+    heatmap.update(np.random.default_rng(0).uniform([0, 0], [6.1, 13.4], (100_000, 2)))
+    assert heatmap.counts.nbytes == before
+
+def test_summary_reports_coverage():
+    metrics = MetricsCalculator(ScaleCalibrator())
+    metrics.update_players([0], np.array([[30, 10]]), 0)
+    summary = metrics.get_summary()
+    assert 'zones' in summary['players'][0] and summary['players'][0]['coverage_points'] == 1
+    assert metrics.get_heatmaps()[0]['grid'].shape == (54, 25)
+
+def test_ring_buffer_running_sum():
+    ring = RingBuffer(3)
+    for value in [1, 2, 3, 4, 5]:
+        ring.push(value)
+    assert ring.count == 3 and ring.total[0] == 12
+    assert ring.oldest[0] == 3 and ring.newest[0] == 5
+
+def test_live_metrics():
+    live = LiveMetrics(fps=10.0)
+    live.window = 4.0
+    live.reset()
+    # 2 s of rest, then a 2 s rally with player 1 moving 2 m/s along the court
+    for frame in range(40):
+        in_rally = frame >= 20
+        y = 0.2 * max(frame - 20, 0)
+        live.update(frame, [1], np.array([[3.0, y]]), in_rally)
+
+    snap = live.snapshot()
+    assert snap['players'][1]['speed_mps'] == pytest.approx(2.0)
+    assert snap['players'][1]['rally_distance_m'] == pytest.approx(0.2 * 19)
+    assert snap['work_rest_ratio'] == pytest.approx(1.0)
+
+    # A new rally resets the distance; the window keeps only the last 4 s
+    live.update(40, [1], np.array([[3.0, 3.8]]), False)
+    live.update(41, [1], np.array([[3.0, 3.9]]), True)
+    assert live.snapshot()['players'][1]['rally_distance_m'] == pytest.approx(0.1)
+    assert live.snapshot()['work_s'] == pytest.approx(2.1) # Frames 20-39 and 41
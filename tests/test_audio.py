@@ -0,0 +1,59 @@
+import av
+import numpy as np
+import pytest
+from src.ingest import AudioAnalyzer
+
+SAMPLE_RATE = 44100
+HITS = [2.0, 3.1, 4.0, 5.2, 6.3, 14.0, 15.0, 16.1, 17.0]
+
+@pytest.fixture
+def match_audio(tmp_path):
+    """20s of hum and noise with sharp racket-like transients at HITS."""
+    rng = np.random.default_rng(0)
+    n = SAMPLE_RATE * 20
+    samples = rng.normal(0, 0.01, n) + 0.2 * np.sin(2 * np.pi * 120 * np.arange(n) / SAMPLE_RATE)
+    for hit in HITS:
+        i = int(hit * SAMPLE_RATE)
+        samples[i:i + 400] += rng.normal(0, 0.6, 400) * np.exp(-np.arange(400) / 80)
+    pcm = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+
+    path = str(tmp_path / "match.wav")
+    with av.open(path, "w") as container:
+        stream = container.add_stream("pcm_s16le", rate=SAMPLE_RATE)
+        stream.layout = "mono"
+        for start in range(0, n, 1024):
+            frame = av.AudioFrame.from_ndarray(pcm[None, start:start + 1024], format="s16", layout="mono")
+            frame.sample_rate = SAMPLE_RATE
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return path
+
+def test_onsets_and_rally_windows(match_audio):
+    result = AudioAnalyzer().analyze(match_audio)
+
+    np.testing.assert_allclose(result['onsets'], HITS, atol=0.02)
+    np.testing.assert_allclose(result['rallies'], [[1.0, 7.3], [13.0, 18.0]], atol=0.05)
+
+def test_streamed_envelope_matches_whole_signal():
+    samples = np.random.default_rng(1).normal(0, 0.1, 20_000).astype(np.float32)
+    whole = AudioAnalyzer()
+    whole.block_frames = 10_000 # One block
+    expected = whole.onset_envelope(samples)
+
+    # Small blocks over ragged decoder-sized chunks; the signal is never concatenated whole
+    streamed = AudioAnalyzer()
+    streamed.block_frames = 7
+    bounds = np.cumsum(np.random.default_rng(2).integers(1, 900, 60))
+    chunks = (c for c in np.split(samples, bounds[bounds < len(samples)]))
+    envelope = streamed.onset_envelope(chunks)
+
+    assert len(expected) == (len(samples) - whole.frame_length) // whole.hop_length + 1
+    np.testing.assert_allclose(envelope, expected, rtol=1e-5, atol=1e-6)
+    assert len(streamed.onset_envelope(iter([samples[:100]]))) == 0 # Shorter than one frame
+
+def test_active_mask():
+    windows = np.array([[1.0, 2.0], [5.0, 6.0]])
+    mask = AudioAnalyzer.active_mask(np.array([0.5, 1.0, 1.5, 3.0, 5.5, 6.0, 7.0]), windows)
+    assert mask.tolist() == [False, True, True, False, True, True, False]
@@ -0,0 +1,171 @@
+import cv2
+import numpy as np
+import pytest
+from src.calibrate import CourtCalibrator
+from src.calibrate.cache import CalibrationCache
+from src.calibrate.court import COURT_LINES_X, COURT_LINES_Y
+from src.utils.config import get_config
+
+WORLD_CORNERS = np.array([[0, 13.4], [6.1, 13.4], [6.1, 0], [0, 0]], dtype=np.float32)
+IMAGE_CORNERS = np.array([[420, 150], [860, 150], [1060, 640], [220, 640]], dtype=np.float32)
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep calibrators built from the default config out of data/calibration_cache."""
+    monkeypatch.setitem(get_config().config['calibration']['cache'], 'dir', str(tmp_path / "calibration_cache"))
+    return tmp_path / "calibration_cache"
+
+def render_court(image_corners: np.ndarray, size=(1280, 720)) -> np.ndarray:
+    """Draw the painted court lines seen through a known perspective."""
+    h = cv2.getPerspectiveTransform(WORLD_CORNERS, image_corners)
+    frame = np.full((size[1], size[0], 3), (40, 110, 60), dtype=np.uint8)
+
+    def draw(p, q):
+        pts = cv2.perspectiveTransform(np.array([[p, q]], dtype=np.float32), h)[0].astype(int)
+        cv2.line(frame, tuple(pts[0]), tuple(pts[1]), (235, 235, 235), 3)
+
+    for y in COURT_LINES_Y:
+        draw((0, y), (6.1, y))
+    for x in COURT_LINES_X:
+        draw((x, 0), (x, 13.4))
+    draw((3.05, 0), (3.05, 4.72))
+    draw((3.05, 8.68), (3.05, 13.4))
+
+    # Sensor noise and a player occluding part of the court
+    frame = cv2.add(frame, np.random.default_rng(0).integers(0, 25, frame.shape, dtype=np.uint8))
+    cv2.rectangle(frame, (600, 400), (660, 560), (20, 20, 200), -1)
+    return frame
+
+def test_detect_court_recovers_corners():
+    calibrator = CourtCalibrator()
+    success, h = calibrator.detect_court(render_court(IMAGE_CORNERS))
+
+    assert success
+    assert h.shape == (3, 3)
+    assert calibrator.confidence > calibrator.min_confidence
+    for px, world in zip(IMAGE_CORNERS, WORLD_CORNERS):
+        assert calibrator.pixel_to_court(tuple(px)) == pytest.approx(tuple(world), abs=0.2)
+
+def test_detect_court_rejects_blank_frame():
+    calibrator = CourtCalibrator()
+    success, h = calibrator.detect_court(np.full((720, 1280, 3), 90, dtype=np.uint8))
+
+    assert not success
+    assert h is None
+    assert calibrator.homography_matrix is None
+
+def test_calibrate_picks_best_frame(tmp_path):
+    calibrator = CourtCalibrator()
+    calibrator.cache = CalibrationCache(str(tmp_path))
+    blank = np.zeros((720, 1280, 3), dtype=np.uint8)
+    success, _ = calibrator.calibrate([blank, render_court(IMAGE_CORNERS), blank])
+
+    assert success
+    assert calibrator.pixel_to_court((220, 640)) == pytest.approx((0.0, 0.0), abs=0.2)
+
+def test_pixels_to_court_matches_single_point():
+    calibrator = CourtCalibrator()
+    calibrator.compute_homography_from_points(IMAGE_CORNERS)
+
+    batch = calibrator.pixels_to_court(IMAGE_CORNERS)
+    assert batch.shape == (4, 2)
+    np.testing.assert_allclose(batch, WORLD_CORNERS, atol=1e-4)
+    assert calibrator.pixel_to_court((640, 400)) == pytest.approx(tuple(calibrator.pixels_to_court([[640, 400]])[0]))
+
+def test_pixels_to_court_degenerate_scale():
+    calibrator = CourtCalibrator()
+    # Third row zeroes the homogeneous scale for every point on the line x + y = 0
+    calibrator.homography_matrix = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, 0.0]])
+
+    court = calibrator.pixels_to_court(np.array([[5.0, -5.0], [1.0, 1.0]]))
+    np.testing.assert_allclose(court, [[0.0, 0.0], [0.5, 0.5]])
+
+def test_calibration_cache_skips_detection_for_known_venue(tmp_path, monkeypatch):
+    frames = [render_court(IMAGE_CORNERS)] * 3
+
+    first = CourtCalibrator()
+    first.cache = CalibrationCache(str(tmp_path))
+    assert first.calibrate(frames)[0]
+    assert len(first.cache.entries) == 1
+
+    second = CourtCalibrator()
+    second.cache = CalibrationCache(str(tmp_path))
+    monkeypatch.setattr(second, "_detect", lambda frame: pytest.fail("line detection should be skipped"))
+    success, h = second.calibrate(frames)
+
+    assert success
+    np.testing.assert_allclose(h, first.homography_matrix)
+
+def test_calibration_cache_rejects_moved_camera(tmp_path):
+    cache = CalibrationCache(str(tmp_path))
+    calibrator = CourtCalibrator()
+    calibrator.cache = cache
+    calibrator.calibrate([render_court(IMAGE_CORNERS)])
+
+    # Same fingerprint but the stored homography no longer fits the lines
+    moved = IMAGE_CORNERS + np.float32([60, 40])
+    assert calibrator.verify(render_court(moved), calibrator.homography_matrix) < calibrator.min_confidence
+
+def test_stale_cache_hit_falls_back_to_detection():
+    moved = IMAGE_CORNERS + np.float32([60, 40])
+    frames = [render_court(moved)] * 3
+
+    # The venue's fingerprint matches, but its stored homography is from before the camera moved
+    calibrator = CourtCalibrator()
+    stale = cv2.getPerspectiveTransform(IMAGE_CORNERS, WORLD_CORNERS)
+    fingerprint = CalibrationCache.fingerprint(CalibrationCache.background(frames))
+    calibrator.cache.store(fingerprint, (1280, 720), stale, 0.9)
+
+    success, h = calibrator.calibrate(frames)
+
+    assert success
+    assert calibrator.pixel_to_court(tuple(moved[3])) == pytest.approx((0.0, 0.0), abs=0.2)
+    # The stale entry is replaced by the fresh homography
+    assert len(calibrator.cache.entries) == 1
+    np.testing.assert_allclose(calibrator.cache.lookup(fingerprint, (1280, 720)), h)
+
+def test_track_follows_camera_pan():
+    # Render a wider scene and pan a 1280x720 window across it
+    scene = render_court(IMAGE_CORNERS + np.float32([100, 50]), size=(1480, 820))
+    frames = [scene[50:770, 100 - dx:1380 - dx] for dx in range(0, 100, 4)]
+
+    calibrator = CourtCalibrator()
+    calibrator.compute_homography_from_points(IMAGE_CORNERS)
+    for frame in frames:
+        assert calibrator.track(frame)
+
+    # The bottom-left corner has moved right by the total pan
+    pan = 100 - 4 * (len(frames) - 1)
+    shifted = IMAGE_CORNERS[3] + np.float32([100 - pan, 0])
+    assert calibrator.pixel_to_court(tuple(shifted)) == pytest.approx((0.0, 0.0), abs=0.1)
+
+def test_track_starts_from_the_calibrated_frame():
+    scene = render_court(IMAGE_CORNERS + np.float32([100, 50]), size=(1480, 820))
+    frames = [scene[50:770, 100 - dx:1380 - dx] for dx in range(0, 100, 4)]
+
+    # Fitted on the first frame, but tracking only starts 12 frames (48 px of pan) later
+    calibrator = CourtCalibrator()
+    calibrator.drift_pixels = calibrator.verify_interval = np.inf # No line checks to hide an offset
+    assert calibrator.detect_court(frames[0])[0]
+    for frame in frames[12:]:
+        assert calibrator.track(frame)
+
+    pan = 100 - 4 * (len(frames) - 1)
+    shifted = IMAGE_CORNERS[3] + np.float32([100 - pan, 0])
+    assert calibrator.pixel_to_court(tuple(shifted)) == pytest.approx((0.0, 0.0), abs=0.2)
+
+def test_failed_recalibration_is_rate_limited(monkeypatch):
+    calibrator = CourtCalibrator()
+    calibrator.compute_homography_from_points(IMAGE_CORNERS)
+    blank = np.full((720, 1280, 3), 90, dtype=np.uint8)
+    calibrator.track(blank)
+
+    # Motion estimation keeps failing and the lines are gone
+    detections = []
+    monkeypatch.setattr(calibrator.motion_estimator, "update", lambda frame: None)
+    monkeypatch.setattr(calibrator, "_detect", lambda frame: detections.append(frame) or (None, 0.0))
+    for _ in range(90):
+        assert calibrator.track(blank)
+
+    assert len(detections) == 3 # Every retry_interval frames, not every frame
+    assert calibrator.homography_matrix is not None
@@ -0,0 +1,119 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from src.analytics import MatchCatalog
+from src.export import ResultWriter, read_results
+
+def write_match(out, speed, seconds=20, fps=30):
+    """Two players: track 1 shuttles between rear court and mid court at `speed` m/s, track 2 stands still."""
+    n = seconds * fps
+    t = np.arange(n) / fps
+    # Triangle wave between y=0.5 (rear) and y=4.5
+    phase = (speed * t) % 8.0
+    y1 = 0.5 + np.where(phase < 4.0, phase, 8.0 - phase)
+    rows = [(f, f / fps, 1, 0, 0.9, 0, 0, 1, 1, 3.0, y1[f]) for f in range(n)] + \
+           [(f, f / fps, 2, 0, 0.9, 0, 0, 1, 1, 3.0, 10.0) for f in range(n)] + \
+           [(f, f / fps, 3, 0, 0.9, 0, 0, 1, 1, 1.0, 1.0) for f in range(10)] # Spurious
+    with ResultWriter(out) as writer:
+        writer.write_rows('tracks', rows)
+        writer.write_rows('shots', [(0, 0, 10, 0.0, 1, 160.0, 1.0, 20.0, np.nan, 'Smash', True),
+                                    (0, 10, 20, 0.3, 2, 50.0, 5.0, 40.0, np.nan, 'Clear', False)])
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = MatchCatalog(catalog_dir=str(tmp_path / "catalog"))
+    for i, speed in enumerate([1.0, 2.0, 3.0]):
+        out = str(tmp_path / f"m{i}")
+        write_match(out, speed)
+        catalog.register(f"m{i}", out, fps=30, recorded_at=pd.Timestamp("2026-01-01") + pd.Timedelta(days=i))
+        catalog.label_player(f"m{i}", 1, "Lee")
+    return catalog
+
+def test_register_and_query(catalog, tmp_path):
+    summaries = catalog.summaries
+    assert len(catalog.matches) == 3 and set(summaries['track_id']) == {1, 2} # Spurious track dropped
+    lee = summaries[summaries['player'] == "Lee"].set_index('match_id')
+    assert lee.loc['m0', 'smash_count'] == 1 and lee.loc['m0', 'clear_count'] == 0
+    np.testing.assert_allclose(lee['rear_recovery_speed_mps'], [1.0, 2.0, 3.0], rtol=0.1)
+
+    result = catalog.query('rear_recovery_speed_mps', player="Lee", last_n=2)
+    assert result['matches'] == 2
+    assert result['value'] == pytest.approx(2.5, rel=0.1) # Two most recent matches
+
+    # Tables persist and are re-read by a fresh instance; labels survive re-registration
+    reopened = MatchCatalog(catalog_dir=str(tmp_path / "catalog"))
+    catalog.register("m2", str(tmp_path / "m2"), fps=30)
+    assert reopened.query('distance_m', player="Lee")['matches'] == 3
+
+    with pytest.raises(ValueError):
+        catalog.query('no_such_metric')
+
+def test_season_query_uses_summary_tables(catalog):
+    # Simulate a season of catalogued matches, Lee's max speed in match i being i m/s
+    copies = range(300)
+    catalog.matches = pd.concat([catalog.matches.iloc[[0]].assign(match_id=f"s{i}", recorded_at=pd.Timestamp("2026-01-01") + pd.Timedelta(days=i))
+                                 for i in copies], ignore_index=True)
+    catalog.summaries = pd.concat([catalog.summaries[catalog.summaries['match_id'] == "m0"].assign(match_id=f"s{i}", max_speed_mps=float(i))
+                                   for i in copies], ignore_index=True)
+    catalog._save()
+    # Per-frame results are not needed to answer a query
+    shutil.rmtree(os.path.join(catalog.catalog_dir, MatchCatalog.RESULTS_DIR))
+
+    reader = MatchCatalog(catalog_dir=catalog.catalog_dir)
+    result = reader.query('max_speed_mps', player="Lee", last_n=20)
+    assert result['matches'] == 20
+    assert result['value'] == pytest.approx(np.mean(range(280, 300)))
+
+    # Changes written by another instance are picked up by the next query
+    catalog.summaries.loc[catalog.summaries['match_id'] == "s299", 'max_speed_mps'] = 499.0
+    catalog._save()
+    assert reader.query('max_speed_mps', player="Lee", last_n=20)['value'] == pytest.approx((sum(range(280, 299)) + 499.0) / 20)
+
+def test_query_cli_prints_undefined_metrics(catalog, tmp_path, monkeypatch):
+    from click.testing import CliRunner
+    import yaml
+    import src.utils.config
+    from src.main import cli
+
+    # Lee never recovers from the rear court in m1
+    catalog.summaries.loc[(catalog.summaries['match_id'] == "m1") & (catalog.summaries['player'] == "Lee"),
+                          'rear_recovery_speed_mps'] = np.nan
+    catalog._save()
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump({'analytics': {'catalog_dir': catalog.catalog_dir}}))
+    monkeypatch.setattr(src.utils.config, '_config_instance', None)
+
+    result = CliRunner().invoke(cli, ['query', '-m', 'rear_recovery_speed_mps', '-p', 'Lee', '-c', str(config_path)])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert any("m1" in line and line.endswith("n/a") for line in lines)
+    assert lines[-1].startswith("mean(rear_recovery_speed_mps) over 3 matches: ")
+
+def test_concurrent_registrations_keep_their_own_results(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    catalog_dir = str(tmp_path / "catalog")
+    shared = str(tmp_path / "outputs" / "results") # Reused by every run, as in the CLI
+    write_match(shared, 1.0)
+    MatchCatalog(catalog_dir=catalog_dir).register("first", shared, fps=30)
+    write_match(shared, 3.0)
+
+    # Separate instances stand in for separate worker processes
+    sources = []
+    for i in range(4):
+        sources.append(str(tmp_path / f"job{i}"))
+        write_match(sources[-1], 2.0)
+    catalogs = [MatchCatalog(catalog_dir=catalog_dir) for _ in sources]
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda i: catalogs[i].register(f"job{i}", sources[i], fps=30), range(4)))
+
+    catalog = MatchCatalog(catalog_dir=catalog_dir)
+    assert set(catalog.matches['match_id']) == {"first", "job0", "job1", "job2", "job3"}
+    assert len(set(catalog.matches['results_dir'])) == 5
+    # The first match's results were not overwritten by the later run
+    first = catalog.matches.set_index('match_id').loc['first', 'results_dir']
+    assert first.startswith(catalog_dir) and first != shared
+    tracks = read_results(first, 'tracks', columns=['frame', 'track_id', 'court_y']).to_pandas()
+    y = tracks[(tracks['track_id'] == 1) & (tracks['frame'] == 30)]['court_y'].iloc[0]
+    assert y == pytest.approx(1.5) # 1 m/s for a second from y=0.5
@@ -0,0 +1,158 @@
+import numpy as np
+import pytest
+from src.events import EventDetector, OfflineEventEngine
+
+FPS = 30.0
+
+def make_match(n_frames=900):
+    """Shuttle visible in two rallies (frames 30-239, 400-479) plus a short blip."""
+    t = np.arange(n_frames) / FPS
+    visible = np.zeros(n_frames, dtype=bool)
+    visible[30:240] = True
+    visible[400:480] = True
+    visible[600:610] = True # Too short to be a rally
+
+    # Shuttle bounces between the two ends of the court every second
+    phase = (t % 2.0) / 2.0
+    y = np.where(phase < 0.5, phase * 2, 2 - phase * 2) * 13.4
+    positions = np.column_stack([np.full(n_frames, 3.0), y])
+    positions[~visible] = np.nan
+    return t, positions, visible
+
+def test_offline_matches_streaming_rallies():
+    t, positions, visible = make_match()
+
+    streaming = EventDetector()
+    for i in range(len(t)):
+        streaming.update({'frame_idx': i, 'timestamp': t[i], 'shuttle_pos': tuple(positions[i]) if visible[i] else None})
+    streaming.finalize()
+
+    offline = OfflineEventEngine().process(t, positions)
+
+    assert [(r['start_frame'], r['end_frame']) for r in offline['rallies']] == [(30, 239)]
+    assert [(r['start_frame'], r['end_frame']) for r in streaming.rallies] == [(30, 239)]
+    assert offline['rallies'][0]['duration'] == pytest.approx(streaming.rallies[0]['duration'])
+
+def test_offline_bridges_short_gaps():
+    t, positions, visible = make_match()
+    positions[100:105] = np.nan # Shuttle lost for 5 frames mid-rally
+
+    engine = OfflineEventEngine()
+    rallies = engine.process(t, positions)['rallies']
+    assert [(r['start_frame'], r['end_frame']) for r in rallies] == [(105, 239)] # First half is under 3s
+
+    engine.max_gap = 0.5
+    rallies = engine.process(t, positions)['rallies']
+    assert [(r['start_frame'], r['end_frame']) for r in rallies] == [(30, 239)]
+
+def test_offline_hits_and_landing():
+    t, positions, _ = make_match()
+    result = OfflineEventEngine().process(t, positions)
+
+    # Direction reverses every second inside frames 30-239
+    np.testing.assert_array_equal(result['hits'], [60, 90, 120, 150, 180, 210])
+    # Serve plus one shot per hit
+    assert result['rallies'][0]['shot_count'] == 7
+    assert [shot['frame'] for shot in result['rallies'][0]['shots']] == [30, 60, 90, 120, 150, 180, 210]
+    np.testing.assert_allclose(result['rallies'][0]['landing'], positions[239])
+
+def test_streaming_state_is_constant_size():
+    detector = EventDetector()
+    for i in range(1000):
+        detector.update({'frame_idx': i, 'timestamp': i / FPS, 'shuttle_pos': (1.0, 1.0)})
+    assert detector.in_rally
+    assert not hasattr(detector, 'current_rally')
+
+def test_hits_require_nearby_player():
+    t, positions, _ = make_match()
+    # One player stands at the far baseline for the whole match
+    frames = np.arange(len(t))
+    players = {'frame': frames, 'track_id': np.full(len(t), 7), 'x': np.full(len(t), 3.0), 'y': np.full(len(t), 13.4)}
+
+    result = OfflineEventEngine().process(t, positions, players=players)
+
+    # Only reversals at the far end (y ~ 13.4) are hits
+    np.testing.assert_array_equal(result['hits'], [90, 150, 210])
+    assert all(shot['player_id'] == 7 for shot in result['rallies'][0]['shots'][1:])
+
+def test_shot_features_and_batch_classification():
+    t, positions, _ = make_match()
+    heights = np.full(len(t), 1.5)
+    result = OfflineEventEngine().process(t, positions, heights=heights)
+    shots = result['shots']
+
+    # 13.4 m per second along the court -> 48.24 km/h
+    np.testing.assert_allclose(shots['max_speed'], 13.4 * 3.6, rtol=1e-6)
+    np.testing.assert_allclose(shots['max_height'], 1.5)
+    assert list(shots['type']) == ['Unclassified'] * 7
+
+    detector = EventDetector()
+    types = detector.classify_shots({
+        'max_speed': np.array([250.0, 120.0, 150.0, 60.0]),
+        'max_height': np.array([2.5, 6.0, 1.6, 2.0]),
+        'angle': np.array([45.0, 60.0, 5.0, 40.0])
+    })
+    assert list(types) == ['Smash', 'Clear', 'Drive', 'Drop']
+    assert detector.classify_shot({'max_speed': 250.0, 'angle': 45.0, 'max_height': 2.5}) == 'Smash'
+    assert detector.classify_shot({}) == 'Unclassified'
+
+def make_varied_rally():
+    """One rally in court meters: a clear, a drop, a drive and another clear, with both players at the baselines."""
+    key_t = [0.0, 0.15, 1.6, 2.6, 3.05, 3.2, 4.65]
+    key_y = [0.0, 5.0, 13.4, 0.0, 13.4, 8.4, 0.0] # Clears leave the racket fast and slow down
+    t = np.arange(int(4.65 * FPS) + 1) / FPS
+    positions = np.column_stack([np.full(len(t), 3.0), np.interp(t, key_t, key_y)])
+    frames = np.arange(len(t))
+    players = {'frame': np.concatenate([frames, frames]), 'track_id': np.repeat([1, 2], len(t)),
+               'x': np.full(2 * len(t), 3.0), 'y': np.repeat([0.0, 13.4], len(t))}
+    return t, positions, frames, players
+
+def test_shots_are_classified_without_heights():
+    t, positions, frames, players = make_varied_rally()
+    # As called by the pipeline: court positions only, no shuttle height
+    result = OfflineEventEngine().process(t, positions, visible=np.ones(len(t), dtype=bool), frame_indices=frames,
+                                          players=players, audio_onsets=np.array([]),
+                                          swing={'frame': frames, 'track_id': np.ones(len(t), dtype=int),
+                                                 'swing_speed': np.full(len(t), 2.0)})
+    shots = result['rallies'][0]['shots']
+
+    assert [shot['type'] for shot in shots] == ['Clear', 'Drop', 'Drive', 'Clear']
+    assert [shot['player_id'] for shot in shots] == [1, 2, 1, 2]
+    assert all(np.isnan(shot['angle']) and np.isnan(shot['max_height']) for shot in shots)
+
+def test_fast_swing_marks_smash_without_heights():
+    t, positions, frames, players = make_varied_rally()
+    # Player 2 swings hard only for the second shot; the shuttle is tracked too slowly for a smash
+    swing = {'frame': np.concatenate([frames, frames]), 'track_id': np.repeat([1, 2], len(t)),
+             'swing_speed': np.concatenate([np.full(len(t), 2.0), np.where(np.abs(t - 1.6) < 0.1, 20.0, 2.0)])}
+    result = OfflineEventEngine().process(t, positions, frame_indices=frames, players=players, swing=swing)
+
+    assert [shot['type'] for shot in result['rallies'][0]['shots']] == ['Clear', 'Smash', 'Drive', 'Clear']
+
+def test_audio_onsets_confirm_shots():
+    t, positions, _ = make_match()
+    onsets = np.array([1.0, 2.05, 5.5]) # Frames 30 and ~60; 5.5s matches no shot
+    result = OfflineEventEngine().process(t, positions, audio_onsets=onsets)
+
+    confirmed = [shot['audio_confirmed'] for shot in result['rallies'][0]['shots']]
+    assert confirmed == [True, True, False, False, False, False, False]
+
+def test_swing_speed_attached_to_shots():
+    t, positions, _ = make_match()
+    frames = np.arange(len(t))
+    players = {'frame': frames, 'track_id': np.full(len(t), 7), 'x': np.full(len(t), 3.0), 'y': np.full(len(t), 13.4)}
+    # Player 7 swings hard around the hit at frame 150 only; another player swings at the same time
+    swing = {'frame': np.concatenate([frames, frames]), 'track_id': np.repeat([7, 8], len(t)),
+             'swing_speed': np.concatenate([np.where(np.abs(frames - 152) <= 2, 25.0, 2.0), np.full(len(t), 30.0)])}
+
+    shots = OfflineEventEngine().process(t, positions, players=players, swing=swing)['rallies'][0]['shots']
+    by_frame = {shot['frame']: shot['swing_speed'] for shot in shots}
+    assert by_frame[150] == 25.0 and by_frame[90] == 2.0
+
+def test_default_config_event_thresholds():
+    from src.utils.config import ConfigLoader
+    config = ConfigLoader("config/default.yaml")
+    assert config.config['events']['smash_speed_threshold'] == 200.0
+    assert config.config['events']['clear_flight_time'] == 1.4
+    assert OfflineEventEngine(config).min_shuttle_speed == config.config['events']['min_direction_speed_mps'] == 1.0
+    assert EventDetector(config).smash_thresh == 200.0
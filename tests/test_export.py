@@ -0,0 +1,25 @@
+import numpy as np
+import pyarrow.parquet as pq
+from src.export import ResultWriter, read_results, keypoints_array
+
+def test_round_trip_and_time_slices(tmp_path):
+    out = str(tmp_path / "results")
+    rng = np.random.default_rng(0)
+    keypoints = rng.random((6, 17, 3)).astype(np.float32)
+
+    with ResultWriter(out) as writer:
+        for chunk in range(3): # One row group per 10s chunk
+            frames = np.arange(chunk * 300, (chunk + 1) * 300)
+            writer.write_rows('shuttle', [(f, f / 30.0, True, 1.0, 2.0, 3.0, 4.0, 0.9) for f in frames])
+            writer.write_rows('keypoints', [(int(frames[0]) + p, frames[0] / 30.0, p, -1, 0.8, 0, 0, 10, 20, keypoints[chunk * 2 + p])
+                                            for p in range(2)])
+            writer.write_rows('tracks', []) # Nothing tracked
+
+    assert pq.ParquetFile(f"{out}/shuttle.parquet").metadata.num_row_groups == 3
+    middle = read_results(out, 'shuttle', start_time=10.0, end_time=20.0, columns=['frame', 'time'])
+    np.testing.assert_array_equal(middle.column('frame').to_numpy(), np.arange(300, 600))
+
+    np.testing.assert_array_equal(keypoints_array(read_results(out, 'keypoints')), keypoints)
+    # Datasets never written still exist, empty, with their schema
+    assert read_results(out, 'tracks').num_rows == 0
+    assert 'shot_count' in read_results(out, 'rallies').column_names
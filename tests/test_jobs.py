@@ -0,0 +1,80 @@
+import os
+import threading
+import pytest
+from src.web import jobs
+from src.web.jobs import JobQueue, JobState, work
+
+class FakePipeline:
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.runs = []
+
+    def run(self, video_path, match_id=None, output_dir=None):
+        self.runs.append(match_id)
+        if match_id in self.fail_on:
+            raise RuntimeError("bad video")
+        with open(os.path.join(output_dir, "coaching_report.md"), "w") as f:
+            f.write(f"# Report for {video_path}\n")
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite"))
+
+def test_claim_is_fifo_and_exclusive(queue, tmp_path):
+    for i in range(3):
+        queue.submit(f"job{i}", f"video{i}.mp4", str(tmp_path / f"job{i}"))
+
+    claimed = [queue.claim("w0"), queue.claim("w1"), queue.claim("w0")]
+    assert [job['id'] for job in claimed] == ["job0", "job1", "job2"]
+    assert all(job['status'] == JobState.PROCESSING and job['attempts'] == 1 for job in claimed)
+    assert queue.claim("w1") is None
+    assert queue.count(JobState.PENDING) == 0
+
+def test_only_stale_or_dead_workers_jobs_are_requeued(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(jobs.time, "time", lambda: clock[0])
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), max_attempts=2)
+    for job_id in ("a", "b", "c"):
+        queue.submit(job_id, f"{job_id}.mp4", str(tmp_path / job_id))
+        queue.claim(f"host:{job_id}")
+
+    # Jobs of live workers (e.g. another API process's pool) are left alone
+    assert queue.requeue_interrupted(stale_after=60.0) == 0
+    # A known-dead worker's job goes back at once
+    assert queue.requeue_interrupted(stale_after=60.0, workers=["host:a"]) == 1
+    assert [queue.get(j)['status'] for j in "abc"] == [JobState.PENDING, JobState.PROCESSING, JobState.PROCESSING]
+
+    # A reopened queue (API restart) sees the same jobs; b keeps beating, c stopped
+    queue = JobQueue(queue.db_path, max_attempts=2)
+    assert queue.claim("host:d")['id'] == "a"
+    clock[0] += 100.0
+    queue.heartbeat("b", "host:b")
+    assert queue.requeue_interrupted(stale_after=60.0) == 1 # c; a has used both attempts
+    assert [queue.get(j)['status'] for j in "abc"] == [JobState.FAILED, JobState.PROCESSING, JobState.PENDING]
+
+def test_worker_runs_jobs_into_their_own_directories(queue, tmp_path):
+    for job_id in ("ok1", "broken", "ok2"):
+        queue.submit(job_id, f"{job_id}.mp4", str(tmp_path / "jobs" / job_id), filename=f"{job_id}.mp4")
+    pipeline = FakePipeline(fail_on={"broken"})
+    stop = threading.Event()
+
+    thread = threading.Thread(target=work, args=(queue, pipeline, "w0", stop, 0.01))
+    thread.start()
+    try:
+        for _ in range(500):
+            if queue.count(JobState.PENDING) == 0 and queue.count(JobState.PROCESSING) == 0:
+                break
+            stop.wait(0.01)
+    finally:
+        stop.set()
+        thread.join(5)
+
+    assert pipeline.runs == ["ok1", "broken", "ok2"]
+    for job_id in ("ok1", "ok2"):
+        job = queue.get(job_id)
+        assert job['status'] == JobState.COMPLETED
+        with open(job['result']['report_path']) as f:
+            assert f"{job_id}.mp4" in f.read()
+    broken = queue.get("broken")
+    assert broken['status'] == JobState.FAILED and broken['error'] == "bad video"
+    assert [job['id'] for job in queue.list(JobState.COMPLETED)] == ["ok2", "ok1"]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from src.pose import BiomechanicsAnalyzer, match_boxes
+from src.events import classify_shots
+
+def skeleton(knee_bend=0.0, wrist_x=0.0):
+    """Upright player, torso 100 px; right knee bent by `knee_bend` degrees."""
+    kps = np.zeros((17, 3))
+    kps[:, 2] = 0.9
+    kps[5], kps[6] = (90, 100, 0.9), (110, 100, 0.9) # Shoulders
+    kps[11], kps[12] = (90, 200, 0.9), (110, 200, 0.9) # Hips
+    kps[7], kps[9] = (90, 150, 0.9), (90, 200, 0.9) # Left arm straight down
+    kps[8], kps[10] = (140, 100, 0.9), (140 + wrist_x, 50, 0.9) # Right elbow at 90 degrees
+    kps[13], kps[15] = (90, 250, 0.9), (90, 300, 0.9) # Left leg straight
+    kps[14] = (110, 250, 0.9)
+    bend = np.radians(knee_bend)
+    kps[16] = (110 + 50 * np.sin(bend), 250 + 50 * np.cos(bend), 0.9)
+    return kps
+
+def test_angles_stance_and_masking():
+    kps = np.stack([skeleton(), skeleton(knee_bend=90)])
+    kps[1, 9, 2] = 0.1 # Left wrist not visible
+    f = BiomechanicsAnalyzer().features(kps, np.array([0, 1]), fps=30.0)
+
+    np.testing.assert_allclose(f['left_knee_angle'], [180, 180])
+    np.testing.assert_allclose(f['right_knee_angle'], [180, 90])
+    np.testing.assert_allclose(f['lunge_depth'], [0, 90], atol=1e-6)
+    np.testing.assert_allclose(f['right_elbow_angle'], [90, 90])
+    assert f['left_elbow_angle'][0] == pytest.approx(180) and np.isnan(f['left_elbow_angle'][1])
+    np.testing.assert_allclose(f['trunk_lean'], [0, 0])
+    assert f['stance_width'][0] == pytest.approx(0.2) # 20 px between ankles / 100 px torso
+
+def test_swing_speed_and_summary():
+    # Right wrist moves 10 px per frame at 30 fps = 3 torso lengths/s; gap frames are skipped
+    kps = np.stack([skeleton(wrist_x=10 * t) for t in range(5)])
+    analyzer = BiomechanicsAnalyzer()
+    f = analyzer.features(kps, np.array([0, 1, 2, 3, 10]), fps=30.0)
+    np.testing.assert_allclose(f['swing_speed'][1:4], 3.0)
+    assert np.isnan(f['swing_speed'][0]) and np.isnan(f['swing_speed'][4])
+
+    summary = analyzer.summarize(f)
+    assert summary['max_swing_speed'] == pytest.approx(3.0)
+    assert summary['max_lunge_depth_deg'] == pytest.approx(0.0, abs=1e-6)
+
+def test_long_sequence_features():
+    # Knee alternates straight and bent; the left arm drops out every third frame
+    kps = np.stack([skeleton(), skeleton(knee_bend=90)] * 25_000)
+    kps[::3, 7, 2] = 0.1
+    f = BiomechanicsAnalyzer().features(kps, np.arange(50_000), fps=30.0)
+
+    assert all(len(v) == 50_000 for v in f.values())
+    np.testing.assert_allclose(f['right_knee_angle'], np.tile([180, 90], 25_000))
+    assert np.isnan(f['left_elbow_angle'][::3]).all()
+    np.testing.assert_allclose(np.delete(f['left_elbow_angle'], np.s_[::3]), 180)
+
+def test_match_boxes():
+    poses = np.array([[0, 0, 10, 10], [100, 100, 110, 120], [50, 50, 60, 60]])
+    tracks = np.array([[101, 99, 111, 121], [1, 0, 11, 10]])
+    np.testing.assert_array_equal(match_boxes(poses, tracks), [1, 0, -1])
+
+def test_swing_speed_in_classification():
+    # Steep, slow-looking shuttle: a drop, unless the arm swing was fast
+    types = classify_shots([60, 60, 60], [1, 1, 1], [40, 40, 40], swing_speed=[5.0, 20.0, np.nan])
+    assert list(types) == ["Drop", "Smash", "Drop"]
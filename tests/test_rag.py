@@ -0,0 +1,431 @@
+import os
+import numpy as np
+import pytest
+from src.utils.config import ConfigLoader
+from src.rag import KnowledgeBase, EmbeddingMatrix, VectorStore, BM25Index, ResponseCache, CorpusIngester, EmbeddingCache, chunk_text
+from src.rag.bm25 import tokenize
+
+class CountingEncoder:
+    """Deterministic stand-in for a sentence encoder that records its calls."""
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = []
+
+    def encode(self, texts):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        self.calls.append(len(texts))
+        vectors = np.stack([np.random.default_rng(sum(map(ord, t))).normal(size=self.dim) for t in texts]).astype(np.float32)
+        return vectors[0] if single else vectors
+
+@pytest.fixture
+def config(tmp_path):
+    config = ConfigLoader()
+    config.config['rag']['embedding_cache_dir'] = str(tmp_path / "embeddings")
+    config.config['rag']['db_path'] = str(tmp_path / "kb")
+    return config
+
+DRILLS = [("Smash: jump and snap the wrist.", {"topic": "smash"}),
+          ("Footwork: split step before every shot.", {"topic": "footwork"}),
+          ("Net play: soft hands, racket up.", {"topic": "net"})]
+
+def test_add_documents_encodes_once_and_reuses_cache(config):
+    encoder = CountingEncoder()
+    kb = KnowledgeBase(config, encoder=encoder)
+    kb.add_documents(DRILLS)
+    assert encoder.calls == [3]
+
+    # Rebuilding from unchanged text needs no encoding at all
+    config.config['rag']['persist'] = False
+    rebuilt_encoder = CountingEncoder()
+    rebuilt = KnowledgeBase(config, encoder=rebuilt_encoder)
+    rebuilt.add_documents(DRILLS)
+    assert rebuilt_encoder.calls == []
+    np.testing.assert_array_equal(kb.embeddings.matrix, rebuilt.embeddings.matrix)
+
+    # Only the new document is encoded; re-adding a stored one is a no-op
+    rebuilt.add_documents([("Drive: flat and fast.", {"topic": "drive"})] + DRILLS[:1])
+    assert rebuilt_encoder.calls == [1]
+    assert len(rebuilt.documents) == 4
+
+def test_embedding_cache_appends_and_is_shared(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(4, 8)).astype(np.float32)
+    keys = [EmbeddingCache.key(str(i)) for i in range(4)]
+    first, second = EmbeddingCache(str(tmp_path), "enc/v1"), EmbeddingCache(str(tmp_path), "enc/v1")
+
+    first.put_many(keys[:2], vectors[:2])
+    size = os.path.getsize(first.vectors_path)
+    second.put_many(keys[1:3], vectors[1:3]) # Only keys[2] is new; nothing is rewritten
+    assert os.path.getsize(first.vectors_path) == size + vectors[2].nbytes
+    np.testing.assert_array_equal(second.get_many(keys[:1])[0], vectors[0]) # Written by the other handle
+
+    with open(first.vectors_path, "ab") as f:
+        f.write(b"\0\0") # Interrupted append
+    first.put_many(keys[3:], vectors[3:])
+    reopened = EmbeddingCache(str(tmp_path), "enc/v1")
+    assert len(reopened) == 4
+    np.testing.assert_array_equal(np.stack(reopened.get_many(keys)), vectors)
+
+def test_single_add_document_and_query(config):
+    kb = KnowledgeBase(config, encoder=CountingEncoder())
+    for text, meta in DRILLS:
+        kb.add_document(text, meta)
+    assert kb.query(DRILLS[1][0], n_results=1)[0]['metadata']['topic'] == 'footwork'
+
+def test_query_with_metadata_filter(config):
+    kb = KnowledgeBase(config, encoder=CountingEncoder())
+    kb.add_documents(DRILLS + [("Footwork: lunge to the net.", {"topic": "footwork", "level": "advanced"})])
+    hits = kb.query(DRILLS[0][0], n_results=5, where={'topic': 'footwork'})
+    assert {h['metadata']['topic'] for h in hits} == {'footwork'} and len(hits) == 2
+    hits = kb.query(DRILLS[0][0], where={'topic': 'footwork', 'level': 'advanced'})
+    assert [h['text'] for h in hits] == ["Footwork: lunge to the net."]
+    assert kb.query(DRILLS[0][0], where={'topic': 'serve'}) == []
+
+def test_embedding_matrix_growth_and_topk():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(5000, 32)).astype(np.float32)
+    index = EmbeddingMatrix()
+    for chunk in np.array_split(vectors, 7):
+        index.add(chunk)
+    assert len(index) == 5000 and index.matrix.flags['C_CONTIGUOUS']
+    np.testing.assert_allclose(np.linalg.norm(index.matrix, axis=1), 1.0, rtol=1e-5)
+
+    query = vectors[1234] + 0.01
+    top, scores = index.search(query, 5)
+    expected = np.argsort(-(EmbeddingMatrix.normalize(vectors) @ EmbeddingMatrix.normalize(query)))[:5]
+    np.testing.assert_array_equal(top, expected)
+    assert top[0] == 1234 and np.all(np.diff(scores) <= 0)
+
+    rows = np.arange(0, 5000, 2)
+    top, _ = index.search(query, 3, rows)
+    assert np.all(top % 2 == 0) and 1234 in top
+
+def test_knowledge_base_reopens_persistent_store(config):
+    kb = KnowledgeBase(config, encoder=CountingEncoder())
+    kb.add_documents(DRILLS)
+    kb.add_document("Serve: low and tight.", {"topic": "serve"}, doc_id="serve")
+    kb.add_document("Serve: flick when they rush.", {"topic": "serve"}, doc_id="serve") # Upsert
+    kb.delete([kb.documents[0]['id']])
+
+    encoder = CountingEncoder()
+    reopened = KnowledgeBase(config, encoder=encoder)
+    assert [d['text'] for d in reopened.documents] == [t for t, _ in DRILLS[1:]] + ["Serve: flick when they rush."]
+    np.testing.assert_allclose(reopened.embeddings.matrix, kb.embeddings.matrix)
+    reopened.add_documents(DRILLS[1:]) # Startup hydration of an existing store
+    assert reopened.query("Serve: flick when they rush.", n_results=1)[0]['id'] == "serve"
+    assert encoder.calls == [1] # Only the query was encoded
+
+def test_vector_store_compaction_and_torn_writes(tmp_path):
+    path = str(tmp_path / "store")
+    rng = np.random.default_rng(0)
+    store = VectorStore(path, model="m")
+    for i in range(50):
+        store.upsert([f"d{i % 10}"], [f"text {i}"], [{}], rng.normal(size=(1, 4)))
+    assert len(store) == 10
+    expected = store.embeddings.matrix.copy()
+
+    with open(store._file("vectors") + ".f32", "ab") as f:
+        f.write(b"\0\0") # Interrupted append
+    reopened = VectorStore(path, model="m")
+    np.testing.assert_allclose(reopened.embeddings.matrix, expected, rtol=1e-6)
+    assert reopened.get("d3")['text'] == "text 43"
+    reopened.upsert(["new"], ["new"], [{}], rng.normal(size=(1, 4)))
+    assert len(VectorStore(path, model="m")) == 11
+    assert len(VectorStore(path, model="other")) == 0 # Different encoder, not reused
+
+    store = VectorStore(str(tmp_path / "big"), model="m")
+    store.upsert([f"d{i}" for i in range(1500)], ["t"] * 1500, [{}] * 1500, rng.normal(size=(1500, 4)))
+    store.delete([f"d{i}" for i in range(1400)])
+    store.upsert(["x"], ["t"], [{}], rng.normal(size=(1, 4)))
+    assert store._generation == 1 and store._disk_records == 101 # Compacted
+    assert len(VectorStore(str(tmp_path / "big"), model="m")) == 101
+
+def test_vector_store_shared_between_processes(tmp_path):
+    # Two handles on one directory stand in for a pipeline worker and `ingest-kb`
+    path = str(tmp_path / "store")
+    rng = np.random.default_rng(0)
+    vectors = {i: rng.normal(size=(1, 4)) for i in "abcd"}
+    worker, ingest = VectorStore(path, model="m"), VectorStore(path, model="m")
+
+    worker.upsert(["a"], ["a"], [{}], vectors["a"])
+    ingest.upsert(["b"], ["b"], [{}], vectors["b"])
+    assert len(ingest) == 2 # Caught up with the worker's append first
+    ingest.compact()
+    worker.upsert(["c"], ["c"], [{}], vectors["c"]) # Appends to the new generation
+    assert worker._generation == ingest._generation == 1
+    ingest.delete(["a"])
+
+    reopened = VectorStore(path, model="m")
+    assert [doc['id'] for doc in reopened.documents] == ["b", "c"]
+    for row, doc in enumerate(reopened.documents): # Vectors still line up with their documents
+        np.testing.assert_allclose(reopened.embeddings.matrix[row], EmbeddingMatrix.normalize(vectors[doc['id']])[0], rtol=1e-6)
+    worker.refresh()
+    assert len(worker) == 2 and "a" not in worker
+
+def test_ivf_search_recall():
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(40, 32))
+    vectors = centers[rng.integers(0, 40, 20000)] + 0.3 * rng.normal(size=(20000, 32))
+    exact = VectorStore()
+    ann = VectorStore(ann_threshold=10000, nprobe=8)
+    ids = [str(i) for i in range(len(vectors))]
+    exact.upsert(ids, ids, [{}] * len(ids), vectors)
+    ann.upsert(ids, ids, [{}] * len(ids), vectors)
+
+    queries = vectors[rng.choice(len(vectors), 50)] + 0.1 * rng.normal(size=(50, 32))
+    hits = 0
+    for q in queries:
+        truth, _ = exact.search(q, 10)
+        approx, _ = ann.search(q, 10)
+        hits += len(set(truth) & set(approx))
+    assert ann._ivf is not None and ann._ivf.nlist == 141
+    assert hits / (10 * len(queries)) > 0.9
+
+def test_encoder_is_loaded_lazily_and_shared(config, monkeypatch):
+    from src.rag import encoder as encoder_module
+    from src.rag import knowledge_base
+    shared = CountingEncoder()
+    loads = []
+    monkeypatch.setattr(knowledge_base, "encoder_available", lambda: True)
+    monkeypatch.setattr(encoder_module, "_encoders", {("all-MiniLM-L6-v2", None): shared})
+    monkeypatch.setattr(knowledge_base, "get_encoder", lambda *args: loads.append(args) or encoder_module.get_encoder(*args))
+
+    KnowledgeBase(config, encoder=CountingEncoder()).add_documents(DRILLS) # Warm the cache and store
+    kb = KnowledgeBase(config)
+    kb.add_documents(DRILLS)
+    assert kb.has_encoder and loads == [] # Nothing to encode, nothing loaded
+
+    assert kb.query(DRILLS[2][0], n_results=1)[0]['metadata']['topic'] == 'net'
+    other = KnowledgeBase(config)
+    other.query("footwork")
+    assert kb.encoder is other.encoder is shared and shared.calls == [1, 1]
+
+def test_bm25_scores_and_incremental_updates():
+    index = BM25Index()
+    index.add("a", "Footwork drills: split step and lunge.")
+    index.add("b", "Smash drills for power.")
+    index.add("c", "Net play and net kills.")
+    assert tokenize("Footwork Drills, lunges!") == ["footwork", "drill", "lunge"]
+
+    hits = index.search("net drills", 3)
+    assert hits[0][0] == "c" and {h[0] for h in hits} == {"a", "b", "c"}
+    # "net" is rarer than "drill" and appears twice in c
+    assert index.scores("net")["c"] > index.scores("drill")["a"]
+    assert index.search("net drills", 3, allowed={"a", "b"})[0][0] in {"a", "b"}
+
+    index.add("c", "Serve practice.") # Replace
+    index.remove("b")
+    assert "net" not in index._postings and len(index) == 2
+    assert [h[0] for h in index.search("smash serve", 5)] == ["c"]
+
+def test_keyword_fallback_and_hybrid_ranking(config, monkeypatch):
+    from src.rag import knowledge_base
+    monkeypatch.setattr(knowledge_base, "encoder_available", lambda: False)
+    kb = KnowledgeBase(config)
+    kb.add_documents(DRILLS)
+    assert [d['metadata']['topic'] for d in kb.query("split step footwork")] == ['footwork']
+    assert kb.query("racket", where={'topic': 'smash'}) == []
+    kb.add_document("Defence: racket up, wide base.", {"topic": "defence"}) # Indexed incrementally
+    assert kb.query("racket", where={'topic': 'defence'})[0]['metadata']['topic'] == 'defence'
+    kb.delete([kb.documents[2]['id']])
+    assert kb.query("racket", n_results=5)[0]['metadata']['topic'] == 'defence'
+
+    config.config['rag']['retrieval'] = 'hybrid'
+    kb = KnowledgeBase(config, encoder=CountingEncoder())
+    kb.add_documents(DRILLS)
+    assert len(kb._bm25) == len(DRILLS) # Indexed on insert, not on the first query
+    monkeypatch.setattr(KnowledgeBase, "_build_bm25", lambda self: pytest.fail("index rebuilt at query time"))
+    # The random test embeddings carry no meaning; the lexical half decides
+    assert kb.query("soft hands at the net", n_results=1)[0]['metadata']['topic'] == 'net'
+    assert len(kb.query("soft hands at the net", n_results=3)) == 3
+
+def test_response_cache_ttl_and_lru(tmp_path, monkeypatch):
+    from src.rag import llm_cache
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(str(tmp_path / "llm.sqlite"), ttl=100, max_entries=2)
+    cache.put("p1", "m", "r1")
+    cache.put("p2", "m", "r2")
+    assert cache.get("p1", "m") == "r1" and cache.get("p1", "other") is None
+    now[0] += 1
+    cache.get("p1", "m") # p2 is now least recently used
+    cache.put("p3", "m", "r3")
+    assert len(cache) == 2 and cache.get("p2", "m") is None
+
+    reopened = ResponseCache(str(tmp_path / "llm.sqlite"), ttl=100, max_entries=2)
+    assert reopened.get("p3", "m") == "r3"
+    now[0] += 101
+    assert reopened.get("p3", "m") is None and len(reopened) == 1
+
+def test_report_reuses_cached_llm_response(config, tmp_path):
+    from src.rag import ReportGenerator
+    config.config['rag']['llm_cache_path'] = str(tmp_path / "llm.sqlite")
+    kb = KnowledgeBase(config, encoder=CountingEncoder())
+    kb.add_documents(DRILLS)
+    metrics = {'shuttle_max_speed_kmh': 120.0, 'players': {1: {'total_distance_m': 300.0}}}
+
+    calls = []
+    generator = ReportGenerator(kb, config)
+    generator._generate = lambda prompt: calls.append(prompt) or "REPORT"
+    assert generator.generate_report(metrics, []).count("REPORT") == 2 # Overview and player 1
+    assert len(calls) == 2
+
+    rerun = ReportGenerator(kb, config)
+    rerun._generate = lambda prompt: calls.append(prompt) or "OTHER"
+    assert "OTHER" not in rerun.generate_report(metrics, []) and len(calls) == 2
+    metrics['shuttle_max_speed_kmh'] = 130.0 # Only the overview prompt changes
+    assert rerun.generate_report(metrics, []).count("OTHER") == 1 and len(calls) == 3
+
+RALLIES = [{'duration': d, 'shot_count': 2, 'landing': (1.0, 2.0),
+            'shots': [{'type': 'Clear', 'player_id': 1}, {'type': 'Smash', 'player_id': 2}]} for d in (3.0, 9.0, 1.0, 6.0, 2.0)]
+
+def stub_generator(config, tmp_path, **stub):
+    import httpx
+    from src.rag import ReportGenerator
+    from src.rag.stub_server import create_app
+    config.config['rag'].update({'llm_backend': 'http', 'llm_cache': False, 'report_concurrency': 2})
+    kb = KnowledgeBase(config, encoder=CountingEncoder())
+    kb.add_documents(DRILLS)
+    app = create_app(**stub)
+    return ReportGenerator(kb, config, transport=httpx.ASGITransport(app=app)), app
+
+def test_sections_are_generated_concurrently_and_streamed(config, tmp_path):
+    generator, app = stub_generator(config, tmp_path, latency=0.2)
+    metrics = {'shuttle_max_speed_kmh': 160.0, 'players': {1: {'total_distance_m': 800.0}, 2: {'total_distance_m': 300.0}}}
+    chunks = []
+    report = generator.generate_report(metrics, RALLIES, on_chunk=chunks.append)
+
+    # Overview, 2 players, 3 longest rallies (in match order), 2 at a time
+    titles = [line[3:] for line in report.splitlines() if line.startswith("## ")]
+    assert titles == ["Match Overview", "Player 1", "Player 2", "Rally 1", "Rally 2", "Rally 4"]
+    # 6 requests, never more than report_concurrency in flight but overlapping
+    assert app.state.requests == 6 and app.state.max_active == 2
+    assert report.count("[STUB] You are an expert Badminton Coach.") == 6
+    assert "".join(chunks) == report and len(chunks) == 7
+
+def test_report_from_async_callers(config, tmp_path):
+    import asyncio
+    generator, app = stub_generator(config, tmp_path)
+    metrics = {'shuttle_max_speed_kmh': 160.0, 'players': {1: {'total_distance_m': 800.0}}}
+
+    async def handler(): # e.g. a FastAPI endpoint
+        with pytest.raises(RuntimeError, match="agenerate_report"):
+            generator.generate_report(metrics, [])
+        return await generator.agenerate_report(metrics, [])
+
+    report = asyncio.run(handler())
+    assert report.count("[STUB]") == 2 and app.state.requests == 2
+
+def test_failed_or_slow_sections_fall_back_to_templates(config, tmp_path):
+    config.config['rag']['report_timeout'] = 0.1
+    generator, app = stub_generator(config, tmp_path, latency=1.0)
+    metrics = {'shuttle_max_speed_kmh': 160.0, 'players': {1: {'total_distance_m': 800.0, 'max_speed_mps': 5.5}}}
+    report = generator.generate_report(metrics, RALLIES[:1])
+    # Every section was requested and the slow requests were cancelled, not awaited
+    assert app.state.requests == 3 and app.state.active == 0
+    assert "[STUB]" not in report
+    assert "- Top speed: 5.5 m/s" in report and "- Shots: Clear, Smash" in report
+
+    generator, app = stub_generator(config, tmp_path, fail_rate=1.0)
+    report = generator.generate_report(metrics, [])
+    assert app.state.requests == 2 and "- Distance covered: 800 m" in report
+
+def test_query_many_batches_and_dedupes(config):
+    encoder = CountingEncoder()
+    kb = KnowledgeBase(config, encoder=encoder)
+    kb.add_documents(DRILLS)
+    encoder.calls.clear()
+
+    queries = [DRILLS[0][0], DRILLS[1][0], DRILLS[0][0]]
+    per_query = kb.query_many(queries, n_results=2, merge=False)
+    assert encoder.calls == [2] # Two distinct queries, one forward pass
+    assert [r[0]['metadata']['topic'] for r in per_query] == ['smash', 'footwork', 'smash']
+    for q, result in zip(queries, per_query):
+        assert [d['id'] for d in result] == [d['id'] for d in kb.query(q, n_results=2)]
+
+    merged = kb.query_many(queries, n_results=2)
+    assert len({d['id'] for d in merged}) == len(merged) <= 3
+    assert merged[0]['metadata']['topic'] == 'smash'
+    assert kb.query_many([], n_results=2) == []
+
+def test_report_retrieves_all_sections_in_one_batch(config):
+    from src.rag import ReportGenerator
+    config.config['rag']['llm_cache'] = False
+    encoder = CountingEncoder()
+    kb = KnowledgeBase(config, encoder=encoder)
+    kb.add_documents(DRILLS)
+    encoder.calls.clear()
+    metrics = {'shuttle_max_speed_kmh': 120.0, 'players': {1: {'total_distance_m': 300.0}, 2: {'total_distance_m': 200.0}}}
+    ReportGenerator(kb, config).generate_report(metrics, [])
+    # smash + footwork (repeated for both players) -> 2 distinct queries in one pass
+    assert encoder.calls == [2]
+
+def test_swing_speed_cue_follows_event_config(config):
+    from src.rag import ReportGenerator
+    config.config['rag']['llm_cache'] = False
+    kb = KnowledgeBase(config, encoder=CountingEncoder())
+    stats = {'total_distance_m': 800.0, 'biomechanics': {'max_swing_speed': 15.0}}
+
+    assert ReportGenerator(kb, config)._player_queries(stats) == [] # Default smash swing speed is 12
+    config.config['events']['smash_swing_speed'] = 20.0
+    assert ReportGenerator(kb, config)._player_queries(stats) == ["how to improve smash power badminton"]
+
+def test_chunking():
+    text = "# Footwork\n\n" + "Split step early. " * 60 + "\n\n## Lunges\n\nKnee over toe."
+    chunks = chunk_text(text, chunk_size=200)
+    assert all(len(c) <= 200 for c in chunks)
+    assert chunks[0].startswith("# Footwork") and chunks[-1] == "## Lunges\n\nKnee over toe."
+    assert " ".join(chunks[:-1]).split() == ["#", "Footwork"] + ("Split step early. " * 60).split()
+
+def test_corpus_ingestion_is_incremental(config, tmp_path):
+    import os
+    corpus = tmp_path / "corpus"
+    (corpus / "footwork").mkdir(parents=True)
+    (corpus / "footwork" / "split_step.md").write_text("# Split step\n\nLand as the opponent hits.")
+    (corpus / "smash.txt").write_text("Snap the wrist. " * 100)
+    (corpus / "notes.pdf").write_text("ignored")
+    config.config['rag'].update({'chunk_size': 300, 'ingest_batch_size': 2})
+
+    encoder = CountingEncoder()
+    kb = KnowledgeBase(config, encoder=encoder)
+    stats = CorpusIngester(kb, config).ingest(str(corpus))
+    root = str(corpus).replace(os.sep, '/')
+    assert stats == {'files': 2, 'unchanged': 0, 'updated': 2, 'removed': 0, 'chunks': 7}
+    assert sum(encoder.calls) == 7 and max(encoder.calls) == 2 # Parallel batches of 2
+    assert kb.query("Land as the opponent hits", where={'topic': 'footwork'})[0]['id'] == f"{root}/footwork/split_step.md#0"
+
+    # New process: nothing changed, nothing read or encoded
+    encoder = CountingEncoder()
+    kb = KnowledgeBase(config, encoder=encoder)
+    assert CorpusIngester(kb, config).ingest(str(corpus))['unchanged'] == 2 and encoder.calls == []
+
+    # Touch one file, shorten another, delete nothing yet
+    os.utime(corpus / "footwork" / "split_step.md", (1, 1))
+    (corpus / "smash.txt").write_text("Snap the wrist. " * 20)
+    stats = CorpusIngester(kb, config).ingest(str(corpus))
+    assert stats['unchanged'] == 1 and stats['updated'] == 1 and stats['chunks'] == 2
+    assert encoder.calls == [1] # Second smash chunk is new text; the first one is cached
+    assert sorted(d['id'] for d in kb.documents) == [f"{root}/footwork/split_step.md#0", f"{root}/smash.txt#0", f"{root}/smash.txt#1"]
+
+    (corpus / "smash.txt").unlink()
+    assert CorpusIngester(kb, config).ingest(str(corpus))['removed'] == 1
+    assert [d['id'] for d in KnowledgeBase(config, encoder=CountingEncoder()).documents] == [f"{root}/footwork/split_step.md#0"]
+
+def test_corpora_are_ingested_independently(config, tmp_path):
+    for name, files in (("a", {"net.md": "Tight net play.", "rules.md": "Serve below the waist."}),
+                        ("b", {"net.md": "Spin the net kill.", "drills.md": "Shadow footwork drill."})):
+        (tmp_path / name).mkdir()
+        for filename, text in files.items():
+            (tmp_path / name / filename).write_text(text)
+
+    kb = KnowledgeBase(config, encoder=CountingEncoder())
+    CorpusIngester(kb, config).ingest(str(tmp_path / "a"))
+    stats = CorpusIngester(kb, config).ingest(str(tmp_path / "b"))
+    assert stats['removed'] == 0 and len(kb.documents) == 4 # Same relative name in both corpora
+
+    (tmp_path / "a" / "rules.md").unlink()
+    assert CorpusIngester(kb, config).ingest(str(tmp_path / "a"))['removed'] == 1
+    reopened = KnowledgeBase(config, encoder=CountingEncoder())
+    assert sorted(d['text'] for d in reopened.documents) == ["Shadow footwork drill.", "Spin the net kill.", "Tight net play."]
+    assert CorpusIngester(reopened, config).ingest(str(tmp_path / "b"))['unchanged'] == 2
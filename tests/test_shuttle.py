@@ -0,0 +1,39 @@
+import cv2
+import numpy as np
+from src.detect import ShuttleDetector
+
+def make_clip(n=60, size=(720, 1280)):
+    """Green court with sensor noise, a walking player block and a small white shuttle on a parabola."""
+    rng = np.random.default_rng(0)
+    base = np.zeros(size + (3,), np.uint8)
+    base[:] = (60, 120, 40)
+    cv2.line(base, (100, 600), (1180, 600), (255, 255, 255), 4) # Static court line
+    frames, truth = [], []
+    for t in range(n):
+        frame = cv2.add(base, rng.integers(0, 8, base.shape, dtype=np.uint8))
+        px = 300 + 4 * t
+        cv2.rectangle(frame, (px, 350), (px + 90, 620), (90, 30, 20), -1) # Player
+        x, y = 200 + 15 * t, 150 + 0.25 * (t - 30) ** 2
+        cv2.circle(frame, (int(x), int(y)), 4, (245, 245, 245), -1)
+        frames.append(frame)
+        truth.append((x, y))
+    return frames, np.array(truth)
+
+def test_tracks_moving_shuttle():
+    frames, truth = make_clip()
+    results = ShuttleDetector().detect_batch(frames)
+
+    found = [i for i, r in enumerate(results) if r is not None]
+    assert len(found) >= len(frames) - 4 # Needs a couple of frames of history
+    pos = np.array([results[i]['pos'] for i in found])
+    assert np.abs(pos - truth[found]).max() < 4.0
+
+def test_inactive_frames_only_update_state():
+    frames, truth = make_clip(n=20)
+    active = np.zeros(20, dtype=bool)
+    active[10:] = True
+    results = ShuttleDetector().detect_batch(frames, active)
+
+    assert all(r is None for r in results[:10])
+    # History was kept, so detection resumes immediately
+    np.testing.assert_allclose(results[10]['pos'], truth[10], atol=4.0)
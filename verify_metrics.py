@@ -22,6 +22,9 @@ class MockCalibrator(CourtCalibrator):
         # Mock transformation: just scale down by 10
         return (point[0] / 10.0, point[1] / 10.0)
 
+    def pixels_to_court(self, points):
+        return np.asarray(points, dtype=np.float64).reshape(-1, 2) / 10.0
+
 def verify_metrics():
     logger.info("Starting metrics verification...")
     